@@ -1,5 +1,8 @@
+from utils.startup import StartupTimer
+startup_timer = StartupTimer()
+
 from typing import Dict, List
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta
@@ -8,30 +11,34 @@ from dotenv import load_dotenv
 import json
 import threading
 import time
-import random
 # Import services
 from utils.helpers import get_fip_status_from_success_rate, get_fip_response
 from services.bedrock_service import BedrockService
 from services.metrics_service import MetricsService
 from services.prometheus_service import PrometheusService
-from models import db
-from models.predictions import Prediction
+from models import db, ensure_schema
+from models.storage import configure_storage, db_writer
+from models.predictions import PredictionTimeline, LatestPrediction
 from utils.logger import logger
-from services.backfill_historical_data import backfill_historical_metrics, GenerateHistoricalData
-from services.predictor import predictor_main
+from utils.instrumentation import instrument_app, stage
+from utils.profiling import AllocationTracker, SamplingProfiler, install_stack_dump_signal, thread_dump, thread_dump_collapsed
+from config import Config
 # Load environment variables
 load_dotenv()
 
 from services.fip_ai_analytics_service import FIPAIAnalyticsService
 from services.enhanced_bedrock_service import PredictionResult, Alert
 from services.alert_service import AlertService, AlertMetrics, AlertContext
+from services.prediction_store import PredictionStore
 from dataclasses import asdict
 import asyncio
+import hmac
 from functools import wraps
 from utils.enums import PredictionType
 from models.webhook import WebhookSubscription
 import requests
 
+startup_timer.mark('imports')
 
 app = Flask(__name__)
 # Update CORS configuration to allow requests from both ports
@@ -50,14 +57,21 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///aa_
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['USE_REAL_BEDROCK'] = os.getenv('USE_REAL_BEDROCK', 'false').lower() == 'True'
 
-# Initialize SQLAlchemy with app
+# Initialize SQLAlchemy with app (WAL, pragmas and pool sizing for SQLite)
+configure_storage(app)
 db.init_app(app)
 
+# Request latency histograms per route, served on /metrics
+instrument_app(app)
+
 # Initialize services
 bedrock_service = BedrockService(use_mock=not app.config['USE_REAL_BEDROCK'])
 metrics_service = MetricsService()
-prometheus_service = PrometheusService()
+prometheus_service = PrometheusService(metrics_service)
 alert_service = AlertService()
+prediction_store = PredictionStore()
+allocation_tracker = AllocationTracker()
+profiler_lock = threading.Lock()  # one CPU profile at a time
 
 # Initialize the AI Analytics service
 ai_analytics_service = FIPAIAnalyticsService(
@@ -65,6 +79,21 @@ ai_analytics_service = FIPAIAnalyticsService(
     use_real_bedrock=app.config['USE_REAL_BEDROCK'],
     bedrock_region=os.getenv('AWS_REGION', 'us-east-1')
 )
+startup_timer.mark('services')
+
+
+def admin_required(f):
+    """Guard for admin endpoints: PROFILING_ADMIN_TOKEN as a Bearer token or X-Admin-Token header"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not Config.PROFILING_ADMIN_TOKEN:
+            return jsonify({'success': False, 'error': 'Profiling is disabled (PROFILING_ADMIN_TOKEN not set)'}), 404
+        auth = request.headers.get('Authorization', '')
+        token = auth[7:] if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), Config.PROFILING_ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+    return wrapper
 
 
 def async_route(f):
@@ -94,7 +123,8 @@ def health_check():
             'bedrock': 'mock' if not app.config['USE_REAL_BEDROCK'] else 'real',
             'prometheus': 'active',
             'database': 'connected'
-        }
+        },
+        'startup': startup_timer.report()
     })
 
 @app.route('/api/fips', methods=['GET'])
@@ -107,14 +137,16 @@ def get_fips():
         # Get historical data for the last hour
         historical_data = ai_analytics_service.historical_analyzer.extract_historical_data(
             days_back=1,  # Last 24 hours
-            step="1m"     # 1-minute resolution
+            step="1m",    # 1-minute resolution
+            compact=True  # only feeds calculate_features
         )
         # logger.info(f"Historical data: {historical_data}")
         
         # Calculate features from historical data
         fip_features = ai_analytics_service.historical_analyzer.calculate_features(historical_data)
 
-        fips_data = get_fip_response(base_fips, fip_features)
+        with stage('build_response'):
+            fips_data = get_fip_response(base_fips, fip_features)
 
         return jsonify({
             'success': True,
@@ -135,36 +167,18 @@ def predict_fip_issues():
         selected_fips = request_data.get('fips', [])
         time_horizon = request_data.get('time_horizon', '24h')
 
-        # Get predictions from database
-        predictions = {}
+        # Latest prediction per FIP in a single query (all FIPs when none are selected)
+        query = LatestPrediction.query.filter(LatestPrediction.prediction_type == PredictionType.DOWNTIME)
+        if selected_fips:
+            query = query.filter(LatestPrediction.fip_name.in_(selected_fips))
+        rows = query.with_entities(LatestPrediction.fip_name, LatestPrediction.raw_prediction).all()
         
-        # If no FIPs selected, get predictions for all FIPs
-        if not selected_fips:
-            # Get all predictions ordered by created_at
-            all_predictions = Prediction.query.filter_by(
-                prediction_type=PredictionType.DOWNTIME
-            ).order_by(Prediction.created_at.desc()).all()
-            
-            # Get latest prediction for each FIP
-            for prediction in all_predictions:
-                if prediction.fip_name not in predictions:
-                    predictions[prediction.fip_name] = json.loads(prediction.raw_prediction)
-        else:
-            # Get predictions for selected FIPs
-            for fip_name in selected_fips:
-                prediction = Prediction.query.filter_by(
-                    fip_name=fip_name,
-                    prediction_type=PredictionType.DOWNTIME
-                ).order_by(Prediction.created_at.desc()).first()
-                
-                if prediction:
-                    predictions[fip_name] = json.loads(prediction.raw_prediction)
-        
-        return jsonify({
-            'success': True,
-            'data': predictions,
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        # raw_prediction is already JSON, so splice it into the response instead of decoding and re-encoding
+        data = ','.join(
+            f'{json.dumps(fip_name)}:{raw_prediction}' for fip_name, raw_prediction in rows if raw_prediction
+        )
+        body = f'{{"success":true,"data":{{{data}}},"timestamp":{json.dumps(datetime.utcnow().isoformat())}}}'
+        return app.response_class(body, mimetype='application/json')
     except Exception as e:
         print(f"Error in predict_fip_issues: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -178,76 +192,17 @@ def get_fip_predictions_hourly():
         request_data = request.get_json() or {}
         hours = request_data.get('hours', 24)
         
-        # Get all predictions
-        predictions = Prediction.query.filter_by(
-            prediction_type=PredictionType.DOWNTIME
-        ).order_by(Prediction.created_at.desc()).all()
-        
-        # Initialize hourly predictions structure
-        hourly_predictions = {}
-        
-        # Process each prediction
-        for prediction in predictions:
-            try:                
-                pred_data = json.loads(prediction.raw_prediction)
-                downtime_pred = pred_data.get('downtime_prediction', {})
-                time_window = downtime_pred.get('time_window', '')
-                is_maintenece = random.choices([True, False], weights=[80, 20])[0]
-                
-                                
-                # Extract hours from time window (e.g., "next 6-8 hours" -> [6,7,8])
-                if 'next' in time_window.lower() and 'hours' in time_window.lower():
-                    # Extract numbers from the time window, handling hyphenated ranges
-                    try:
-                        # First split by spaces and find the part with numbers
-                        parts = time_window.lower().split()
-                        number_part = next((part for part in parts if any(c.isdigit() for c in part)), '')
-                        
-                        if '-' in number_part:
-                            # Handle hyphenated range (e.g., "6-8")
-                            start, end = map(int, number_part.split('-'))
-                            numbers = [start, end]
-                        else:
-                            # Handle single number
-                            numbers = [int(n) for n in number_part if n.isdigit()]
-                                                
-                        if len(numbers) >= 2:
-                            start_hour, end_hour = numbers[0], numbers[1]
-                            # Generate list of hours
-                            hours_list = list(range(start_hour, end_hour + 1))
-                            
-                            # Add prediction to each hour
-                            for hour in hours_list:
-                                if hour <= hours:  # Only include hours within requested range
-                                    if hour not in hourly_predictions:
-                                        hourly_predictions[hour] = {}
-                                    
-                                    hourly_predictions[hour][prediction.fip_name] = {
-                                        'probability': downtime_pred.get('probability', 0),
-                                        'confidence': downtime_pred.get('confidence', 'medium'),
-                                        'reasoning': downtime_pred.get('reasoning', ''),
-                                        'isMaintenence': is_maintenece if downtime_pred.get('probability', 0) > 0.7 else False, # If confidence is low then always `False`
-                                        'timeWindow': time_window,
-                                    }
-                                    logger.info(f"Added prediction for hour {hour}, FIP {prediction.fip_name}")
-                        else:
-                            logger.warning(f"Could not extract valid hour range from time window: {time_window}")
-                    except Exception as e:
-                        logger.error(f"Error parsing time window '{time_window}': {str(e)}")
-                else:
-                    logger.warning(f"Invalid time window format: {time_window}")
-            except Exception as e:
-                logger.error(f"Error processing prediction {prediction.id} for {prediction.fip_name}: {str(e)}")
-                continue
+        # Timeline is precomputed when predictions are written; rows arrive grouped by hour
+        timeline = PredictionTimeline.query.filter(
+            PredictionTimeline.generation_id == prediction_store.active_generation_id(PredictionType.DOWNTIME),
+            PredictionTimeline.hour <= hours
+        ).order_by(PredictionTimeline.hour, PredictionTimeline.fip_name).all()
         
-        # Convert to list format and sort by hour
-        response_data = [
-            {
-                'hour': hour,
-                'predictions': predictions
-            }
-            for hour, predictions in sorted(hourly_predictions.items())
-        ]
+        response_data = []
+        for entry in timeline:
+            if not response_data or response_data[-1]['hour'] != entry.hour:
+                response_data.append({'hour': entry.hour, 'predictions': {}})
+            response_data[-1]['predictions'][entry.fip_name] = entry.to_dict()
         
         logger.info(f"Generated response with {len(response_data)} hours of predictions")
         
@@ -282,7 +237,7 @@ def get_proactive_alerts():
     """Get proactive alerts and recommendations"""
     try:
         # Get current metrics
-        current_metrics = metrics_service.get_all_fips_status()
+        current_metrics = metrics_service.get_metrics_view()
         
         # Get historical data for analysis
         historical_data = ai_analytics_service.historical_analyzer.extract_historical_data(
@@ -315,7 +270,8 @@ def get_proactive_alerts():
                 },
                 'recommended_actions': alert.recommended_actions,
                 'timestamp': alert.timestamp,
-                'confidence': alert.confidence
+                'confidence': alert.confidence,
+                'status': alert.status
             }
             for alert in alerts
         ]
@@ -355,16 +311,23 @@ def get_recommendations():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint, rendered from the live FIP metrics"""
+    body, content_type = prometheus_service.render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.route('/api/metrics/push', methods=['POST'])
 def push_metrics_to_prometheus():
-    """Push mock metrics to Prometheus"""
+    """Push mock metrics to the Prometheus pushgateway (no-op unless PROMETHEUS_PUSHGATEWAY_ENABLED)"""
     try:
         # Generate and push mock metrics
         metrics_generated = prometheus_service.push_mock_metrics()
         
         return jsonify({
             'success': True,
-            'message': 'Mock metrics pushed to Prometheus',
+            'message': ('Mock metrics pushed to Prometheus' if prometheus_service.pushgateway_enabled
+                        else 'Pushgateway disabled, metrics are served on /metrics'),
             'metrics_count': metrics_generated,
             'timestamp': datetime.utcnow().isoformat()
         })
@@ -390,6 +353,9 @@ def push_historical_metrics():
     """Generate and push historical metrics to VictoriaMetrics"""
     try:
         logger.info("Pushing historical metrics to VictoriaMetrics")
+        # Only this route needs them; importing here keeps them out of worker boot
+        from services.backfill_historical_data import backfill_historical_metrics
+        from services.predictor import predictor_main
 
         backfill_historical_metrics()
         # g = GenerateHistoricalData()
@@ -670,6 +636,97 @@ def background_ai_analytics_updater():
                 time.sleep(600)  # Retry after 10 minutes
 
 
+# ================================
+# Admin: Profiling
+# ================================
+# Collapsed stacks ("frame;frame;frame count") load into flamegraph.pl, inferno or speedscope
+
+@app.route('/api/admin/profile/cpu', methods=['GET'])
+@admin_required
+def profile_cpu():
+    """Sample every thread's stack for `seconds` and return the profile"""
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), Config.PROFILING_MAX_SECONDS)
+        interval = max(float(request.args.get('interval', Config.PROFILING_SAMPLE_INTERVAL)), 0.001)
+        output = request.args.get('format', 'collapsed')
+        
+        if not profiler_lock.acquire(blocking=False):
+            return jsonify({'success': False, 'error': 'A CPU profile is already running'}), 409
+        try:
+            logger.info(f"🔬 CPU profile for {seconds:.0f}s at {interval * 1000:.0f} ms intervals")
+            profiler = SamplingProfiler(
+                interval=interval,
+                lines=request.args.get('lines', 'false').lower() == 'true',
+                thread_filter=request.args.get('thread'),
+                exclude_idents=[threading.get_ident()]  # this request, waiting on the sampler
+            ).run(seconds)
+        finally:
+            profiler_lock.release()
+        
+        if output == 'json':
+            return jsonify({'success': True, 'data': profiler.top(int(request.args.get('limit', 30)))})
+        return Response(profiler.collapsed(), mimetype='text/plain')
+    except Exception as e:
+        logger.error(f"Error profiling CPU: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/profile/threads', methods=['GET'])
+@admin_required
+def profile_threads():
+    """Current stack of every thread, background tasks included"""
+    try:
+        if request.args.get('format', 'json') == 'collapsed':
+            return Response(thread_dump_collapsed(), mimetype='text/plain')
+        threads = thread_dump()
+        return jsonify({'success': True, 'data': threads, 'count': len(threads),
+                        'timestamp': datetime.utcnow().isoformat()})
+    except Exception as e:
+        logger.error(f"Error dumping threads: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/profile/memory', methods=['POST'])
+@admin_required
+def profile_memory_control():
+    """Start or stop tracemalloc ({"action": "start" | "stop", "frames": 25})"""
+    try:
+        data = request.get_json(silent=True) or {}
+        action = data.get('action', 'start')
+        if action == 'start':
+            status = allocation_tracker.start(int(data.get('frames', 25)))
+        elif action == 'stop':
+            status = allocation_tracker.stop()
+        else:
+            return jsonify({'success': False, 'error': f"Unknown action '{action}'"}), 400
+        return jsonify({'success': True, 'data': status})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/profile/memory', methods=['GET'])
+@admin_required
+def profile_memory_snapshot():
+    """Allocation snapshot: top allocation sites (optionally diffed against the previous snapshot) or collapsed stacks"""
+    try:
+        if not allocation_tracker.tracing:
+            return jsonify({'success': False, 'error': 'tracemalloc is not running, POST {"action": "start"} first'}), 409
+        
+        snapshot, previous = allocation_tracker.snapshot()
+        if request.args.get('format', 'json') == 'collapsed':
+            return Response(allocation_tracker.collapsed(snapshot), mimetype='text/plain')
+        
+        compare = request.args.get('compare', 'false').lower() == 'true'
+        top = allocation_tracker.top(
+            snapshot,
+            previous if compare else None,
+            key_type=request.args.get('key_type', 'lineno'),
+            limit=int(request.args.get('limit', 30))
+        )
+        return jsonify({'success': True, 'data': {**allocation_tracker.status(), 'compared': compare and previous is not None,
+                                                  'top': top}})
+    except Exception as e:
+        logger.error(f"Error taking allocation snapshot: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # ================================
 # Background Tasks
 # ================================
@@ -691,29 +748,15 @@ def background_predictions_updater():
     with app.app_context():
         while True:
             try:
-                # clear the predictions table
-                db.session.query(Prediction).delete()
-                db.session.commit()
-
-                # Get historical data
-                historical_data = ai_analytics_service.get_historical_data(days_back=30, step="15m")
-                fip_features = ai_analytics_service.get_fip_features(historical_data)
+                # Slide the 30-day feature window forward by the buckets added since the last run
+                fip_features = ai_analytics_service.get_incremental_fip_features(days_back=30, step="15m")
                 # Generate predictions for all FIPs
                 predictions = bedrock_service.predict_downtime(fip_features, '24h')
                 
-                # Store predictions in database
-                for fip_name, prediction in predictions.items():
-                    prediction_record = Prediction(
-                        fip_name=fip_name,
-                        prediction_type=PredictionType.DOWNTIME,
-                        probability=prediction.get('downtime_prediction', {}).get('probability', 0),
-                        time_window=prediction.get('downtime_prediction', {}).get('time_window', ''),
-                        confidence=prediction.get('downtime_prediction', {}).get('confidence', 'medium'),
-                        raw_prediction=json.dumps(prediction)
-                    )
-                    db.session.add(prediction_record)
-                
-                db.session.commit()
+                # Write a new generation while the current one keeps serving, then swap atomically
+                generation_id = prediction_store.write_generation(predictions, PredictionType.DOWNTIME)
+                prediction_store.promote(generation_id)
+                prediction_store.prune(PredictionType.DOWNTIME)
                 logger.info(f"Updated predictions for {len(predictions)} FIPs")
                 
                 time.sleep(900)  # 15 minutes
@@ -721,6 +764,27 @@ def background_predictions_updater():
                 logger.error(f"Error in background predictions updater: {e}")
                 time.sleep(300)  # Retry after 5 minutes
 
+def background_alert_retention():
+    """Background task to keep the alerts table bounded"""
+    with app.app_context():
+        while True:
+            try:
+                alert_service.compact_alert_history()
+                time.sleep(Config.ALERT_COMPACTION_INTERVAL)
+            except Exception as e:
+                logger.error(f"Error in background alert retention: {e}")
+                time.sleep(600)  # Retry after 10 minutes
+
+def background_history_compactor():
+    """Background task to fold new TSDB samples into the columnar history store"""
+    while True:
+        try:
+            ai_analytics_service.history_store.compact()
+            time.sleep(Config.HISTORY_STORE_COMPACTION_INTERVAL)
+        except Exception as e:
+            logger.error(f"Error in background history compactor: {e}")
+            time.sleep(600)  # Retry after 10 minutes
+
 # ================================
 # Initialize Database and Start Background Tasks
 # ================================
@@ -728,12 +792,20 @@ def background_predictions_updater():
 def init_app():
     """Initialize the application"""
     with app.app_context():
-        # Create database tables
+        # Create database tables and apply additive schema changes
         db.create_all()
+        ensure_schema()
+        
+        # Ongoing alert episodes survive the restart
+        alert_service.restore_active_alerts()
+        
+        # Single writer thread for background writes; readers are never blocked in WAL mode
+        db_writer.start(app)
         
         # Start background tasks
         metrics_thread = threading.Thread(target=background_metrics_generator, daemon=True)
         predictions_thread = threading.Thread(target=background_predictions_updater, daemon=True)
+        retention_thread = threading.Thread(target=background_alert_retention, daemon=True)
         
         # # Start AI analytics background task
         # ai_thread = threading.Thread(target=background_ai_analytics_updater, daemon=True)
@@ -741,7 +813,17 @@ def init_app():
 
         metrics_thread.start()
         predictions_thread.start()
+        retention_thread.start()
+        
+        if ai_analytics_service.history_store.enabled:
+            history_thread = threading.Thread(target=background_history_compactor, daemon=True)
+            history_thread.start()
+        
+        # kill -USR1 <pid> dumps all thread stacks to stderr
+        install_stack_dump_signal()
         
+        startup_timer.mark('init')
+        startup_timer.log()
         logger.info("AA Gateway AI Operations API started successfully!")
 
 if __name__ == '__main__':
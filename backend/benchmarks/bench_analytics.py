@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the analytics hot paths on synthetic fleets, without external services.
+
+    python benchmarks/bench_analytics.py --fips 11 100 1000 --days 1 7 --steps 15m 1h
+    python benchmarks/bench_analytics.py --fips 11 100 --days 1 --compare benchmarks/results/baseline.json
+
+Each case (FIPs x days x step) generates history with SyntheticHistoryGenerator
+(the GenerateHistoricalData semantics), serves it from a local stub of the
+VictoriaMetrics query_range API and times:
+
+    query_range            extract_historical_data -> _query_range, default frames
+    query_range_compact    the same with compact=True (what /api/fips uses)
+    calculate_features     HistoricalAnalyzer.calculate_features on compact frames
+    maintenance_windows    HistoricalAnalyzer.detect_maintenance_windows
+    generate_alerts        AlertService.generate_alerts (rule engine + lifecycle, in-memory SQLite)
+    health_score           FIPDowntimePredictor.calculate_health_score on the wide fleet frame
+    fip_response           utils.helpers.get_fip_response
+
+Times are the min and median of --repeat runs; peak memory is what tracemalloc
+sees during one extra run (Python and numpy allocations), so it does not slow
+the timed runs. Results go to a JSON file that --compare reads back.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask  # noqa: E402
+
+from config import Config  # noqa: E402
+from models import db  # noqa: E402
+import models.alert  # noqa: E402,F401  (registers the alert tables)
+from services.alert_service import AlertService  # noqa: E402
+from services.feature_state import step_to_timedelta  # noqa: E402
+from services.fip_registry import FIPRegistry  # noqa: E402
+from services.historical_analyzer import PrometheusHistoricalAnalyzer  # noqa: E402
+from services.metrics_service import MetricsService  # noqa: E402
+from services.predictor import FIPDowntimePredictor  # noqa: E402
+from services.synthetic_history import METRIC_NAMES, SyntheticHistoryGenerator  # noqa: E402
+from utils.helpers import get_fip_response  # noqa: E402
+from utils.logger import logger  # noqa: E402
+
+BENCHMARKS = ['query_range', 'query_range_compact', 'calculate_features', 'maintenance_windows',
+              'generate_alerts', 'health_score', 'fip_response']
+
+NOISE_FLOOR_SECONDS = 0.005
+
+# query_range query -> METRIC_NAMES column served for it
+QUERY_METRICS = {
+    'fip_consent_success_rate': 'consent_success_rate',
+    'fip_data_fetch_success_rate': 'data_fetch_success_rate',
+    'fip_avg_response_time_seconds': 'avg_response_time',
+    'fip_error_rate': 'error_rate',
+    'fip_status': 'status',
+    'increase(fip_total_requests_total[1h])': 'total_requests',
+}
+
+# FIPDowntimePredictor metric -> METRIC_NAMES column
+HEALTH_METRICS = {
+    'consent_success_rate': 'consent_success_rate',
+    'data_fetch_success_rate': 'data_fetch_success_rate',
+    'response_time': 'avg_response_time',
+    'error_rate': 'error_rate',
+    'status': 'status',
+}
+
+
+# ================================
+# SYNTHETIC FLEET
+# ================================
+
+class Fixture:
+    """One case's synthetic history, as query_range bodies and as a wide frame"""
+
+    def __init__(self, n_fips: int, days: int, step: str, seed: int):
+        self.registry = FIPRegistry.synthetic(n_fips, seed=seed)
+        generator = SyntheticHistoryGenerator(dict(zip(self.registry.names, self.registry.bank_names)), seed=seed)
+
+        # End at "now" so the alert windows (relative to utcnow) see the latest points
+        interval = step_to_timedelta(step)
+        interval_minutes = max(1, int(interval.total_seconds() // 60))
+        self.n_steps = int(timedelta(days=days) / timedelta(minutes=interval_minutes)) + 1
+        end_time = datetime.now().replace(second=0, microsecond=0)
+        self.block = generator.generate(end_time - timedelta(days=days), self.n_steps, interval_minutes)
+        self.samples = int(self.block.present.sum()) * len(QUERY_METRICS)
+
+        self.bodies = {query: self._query_range_body(metric) for query, metric in QUERY_METRICS.items()}
+        self.response_bytes = sum(len(body) for body in self.bodies.values())
+
+    def _query_range_body(self, metric: str) -> bytes:
+        block = self.block
+        m = METRIC_NAMES.index(metric)
+        timestamps = block.timestamps.tolist()
+        result = []
+        for f, (fip_name, bank_name) in enumerate(zip(self.registry.names, self.registry.bank_names)):
+            present = np.flatnonzero(block.present[:, f])
+            if not len(present):
+                continue
+            values = block.values[present, f, m].tolist()
+            result.append({
+                'metric': {'__name__': metric, 'fip_name': fip_name, 'bank_name': bank_name},
+                'values': [[timestamps[t], repr(v)] for t, v in zip(present.tolist(), values)]
+            })
+        return json.dumps({'status': 'success', 'data': {'resultType': 'matrix', 'result': result}}).encode('utf-8')
+
+    def wide_frame(self) -> pd.DataFrame:
+        """Present (time, FIP) points with the predictor's metric columns"""
+        block = self.block
+        t, f = np.nonzero(block.present)
+        frame = pd.DataFrame({
+            'timestamp': pd.to_datetime(block.local_times[t]),
+            'fip_name': np.array(self.registry.names, dtype=object)[f],
+        })
+        for name, metric in HEALTH_METRICS.items():
+            frame[name] = block.values[t, f, METRIC_NAMES.index(metric)]
+        return frame
+
+
+class StubQueryRangeServer:
+    """Serves the fixture's bodies on GET /api/v1/query_range (time range is ignored)"""
+
+    def __init__(self, bodies, host: str = '127.0.0.1', port: int = 0):
+        empty = json.dumps({'status': 'success', 'data': {'resultType': 'matrix', 'result': []}}).encode('utf-8')
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/api/v1/query_range':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                query = parse_qs(url.query).get('query', [''])[0]
+                body = bodies.get(query, empty)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='query-range-stub', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubQueryRangeServer':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ================================
+# MEASUREMENT
+# ================================
+
+def measure(func, repeat: int, memory: bool) -> dict:
+    """Min/median wall time over `repeat` runs, then one traced run for the peak"""
+    func()  # warm-up (imports, lazily compiled rules, first-touch caches)
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'seconds_min': round(min(times), 6),
+        'seconds_median': round(statistics.median(times), 6),
+        'runs': repeat,
+        'peak_memory_mb': round(peak / 1e6, 2) if peak is not None else None
+    }
+
+
+def run_case(n_fips: int, days: int, step: str, args) -> list:
+    fixture = Fixture(n_fips, days, step, args.seed)
+    case = {'fips': n_fips, 'days': days, 'step': step, 'steps': fixture.n_steps,
+            'samples': fixture.samples, 'response_mb': round(fixture.response_bytes / 1e6, 2)}
+
+    stub = StubQueryRangeServer(fixture.bodies).start()
+    app = Flask('bench_analytics')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    results = []
+    try:
+        with app.app_context():
+            db.create_all()
+
+            analyzer = PrometheusHistoricalAnalyzer(prometheus_url=stub.url)
+            historical_data = analyzer.extract_historical_data(days_back=days, step=step)
+            compact_data = analyzer.extract_historical_data(days_back=days, step=step, compact=True)
+            metrics_service = MetricsService(fixture.registry, seed=args.seed)
+            current_metrics = metrics_service.get_metrics_view()
+            fip_features = analyzer.calculate_features(compact_data)
+            alert_service = AlertService()
+            predictor = FIPDowntimePredictor(vm_url=stub.url)
+            wide_frame = fixture.wide_frame()
+
+            benchmarks = {
+                'query_range': lambda: analyzer.extract_historical_data(days_back=days, step=step),
+                'query_range_compact': lambda: analyzer.extract_historical_data(days_back=days, step=step, compact=True),
+                'calculate_features': lambda: analyzer.calculate_features(compact_data),
+                'maintenance_windows': lambda: analyzer.detect_maintenance_windows(historical_data),
+                'generate_alerts': lambda: alert_service.generate_alerts(historical_data, current_metrics),
+                'health_score': lambda: predictor.calculate_health_score(wide_frame),
+                'fip_response': lambda: get_fip_response(metrics_service.get_all_fips_status(), fip_features),
+            }
+            for name in args.only or BENCHMARKS:
+                result = {'benchmark': name, **case, **measure(benchmarks[name], args.repeat, not args.no_memory)}
+                results.append(result)
+                print_row(result)
+    finally:
+        stub.stop()
+    return results
+
+
+# ================================
+# REPORTING
+# ================================
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def print_header() -> None:
+    print(f"\n{'benchmark':<20} {'fips':>5} {'days':>4} {'step':>5} {'samples':>11} "
+          f"{'min':>9} {'median':>9} {'peak MB':>8}")
+
+
+def print_row(result: dict) -> None:
+    peak = result['peak_memory_mb']
+    print(f"{result['benchmark']:<20} {result['fips']:>5} {result['days']:>4} {result['step']:>5} "
+          f"{result['samples']:>11,} {result['seconds_min']:>8.3f}s {result['seconds_median']:>8.3f}s "
+          f"{(f'{peak:.1f}' if peak is not None else '-'):>8}", flush=True)
+
+
+def compare(results: list, baseline_file: str, threshold: float) -> list:
+    """Cases slower than the baseline by more than `threshold` (min times, same case key)"""
+    with open(baseline_file) as f:
+        baseline = {_key(r): r for r in json.load(f)['results']}
+
+    regressions = []
+    print(f"\nvs {baseline_file} (regression threshold {threshold:.0%})")
+    for result in results:
+        before = baseline.get(_key(result))
+        if before is None or not before['seconds_min']:
+            continue
+        ratio = result['seconds_min'] / before['seconds_min']
+        # Sub-millisecond timings are mostly noise, so only slower cases can regress
+        flag = 'REGRESSION' if ratio > 1 + threshold and result['seconds_min'] >= NOISE_FLOOR_SECONDS else ''
+        print(f"{result['benchmark']:<20} {result['fips']:>5} {result['days']:>4} {result['step']:>5} "
+              f"{before['seconds_min']:>8.3f}s -> {result['seconds_min']:>8.3f}s {ratio:>6.2f}x {flag}")
+        if flag:
+            regressions.append({'key': _key(result), 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def _key(result: dict) -> str:
+    return f"{result['benchmark']}/{result['fips']}/{result['days']}d/{result['step']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fips', type=int, nargs='+', default=[11, 100, 1000])
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 7])
+    parser.add_argument('--steps', type=str, nargs='+', default=['15m'], help="Query steps, e.g. 1m 15m 1h")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic fleet and history")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--only', type=str, nargs='+', choices=BENCHMARKS, default=None)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run")
+    parser.add_argument('--max-cells', type=int, default=10_000_000,
+                        help="Skip cases with more time x FIP cells than this (query_range bodies are built in memory)")
+    parser.add_argument('--output', type=str, default=None,
+                        help="Results JSON (default: benchmarks/results/analytics-<timestamp>.json)")
+    parser.add_argument('--compare', type=str, default=None, help="Baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Slowdown that counts as a regression")
+    parser.add_argument('--verbose', action='store_true', help="Keep the services' INFO logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    # The mock short-circuits skip the code under test; nothing here calls Bedrock itself
+    Config.USE_REAL_BEDROCK = True
+
+    results, skipped = [], []
+    print_header()
+    for step in args.steps:
+        step_minutes = max(1, int(step_to_timedelta(step).total_seconds() // 60))
+        for days in args.days:
+            for n_fips in args.fips:
+                cells = (days * 24 * 60 // step_minutes + 1) * n_fips
+                if cells > args.max_cells:
+                    skipped.append({'fips': n_fips, 'days': days, 'step': step, 'cells': cells})
+                    print(f"{'(skipped)':<20} {n_fips:>5} {days:>4} {step:>5} {cells:>11,} cells > --max-cells")
+                    continue
+                results.extend(run_case(n_fips, days, step, args))
+
+    report = {
+        'environment': environment(),
+        'args': vars(args),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'results': results,
+        'skipped': skipped,
+    }
+    if args.compare:
+        report['regressions'] = compare(results, args.compare, args.threshold)
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, 'benchmarks', 'results', f"analytics-{datetime.utcnow():%Y%m%dT%H%M%SZ}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
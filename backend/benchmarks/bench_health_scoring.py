@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-FIP pandas health scoring vs the vectorized fleet engine.
+
+    python benchmarks/bench_health_scoring.py --fips 100 1000 5000 --days 7 14
+
+Checks parity against the original per-FIP implementation on a small fleet,
+then times both paths (the per-FIP path only up to --legacy-max-fips).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.health_scoring import HealthScoringEngine, decode_risk_masks  # noqa: E402
+from services.predictor import FIPDowntimePredictor  # noqa: E402
+
+
+def legacy_health_score(df: pd.DataFrame, metrics_config: dict) -> pd.DataFrame:
+    """The original calculate_health_score loop (string-concatenated risk factors)"""
+    df = df.copy()
+    df['health_score'] = 0.0
+    df['risk_factors'] = ''
+    for metric_name, config in metrics_config.items():
+        if metric_name not in df.columns:
+            continue
+        values = df[metric_name]
+        critical, warning = config['threshold_critical'], config['threshold_warning']
+        if config.get('invert', False):
+            score = np.where(values <= warning, 1.0,
+                             np.where(values <= critical, 1.0 - (values - warning) / (critical - warning), 0.0))
+        else:
+            score = np.where(values >= warning, 1.0,
+                             np.where(values >= critical, (values - critical) / (warning - critical), 0.0))
+        df['health_score'] += score * config['weight']
+        df.loc[score < 0.5, 'risk_factors'] += f"{metric_name},"
+    df['health_score'] = np.clip(df['health_score'] * 100, 0, 100)
+    return df
+
+
+def synthetic_fleet(n_fips: int, days: int, step_minutes: int, seed: int = 7):
+    """[time, fip, metric] float32 array with degradations and gaps"""
+    rng = np.random.default_rng(seed)
+    n_times = days * 24 * 60 // step_minutes
+    shape = (n_times, n_fips)
+    values = np.stack([
+        rng.normal(92, 6, shape),       # consent_success_rate
+        rng.normal(94, 5, shape),       # data_fetch_success_rate
+        rng.gamma(2.0, 1.2, shape),     # response_time
+        rng.gamma(1.5, 2.0, shape),     # error_rate
+        rng.choice([1.0, 0.5, 0.0], shape, p=[0.9, 0.07, 0.03]),  # status
+    ], axis=-1).astype(np.float32)
+    values[rng.random(values.shape) < 0.01] = np.nan
+    timestamps = pd.date_range('2024-01-01', periods=n_times, freq=f'{step_minutes}min').to_numpy()
+    return values, timestamps, [f'FIP_{i:05d}' for i in range(n_fips)]
+
+
+def to_wide_frame(values, timestamps, fip_names, metric_names) -> pd.DataFrame:
+    n_times, n_fips, _ = values.shape
+    frame = pd.DataFrame({
+        'timestamp': np.repeat(timestamps, n_fips),
+        'fip_name': np.tile(np.array(fip_names, dtype=object), n_times),
+    })
+    for m, name in enumerate(metric_names):
+        frame[name] = values[:, :, m].ravel().astype(np.float64)
+    return frame
+
+
+def check_parity(predictor: FIPDowntimePredictor, metric_names) -> None:
+    values, timestamps, fip_names = synthetic_fleet(20, 2, 5, seed=1)
+    frame = to_wide_frame(values, timestamps, fip_names, metric_names)
+    legacy = legacy_health_score(frame, predictor.fip_metrics_config)
+    fleet = predictor.calculate_fleet_health(frame, fip_names)
+    ours = fleet.to_frame()
+
+    assert np.allclose(legacy['health_score'].to_numpy(), ours['health_score'].to_numpy(), atol=1e-3)
+    assert (legacy['risk_factors'].to_numpy() == ours['risk_factors'].to_numpy()).all()
+    print(f"parity ok: {len(frame):,} rows match the per-FIP implementation")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fips', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 14])
+    parser.add_argument('--step-minutes', type=int, default=5)
+    parser.add_argument('--legacy-max-fips', type=int, default=200)
+    args = parser.parse_args()
+
+    predictor = FIPDowntimePredictor(vm_url='http://localhost:8428')
+    engine = HealthScoringEngine(predictor.fip_metrics_config)
+    metric_names = list(predictor.fip_metrics_config)
+    check_parity(predictor, metric_names)
+
+    print(f"\n{'fips':>6} {'days':>5} {'cells':>13} {'per-FIP pandas':>15} {'vectorized':>11} {'speedup':>8} {'Mcells/s':>9}")
+    for days in args.days:
+        for n_fips in args.fips:
+            values, timestamps, fip_names = synthetic_fleet(n_fips, days, args.step_minutes)
+            cells = values.shape[0] * values.shape[1]
+
+            start = time.perf_counter()
+            fleet = engine.score_fleet(values, metric_names, timestamps, fip_names)
+            decode_risk_masks(fleet.risk_mask[-1], metric_names)
+            vectorized = time.perf_counter() - start
+
+            legacy = None
+            if n_fips <= args.legacy_max_fips:
+                frame = to_wide_frame(values, timestamps, fip_names, metric_names)
+                start = time.perf_counter()
+                for _, fip_frame in frame.groupby('fip_name', sort=False):
+                    legacy_health_score(fip_frame, predictor.fip_metrics_config)
+                legacy = time.perf_counter() - start
+
+            print(f"{n_fips:>6} {days:>5} {cells:>13,} "
+                  f"{(f'{legacy:.2f}s' if legacy is not None else '-'):>15} {vectorized:>10.3f}s "
+                  f"{(f'{legacy / vectorized:.0f}x' if legacy is not None else '-'):>8} "
+                  f"{cells / vectorized / 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,22 +15,101 @@ class Config:
     
     # Database Configuration
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///aa_gateway.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))  # seconds
+    DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', '200'))
+    DB_WRITE_FLUSH_INTERVAL = float(os.getenv('DB_WRITE_FLUSH_INTERVAL', '0.2'))  # seconds
+    
+    # SQLite tuning (ignored for other databases)
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))  # 64 MB page cache
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
     
     # AWS Bedrock Configuration
     USE_REAL_BEDROCK = os.getenv('USE_REAL_BEDROCK', 'false').lower() == 'true'
     BEDROCK_REGION = os.getenv('BEDROCK_REGION', 'us-east-1')
     BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
     
+    # VictoriaMetrics queries and fleet scans
+    VM_QUERY_TIMEOUT = int(os.getenv('VM_QUERY_TIMEOUT', '30'))  # seconds
+    FLEET_SCAN_WORKERS = int(os.getenv('FLEET_SCAN_WORKERS', '8'))
+    FLEET_SCAN_EXECUTOR = os.getenv('FLEET_SCAN_EXECUTOR', 'process')  # process | thread
+    FLEET_SCAN_FIP_TIMEOUT = float(os.getenv('FLEET_SCAN_FIP_TIMEOUT', '60'))  # seconds per FIP
+    
     # Prometheus Configuration
     PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://localhost:9090')
     PROMETHEUS_PUSHGATEWAY_URL = os.getenv('PROMETHEUS_PUSHGATEWAY_URL', 'localhost:9091')
+    PROMETHEUS_PUSHGATEWAY_ENABLED = os.getenv('PROMETHEUS_PUSHGATEWAY_ENABLED', 'false').lower() == 'true'  # /metrics is scraped otherwise
+    
+    # Prometheus remote write (snappy protobuf), e.g. http://victoriametrics:8428/api/v1/write
+    REMOTE_WRITE_URL = os.getenv('REMOTE_WRITE_URL', '')
+    REMOTE_WRITE_SHARDS = int(os.getenv('REMOTE_WRITE_SHARDS', '4'))
+    REMOTE_WRITE_MAX_SAMPLES_PER_SEND = int(os.getenv('REMOTE_WRITE_MAX_SAMPLES_PER_SEND', '5000'))
+    REMOTE_WRITE_CAPACITY = int(os.getenv('REMOTE_WRITE_CAPACITY', '50000'))  # queued samples per shard
+    REMOTE_WRITE_BATCH_SEND_DEADLINE = float(os.getenv('REMOTE_WRITE_BATCH_SEND_DEADLINE', '5'))  # seconds
+    REMOTE_WRITE_TIMEOUT = float(os.getenv('REMOTE_WRITE_TIMEOUT', '30'))  # seconds per request
+    REMOTE_WRITE_MAX_RETRIES = int(os.getenv('REMOTE_WRITE_MAX_RETRIES', '3'))
+    
+    # On-demand profiling (/api/admin/profile/*), disabled unless a token is set
+    PROFILING_ADMIN_TOKEN = os.getenv('PROFILING_ADMIN_TOKEN', '')
+    PROFILING_MAX_SECONDS = float(os.getenv('PROFILING_MAX_SECONDS', '60'))
+    PROFILING_SAMPLE_INTERVAL = float(os.getenv('PROFILING_SAMPLE_INTERVAL', '0.01'))  # seconds between samples
     
     # Metrics Configuration
     METRICS_UPDATE_INTERVAL = int(os.getenv('METRICS_UPDATE_INTERVAL', '120'))  # 2 minutes
     PREDICTIONS_UPDATE_INTERVAL = int(os.getenv('PREDICTIONS_UPDATE_INTERVAL', '900'))  # 15 minutes
+    PREDICTION_GENERATIONS_RETAINED = int(os.getenv('PREDICTION_GENERATIONS_RETAINED', '8'))
+    MAINTENANCE_PROBABILITY_THRESHOLD = float(os.getenv('MAINTENANCE_PROBABILITY_THRESHOLD', '0.7'))
+    
+    # Alerting Configuration
+    ALERT_RULES_FILE = os.getenv(
+        'ALERT_RULES_FILE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitoring', 'alert_rules.yml')
+    )
+    ALERT_RETENTION_DAYS = int(os.getenv('ALERT_RETENTION_DAYS', '30'))
+    ALERT_MAX_ROWS = int(os.getenv('ALERT_MAX_ROWS', '50000'))
+    ALERT_COMPACTION_INTERVAL = int(os.getenv('ALERT_COMPACTION_INTERVAL', '3600'))  # 1 hour
+    
+    # Columnar history store (Parquet, needs pyarrow) for long-range analytics
+    HISTORY_STORE_ENABLED = os.getenv('HISTORY_STORE_ENABLED', 'true').lower() == 'true'
+    HISTORY_STORE_DIR = os.getenv(
+        'HISTORY_STORE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'history')
+    )
+    HISTORY_STORE_PROFILES = os.getenv('HISTORY_STORE_PROFILES', '1h:30,1d:90')  # step:days_back
+    HISTORY_STORE_COMPACTION_INTERVAL = int(os.getenv('HISTORY_STORE_COMPACTION_INTERVAL', '900'))  # 15 minutes
+    HISTORY_STORE_COMPRESSION = os.getenv('HISTORY_STORE_COMPRESSION', 'zstd')
+    HISTORY_STORE_ROW_GROUP_SIZE = int(os.getenv('HISTORY_STORE_ROW_GROUP_SIZE', '65536'))
+    
+    # Shared memory-mapped metrics matrix (one ingest process, zero-copy readers)
+    SHARED_MATRIX_ENABLED = os.getenv('SHARED_MATRIX_ENABLED', 'true').lower() == 'true'
+    SHARED_MATRIX_DIR = os.getenv(
+        'SHARED_MATRIX_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'shared_matrix')
+    )
+    SHARED_MATRIX_PROFILES = os.getenv('SHARED_MATRIX_PROFILES', '1m:1,15m:30')  # step:days_back
+    SHARED_MATRIX_FIP_CAPACITY = int(os.getenv('SHARED_MATRIX_FIP_CAPACITY', '256'))
+    SHARED_MATRIX_INGEST_INTERVAL = int(os.getenv('SHARED_MATRIX_INGEST_INTERVAL', '60'))  # seconds
+    
+    # Backfill importer (streamed, gzip-compressed chunks to VictoriaMetrics)
+    BACKFILL_CHUNK_SAMPLES = int(os.getenv('BACKFILL_CHUNK_SAMPLES', '60000'))
+    BACKFILL_CONCURRENCY = int(os.getenv('BACKFILL_CONCURRENCY', '4'))
+    BACKFILL_TIMEOUT = float(os.getenv('BACKFILL_TIMEOUT', '60'))  # seconds per chunk request
+    BACKFILL_MAX_RETRIES = int(os.getenv('BACKFILL_MAX_RETRIES', '3'))
+    BACKFILL_GZIP_LEVEL = int(os.getenv('BACKFILL_GZIP_LEVEL', '6'))
+    BACKFILL_STATE_DIR = os.getenv(
+        'BACKFILL_STATE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'backfill')
+    )  # resume checkpoints, kept apart from the (possibly read-only) input files
     
     # FIP Configuration
     ENABLE_BACKGROUND_TASKS = os.getenv('ENABLE_BACKGROUND_TASKS', 'true').lower() == 'true'
+    FIP_REGISTRY_SOURCE = os.getenv('FIP_REGISTRY_SOURCE', 'default')  # default | synthetic | path to JSON/YAML
+    FIP_REGISTRY_SEED = int(os.getenv('FIP_REGISTRY_SEED', '42'))
+    METRICS_HISTORY_CAPACITY = int(os.getenv('METRICS_HISTORY_CAPACITY', '100'))  # simulated points kept per FIP
     
     @staticmethod
     def get_fip_config():
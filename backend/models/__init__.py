@@ -1,3 +1,44 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from utils.enums import AlertStatus
 
 db = SQLAlchemy()
+
+
+def ensure_schema():
+    """
+    Bring existing tables up to date with the models.
+
+    db.create_all() only creates missing tables, so columns and indexes added to a
+    model later are applied here (additive changes only), along with the data
+    migrations listed below.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                    ))
+
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Alerts raised before the firing/resolved lifecycle were stored as 'active'
+    alert_table = db.metadata.tables.get('alert')
+    if alert_table is not None and inspector.has_table(alert_table.name):
+        with engine.begin() as conn:
+            conn.execute(
+                alert_table.update()
+                .where(alert_table.c.status == 'active')
+                .values(status=AlertStatus.FIRING.value)
+            )
@@ -1,11 +1,24 @@
 from datetime import datetime
 import json
+from utils.enums import AlertStatus
 from . import db
 
 class Alert(db.Model):
     """Store alerts in database"""
+    __table_args__ = (
+        # Active alerts per FIP, newest first
+        db.Index('ix_alert_fip_status_timestamp', 'fip_name', 'status', 'timestamp'),
+        # Severity dashboards and webhook replays over a time range
+        db.Index('ix_alert_severity_timestamp', 'severity', 'timestamp'),
+        # Retention sweeps over resolved alerts
+        db.Index('ix_alert_status_resolved_at', 'status', 'resolved_at'),
+        # Lifecycle lookups by condition
+        db.Index('ix_alert_fingerprint_status', 'fingerprint', 'status'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     alert_id = db.Column(db.String(100), unique=True, nullable=False)
+    fingerprint = db.Column(db.String(16), nullable=True)  # stable id of the alert condition
     fip_name = db.Column(db.String(50), nullable=False)
     severity = db.Column(db.String(20), nullable=False)  # critical, warning, info
     alert_type = db.Column(db.String(50), nullable=False)
@@ -15,7 +28,8 @@ class Alert(db.Model):
     recommended_actions = db.Column(db.JSON, nullable=False)  # Store actions as JSON array
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     confidence = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='active')  # active, resolved
+    status = db.Column(db.String(20), default=AlertStatus.FIRING.value)  # firing, resolved
+    last_seen_at = db.Column(db.DateTime, nullable=True)  # last evaluation pass that reported it
     resolved_at = db.Column(db.DateTime, nullable=True)
     resolution_note = db.Column(db.Text, nullable=True)
 
@@ -23,6 +37,7 @@ class Alert(db.Model):
         """Convert alert to dictionary"""
         return {
             'alert_id': self.alert_id,
+            'fingerprint': self.fingerprint,
             'fip_name': self.fip_name,
             'severity': self.severity,
             'alert_type': self.alert_type,
@@ -33,6 +48,7 @@ class Alert(db.Model):
             'timestamp': self.timestamp.isoformat(),
             'confidence': self.confidence,
             'status': self.status,
+            'last_seen_at': self.last_seen_at.isoformat() if self.last_seen_at else None,
             'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
             'resolution_note': self.resolution_note
         } 
\ No newline at end of file
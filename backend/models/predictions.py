@@ -1,26 +1,111 @@
 from datetime import datetime
-from utils import PredictionType, FIPStatus
+from utils import PredictionType, FIPStatus, GenerationStatus
 from . import db
 
+class PredictionGeneration(db.Model):
+    """A complete set of predictions written together and promoted atomically"""
+    __tablename__ = 'prediction_generation'
+    __table_args__ = (
+        db.Index('ix_prediction_generation_type_status', 'prediction_type', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    prediction_type = db.Column(db.Enum(PredictionType), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=GenerationStatus.BUILDING.value)  # building, active, superseded
+    fip_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    promoted_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'prediction_type': self.prediction_type.value,
+            'status': self.status,
+            'fip_count': self.fip_count,
+            'created_at': self.created_at.isoformat(),
+            'promoted_at': self.promoted_at.isoformat() if self.promoted_at else None
+        }
+
 class Prediction(db.Model):
     """Store AI predictions for FIPs"""
+    __table_args__ = (
+        # Latest prediction per FIP: WHERE prediction_type = ? AND fip_name IN (...) ORDER BY created_at DESC
+        db.Index('ix_prediction_type_fip_created', 'prediction_type', 'fip_name', 'created_at'),
+        db.Index('ix_prediction_generation', 'generation_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    generation_id = db.Column(db.Integer, nullable=True)  # PredictionGeneration that wrote this row
     fip_name = db.Column(db.String(50), nullable=False)
     prediction_type = db.Column(db.Enum(PredictionType), nullable=False)
     probability = db.Column(db.Float, nullable=False)
     time_window = db.Column(db.String(100), nullable=False)
     confidence = db.Column(db.String(20), nullable=False)  # high, medium, low
+    reasoning = db.Column(db.Text)
+    risk_level = db.Column(db.String(20))
+    health_score = db.Column(db.Float)
     raw_prediction = db.Column(db.Text)  # JSON string of full prediction
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
             'id': self.id,
+            'generation_id': self.generation_id,
+            'fip_name': self.fip_name,
+            'prediction_type': self.prediction_type.value,
+            'probability': self.probability,
+            'time_window': self.time_window,
+            'confidence': self.confidence,
+            'reasoning': self.reasoning,
+            'risk_level': self.risk_level,
+            'health_score': self.health_score,
+            'created_at': self.created_at.isoformat()
+        }
+
+class LatestPrediction(db.Model):
+    """Latest prediction per (prediction_type, FIP), maintained when predictions are written"""
+    __tablename__ = 'latest_prediction'
+
+    prediction_type = db.Column(db.Enum(PredictionType), primary_key=True)
+    fip_name = db.Column(db.String(50), primary_key=True)
+    prediction_id = db.Column(db.Integer, nullable=True)  # source Prediction row
+    generation_id = db.Column(db.Integer, nullable=True)  # promoted PredictionGeneration
+    probability = db.Column(db.Float, nullable=False)
+    time_window = db.Column(db.String(100), nullable=False)
+    confidence = db.Column(db.String(20), nullable=False)
+    reasoning = db.Column(db.Text)
+    risk_level = db.Column(db.String(20))
+    health_score = db.Column(db.Float)
+    raw_prediction = db.Column(db.Text)  # JSON string of full prediction, served without decoding
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def from_prediction(cls, prediction: Prediction) -> 'LatestPrediction':
+        return cls(
+            prediction_type=prediction.prediction_type,
+            fip_name=prediction.fip_name,
+            prediction_id=prediction.id,
+            generation_id=prediction.generation_id,
+            probability=prediction.probability,
+            time_window=prediction.time_window,
+            confidence=prediction.confidence,
+            reasoning=prediction.reasoning,
+            risk_level=prediction.risk_level,
+            health_score=prediction.health_score,
+            raw_prediction=prediction.raw_prediction,
+            created_at=prediction.created_at
+        )
+
+    def to_dict(self):
+        return {
             'fip_name': self.fip_name,
             'prediction_type': self.prediction_type.value,
             'probability': self.probability,
             'time_window': self.time_window,
             'confidence': self.confidence,
+            'reasoning': self.reasoning,
+            'risk_level': self.risk_level,
+            'health_score': self.health_score,
             'created_at': self.created_at.isoformat()
         }
 
@@ -44,4 +129,31 @@ class FIPMetrics(db.Model):
             'error_rate': self.error_rate,
             'current_status': self.current_status.value,
             'timestamp': self.timestamp.isoformat()
-        }
\ No newline at end of file
+        }
+
+class PredictionTimeline(db.Model):
+    """Hourly downtime timeline, precomputed when predictions are written"""
+    __tablename__ = 'prediction_timeline'
+    __table_args__ = (
+        db.Index('ix_prediction_timeline_generation_hour', 'generation_id', 'hour', 'fip_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    generation_id = db.Column(db.Integer, nullable=True)  # PredictionGeneration that wrote this row
+    fip_name = db.Column(db.String(50), nullable=False)
+    hour = db.Column(db.Integer, nullable=False)  # hours from prediction time
+    probability = db.Column(db.Float, nullable=False)
+    confidence = db.Column(db.String(20), nullable=False)
+    reasoning = db.Column(db.Text)
+    time_window = db.Column(db.String(100), nullable=False)
+    is_maintenance = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'probability': self.probability,
+            'confidence': self.confidence,
+            'reasoning': self.reasoning or '',
+            'isMaintenence': self.is_maintenance,
+            'timeWindow': self.time_window,
+        }
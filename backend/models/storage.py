@@ -0,0 +1,161 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+from utils.logger import logger
+from . import db
+
+
+# ================================
+# ENGINE CONFIGURATION
+# ================================
+
+def _is_sqlite_file(uri: str) -> bool:
+    return uri.startswith('sqlite') and ':memory:' not in uri and uri.rstrip('/') not in ('sqlite:', 'sqlite:/')
+
+
+def configure_storage(app) -> None:
+    """
+    Set engine options before db.init_app(app).
+
+    For SQLite files the pool is sized for request threads plus background writers,
+    and every new connection is switched to WAL with tuned pragmas (see _on_connect),
+    so readers keep reading while the writer thread commits. pysqlite's default
+    transaction handling is kept: plain SELECTs never hold a read snapshot open.
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('pool_pre_ping', True)
+
+    if _is_sqlite_file(uri):
+        options.setdefault('pool_size', Config.DB_POOL_SIZE)
+        options.setdefault('max_overflow', Config.DB_MAX_OVERFLOW)
+        options.setdefault('pool_timeout', Config.DB_POOL_TIMEOUT)
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args.setdefault('check_same_thread', False)
+        connect_args.setdefault('timeout', Config.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        options['connect_args'] = connect_args
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        if Config.SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{Config.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+# ================================
+# SINGLE WRITER
+# ================================
+
+class DatabaseWriter:
+    """
+    Serializes background writes through one thread and commits them in batches.
+
+    Jobs are callables that use db.session without committing. The writer drains up to
+    DB_WRITE_BATCH_SIZE queued jobs (waiting at most DB_WRITE_FLUSH_INTERVAL seconds) and
+    commits the batch once. If anything in a batch fails, the batch is rolled back and its
+    jobs are replayed one transaction each, so a failing job only affects itself.
+    Until start() is called jobs run inline in the caller's session.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.logger = logger
+        self.batch_size = batch_size or Config.DB_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else Config.DB_WRITE_FLUSH_INTERVAL
+        self._queue: "queue.Queue[Tuple[Callable[[], Any], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app) -> None:
+        if self.running:
+            return
+        self._app = app
+        self._thread = threading.Thread(target=self._worker, name='db-writer', daemon=True)
+        self._thread.start()
+        self.logger.info("✍️ Database writer started")
+
+    def submit(self, job: Callable[[], Any]) -> Future:
+        """Queue a write job; the returned future resolves after its batch commits"""
+        future: Future = Future()
+        if self.running:
+            self._queue.put((job, future))
+            return future
+
+        try:
+            result = job()
+            db.session.commit()
+            future.set_result(result)
+        except Exception as e:
+            db.session.rollback()
+            future.set_exception(e)
+        return future
+
+    def run(self, job: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Submit a job and wait for its result"""
+        return self.submit(job).result(timeout)
+
+    def _next_batch(self) -> List[Tuple[Callable[[], Any], Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, batch: List[Tuple[Callable[[], Any], Future]]) -> None:
+        results = [job() for job, _ in batch]
+        db.session.commit()
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _worker(self) -> None:
+        with self._app.app_context():
+            while True:
+                batch = self._next_batch()
+                try:
+                    self._run_batch(batch)
+                    continue
+                except Exception as e:
+                    db.session.rollback()
+                    if len(batch) == 1:
+                        batch[0][1].set_exception(e)
+                        continue
+                    self.logger.warning(f"Write batch of {len(batch)} failed ({e}), replaying jobs individually")
+
+                for item in batch:
+                    try:
+                        self._run_batch([item])
+                    except Exception as e:
+                        db.session.rollback()
+                        item[1].set_exception(e)
+
+
+db_writer = DatabaseWriter()
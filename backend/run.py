@@ -92,6 +92,13 @@ def start_services():
     
     return True
 
+def start_ingest():
+    """Start the single process that keeps the shared metrics matrix current"""
+    print("🧮 Starting shared metrics matrix ingest...")
+    from services.shared_matrix import ingest_main
+    ingest_main()
+    return True
+
 def start_with_docker():
     """Start services using Docker Compose"""
     print("🐳 Starting with Docker Compose...")
@@ -135,6 +142,8 @@ def main():
     
     if len(sys.argv) > 1 and sys.argv[1] == "docker":
         success = start_with_docker()
+    elif len(sys.argv) > 1 and sys.argv[1] == "ingest":
+        success = start_ingest()
     else:
         success = start_services()
     
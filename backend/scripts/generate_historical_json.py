@@ -1,4 +1,5 @@
 from services.backfill_historical_data import GenerateHistoricalData
+from services.synthetic_history import synthetic_fips
 from utils.logger import logger
 import argparse
 
@@ -6,11 +7,16 @@ def main():
     parser = argparse.ArgumentParser(description="Generate historical FIP metrics JSON file.")
     parser.add_argument("--days", type=int, default=30, help="Number of days back to generate")
     parser.add_argument("--interval", type=int, default=15, help="Interval in minutes between points")
-    parser.add_argument("--output", type=str, default="fip_metrics_historical.json", help="Output JSON file path")
+    parser.add_argument("--output", type=str, default="fip_metrics_historical.json",
+                        help="Output file path (.json array, .jsonl or .parquet; .gz compresses JSON)")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducible data")
+    parser.add_argument("--fips", type=int, default=None, help="Number of FIPs (default: the 11 sample FIPs)")
     args = parser.parse_args()
 
     gen = GenerateHistoricalData()
-    gen.export_to_file(days_back=args.days, interval_minutes=args.interval, output_file=args.output)
+    if args.fips:
+        gen.fips = synthetic_fips(args.fips)
+    gen.export_to_file(days_back=args.days, interval_minutes=args.interval, output_file=args.output, seed=args.seed)
     logger.info(f"Historical metrics JSON generated at {args.output}")
 
 if __name__ == "__main__":
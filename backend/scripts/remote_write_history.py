@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import argparse
+import json
+from services.remote_write import RemoteWriteClient, StubRemoteWriteReceiver
+from services.synthetic_history import METRIC_NAMES, SyntheticHistoryGenerator, synthetic_fips
+from services.vm_importer import HISTORY_METRICS, iter_history_entries
+from utils.logger import logger
+
+
+def write_synthetic(client: RemoteWriteClient, n_fips: int, days: int, interval: int, seed=None) -> None:
+    """Synthetic history straight from the generator's blocks, one write per series and block"""
+    generator = SyntheticHistoryGenerator(fips=synthetic_fips(n_fips), seed=seed)
+    end_time = datetime.now()
+    n_steps = int(timedelta(days=days) / timedelta(minutes=interval)) + 1
+    columns = [(metric_name, METRIC_NAMES.index(key), extra_labels) for metric_name, key, extra_labels in HISTORY_METRICS]
+
+    for block in generator.iter_blocks(end_time - timedelta(days=days), n_steps, interval):
+        timestamps_ms = block.timestamps * 1000
+        for f, (fip_name, bank_name) in enumerate(generator.fips.items()):
+            present = block.present[:, f]
+            if not present.any():
+                continue
+            for metric_name, m, extra_labels in columns:
+                labels = {'__name__': metric_name, 'fip_name': fip_name, 'bank_name': bank_name, **extra_labels}
+                client.write(labels, block.values[present, f, m], timestamps_ms[present])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send FIP history over Prometheus remote write.")
+    parser.add_argument("--url", type=str, default=None,
+                        help="Remote write URL, e.g. http://localhost:8428/api/v1/write (default: a local stub receiver)")
+    parser.add_argument("--input", type=str, default=None, help="History file (.json, .jsonl(.gz) or .parquet)")
+    parser.add_argument("--fips", type=int, default=11, help="Synthetic FIPs when no --input is given")
+    parser.add_argument("--days", type=int, default=7, help="Synthetic days of history")
+    parser.add_argument("--interval", type=int, default=15, help="Synthetic interval in minutes")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for the synthetic history")
+    parser.add_argument("--shards", type=int, default=None, help="Parallel sender shards")
+    parser.add_argument("--max-samples-per-send", type=int, default=None, help="Samples per request")
+    args = parser.parse_args()
+
+    stub = None
+    url = args.url
+    if url is None:
+        stub = StubRemoteWriteReceiver().start()
+        url = stub.url
+        logger.info(f"🧪 No --url given, sending to a stub receiver at {url}")
+
+    client = RemoteWriteClient(url, shards=args.shards, max_samples_per_send=args.max_samples_per_send).start()
+    if args.input:
+        client.write_entries(iter_history_entries(args.input))
+    else:
+        write_synthetic(client, args.fips, args.days, args.interval, args.seed)
+    stats = client.close()
+
+    report = stats.to_dict()
+    if stub is not None:
+        report['stub'] = {'requests': stub.requests, 'series': len(stub.series), 'samples': stub.samples}
+        stub.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from utils.enums import AlertStatus
+from utils.logger import logger
+
+
+@dataclass
+class AlertEvaluation:
+    """Outcome of a single alert evaluation pass"""
+    evaluated_at: str
+    firing: List[Any] = field(default_factory=list)    # every alert currently firing, sorted
+    new: List[Any] = field(default_factory=list)       # alerts that started firing in this pass
+    resolved: List[Any] = field(default_factory=list)  # alerts that stopped firing in this pass
+
+
+class AlertLifecycleEngine:
+    """
+    Tracks alerts across evaluation passes using stable fingerprints.
+
+    A fingerprint identifies an ongoing condition by (fip_name, alert_type, severity).
+    While a fingerprint keeps firing it keeps the same alert_id and start timestamp,
+    so repeated polls update one alert instead of minting a new one each time.
+    Fingerprints missing from a pass transition to resolved.
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self._active: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(fip_name: str, alert_type: str, severity: str) -> str:
+        """Stable identifier for an alert condition"""
+        key = f"{fip_name}:{alert_type}:{severity}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    def evaluate(self, candidates: List[Any], evaluated_at: Optional[datetime] = None) -> AlertEvaluation:
+        """
+        Apply one evaluation pass.
+
+        Candidates are deduplicated by fingerprint (first one wins) and the firing set
+        is sorted once by severity and confidence, mirroring the previous per-FIP behaviour.
+        """
+        now = evaluated_at or datetime.utcnow()
+
+        # Deduplicate once for the whole pass
+        unique: Dict[str, Any] = {}
+        for alert in candidates:
+            fingerprint = self.fingerprint(alert.fip_name, alert.alert_type, alert.severity)
+            if fingerprint not in unique:
+                unique[fingerprint] = alert
+
+        evaluation = AlertEvaluation(evaluated_at=now.isoformat())
+
+        with self._lock:
+            for fingerprint, alert in unique.items():
+                previous = self._active.get(fingerprint)
+                if previous is None:
+                    # firing: new episode for this condition
+                    current = replace(
+                        alert,
+                        alert_id=f"alert_{fingerprint}_{int(now.timestamp())}",
+                        fingerprint=fingerprint,
+                        status=AlertStatus.FIRING.value,
+                        timestamp=now.isoformat()
+                    )
+                    evaluation.new.append(current)
+                else:
+                    # still firing: keep identity, refresh details
+                    current = replace(
+                        alert,
+                        alert_id=previous.alert_id,
+                        fingerprint=fingerprint,
+                        status=AlertStatus.FIRING.value,
+                        timestamp=previous.timestamp
+                    )
+                self._active[fingerprint] = current
+                evaluation.firing.append(current)
+
+            for fingerprint in [f for f in self._active if f not in unique]:
+                resolved = replace(self._active.pop(fingerprint), status=AlertStatus.RESOLVED.value)
+                evaluation.resolved.append(resolved)
+
+        # Sort once by severity and confidence
+        evaluation.firing.sort(key=lambda x: (x.severity == 'critical', x.confidence), reverse=True)
+
+        if evaluation.new or evaluation.resolved:
+            self.logger.info(
+                f"🔔 Alert evaluation: {len(evaluation.firing)} firing, "
+                f"{len(evaluation.new)} new, {len(evaluation.resolved)} resolved"
+            )
+
+        return evaluation
+
+    def restore(self, alerts: List[Any]) -> int:
+        """Resume tracking alerts that were firing before a restart (the first alert per fingerprint wins)"""
+        restored = 0
+        with self._lock:
+            for alert in alerts:
+                if alert.fingerprint and alert.fingerprint not in self._active:
+                    self._active[alert.fingerprint] = alert
+                    restored += 1
+        return restored
+
+    def get_active_alerts(self) -> List[Any]:
+        """Return the alerts that are currently firing"""
+        with self._lock:
+            return list(self._active.values())
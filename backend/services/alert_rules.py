@@ -0,0 +1,429 @@
+import ast
+import operator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from string import Template
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+import yaml
+from utils.logger import logger
+
+
+# ================================
+# ALIGNED METRIC MATRIX
+# ================================
+
+@dataclass
+class MetricMatrix:
+    """
+    Metrics for a set of FIPs aligned on a common time axis.
+
+    ``window[metric]`` is a (FIP x time) float array with NaN where a FIP has no sample,
+    ``current[key]`` is a per-FIP vector taken from the live metrics dicts.
+    """
+    fip_names: List[str]
+    window: Dict[str, np.ndarray]
+    current: Dict[str, np.ndarray]
+    timestamps: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, historical_data: Dict[str, pd.DataFrame], current_metrics: Dict[str, Dict],
+              window_minutes: int, now: Optional[datetime] = None) -> 'MetricMatrix':
+        """Align the last ``window_minutes`` of every metric across all FIPs in current_metrics"""
+        fip_names = list(current_metrics.keys())
+        fip_index = pd.Index(fip_names)
+        cutoff = (now or datetime.utcnow()) - timedelta(minutes=window_minutes)
+
+        window = {}
+        timestamps = {}
+        for metric_name, df in historical_data.items():
+            if df.empty:
+                continue
+
+            recent = df[df.index >= cutoff]
+            rows = fip_index.get_indexer(recent['fip_name'])
+            keep = rows >= 0
+            times, cols = np.unique(recent.index.values[keep], return_inverse=True)
+
+            matrix = np.full((len(fip_names), len(times)), np.nan)
+            matrix[rows[keep], cols] = recent['value'].to_numpy(dtype=float)[keep]
+            window[metric_name] = matrix
+            timestamps[metric_name] = times
+
+        if hasattr(current_metrics, 'numeric_columns'):
+            # Array-backed metrics view (MetricsService): no per-FIP dicts needed
+            return cls(fip_names=fip_names, window=window, current=current_metrics.numeric_columns(),
+                       timestamps=timestamps)
+
+        current = {}
+        numeric_keys = {
+            key for metrics in current_metrics.values() for key, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        for key in numeric_keys:
+            current[key] = np.array(
+                [float(current_metrics[fip].get(key, 0) or 0) for fip in fip_names]
+            )
+
+        return cls(fip_names=fip_names, window=window, current=current, timestamps=timestamps)
+
+
+# ================================
+# VECTORIZED WINDOW FUNCTIONS
+# ================================
+
+def _count(x: np.ndarray) -> np.ndarray:
+    return np.sum(~np.isnan(x), axis=1)
+
+
+def _mean(x: np.ndarray, default: Any = 0.0) -> np.ndarray:
+    counts = _count(x)
+    totals = np.nansum(x, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals / np.maximum(counts, 1), default)
+
+
+def _std(x: np.ndarray) -> np.ndarray:
+    """Sample standard deviation per FIP (ddof=1, like pandas)"""
+    counts = _count(x)
+    mean = _mean(x)
+    squares = np.nansum((x - mean[:, None]) ** 2, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 1, np.sqrt(squares / np.maximum(counts - 1, 1)), np.nan)
+
+
+def _positions(x: np.ndarray):
+    """Position of each valid sample within its FIP's own series (gaps are skipped)"""
+    valid = ~np.isnan(x)
+    return valid, np.cumsum(valid, axis=1) - 1, valid.sum(axis=1)
+
+
+def _trend(x: np.ndarray) -> np.ndarray:
+    """Least-squares slope scaled by series length, per FIP"""
+    valid, pos, n = _positions(x)
+    xs = np.where(valid, pos, 0).astype(float)
+    ys = np.where(valid, x, 0.0)
+    sx, sy = xs.sum(axis=1), ys.sum(axis=1)
+    sxx, sxy = (xs * xs).sum(axis=1), (xs * ys).sum(axis=1)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(denominator != 0, (n * sxy - sx * sy) / denominator, 0.0)
+    return np.where(n >= 2, slope * n, 0.0)
+
+
+def _rolling_trend(x: np.ndarray, window_minutes: float, sample_minutes: float = 5) -> np.ndarray:
+    """Percentage change between the first and the last rolling-window mean, per FIP"""
+    window = max(int(window_minutes // sample_minutes), 1)
+    valid, pos, n = _positions(x)
+    first = valid & (pos < window)
+    last = valid & (pos >= (n - window)[:, None])
+    first_mean = _mean(np.where(first, x, np.nan))
+    last_mean = _mean(np.where(last, x, np.nan))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (last_mean - first_mean) / first_mean * 100
+    return np.where((n >= max(window, 2)) & (first_mean != 0), change, 0.0)
+
+
+def _cv(x: np.ndarray) -> np.ndarray:
+    """Coefficient of variation in percent, per FIP"""
+    mean = _mean(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(mean > 0, _std(x) / mean * 100, 0.0)
+
+
+def _has_data(x: np.ndarray) -> np.ndarray:
+    return _count(x) > 0
+
+
+def _available(x: np.ndarray) -> np.ndarray:
+    return np.ones(x.shape[0], dtype=bool)
+
+
+FUNCTIONS: Dict[str, Callable] = {
+    'mean': _mean,
+    'std': _std,
+    'trend': _trend,
+    'rolling_trend': _rolling_trend,
+    'cv': _cv,
+    'count': _count,
+    'has_data': _has_data,
+    'available': _available,
+    'abs': np.abs,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+}
+
+
+# ================================
+# EXPRESSION COMPILER
+# ================================
+
+_BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+}
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+
+class RuleCompileError(ValueError):
+    """Raised when a rule expression uses unsupported syntax"""
+
+
+def compile_expression(expression: str, namespaces: List[str]) -> Callable[[Dict], Any]:
+    """
+    Compile a rule expression into a function of the evaluation context.
+
+    The result operates on whole per-FIP arrays, so a rule is evaluated for every
+    FIP with a handful of NumPy operations instead of a Python loop.
+    """
+    try:
+        tree = ast.parse(str(expression), mode='eval')
+    except SyntaxError as e:
+        raise RuleCompileError(f"Invalid expression '{expression}': {e}")
+
+    def attribute_path(node) -> List[str]:
+        if isinstance(node, ast.Name):
+            return [node.id]
+        if isinstance(node, ast.Attribute):
+            return attribute_path(node.value) + [node.attr]
+        raise RuleCompileError(f"Unsupported reference in '{expression}'")
+
+    def build(node) -> Callable[[Dict], Any]:
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda ctx: value
+
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            path = attribute_path(node)
+            if path[0] not in namespaces:
+                raise RuleCompileError(f"Unknown name '{path[0]}' in '{expression}'")
+
+            def lookup(ctx):
+                value = ctx
+                for key in path:
+                    value = value[key]
+                return value
+            return lookup
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            op = _BINARY_OPS[type(node.op)]
+            left, right = build(node.left), build(node.right)
+
+            def binary(ctx):
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    return op(left(ctx), right(ctx))
+            return binary
+
+        if isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda ctx: np.negative(operand(ctx))
+            if isinstance(node.op, ast.Not):
+                return lambda ctx: np.logical_not(operand(ctx))
+
+        if isinstance(node, ast.BoolOp):
+            reducer = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            operands = [build(value) for value in node.values]
+
+            def boolean(ctx):
+                result = operands[0](ctx)
+                for operand in operands[1:]:
+                    result = reducer(result, operand(ctx))
+                return result
+            return boolean
+
+        if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPS for op in node.ops):
+            terms = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = [_COMPARE_OPS[type(op)] for op in node.ops]
+
+            def compare(ctx):
+                values = [term(ctx) for term in terms]
+                result = ops[0](values[0], values[1])
+                for i in range(1, len(ops)):
+                    result = np.logical_and(result, ops[i](values[i], values[i + 1]))
+                return result
+            return compare
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+            function = FUNCTIONS[node.func.id]
+            args = [build(arg) for arg in node.args]
+            return lambda ctx: function(*[arg(ctx) for arg in args])
+
+        raise RuleCompileError(f"Unsupported syntax in '{expression}': {ast.dump(node)}")
+
+    return build(tree.body)
+
+
+# ================================
+# RULES
+# ================================
+
+@dataclass
+class RuleMatch:
+    """A rule that fired for one FIP"""
+    rule_name: str
+    alert_type: str
+    fip_index: int
+    fip_name: str
+    severity: str
+    values: Dict[str, float]
+    labels: Dict[str, str]
+    message_template: str
+    actions: List[str]
+    actions_profile: Optional[str]
+    confidence: float
+
+
+@dataclass
+class CompiledRule:
+    """A declarative alert rule compiled to vectorized expressions"""
+    name: str
+    alert_type: str
+    condition: Callable
+    severity: List[tuple]
+    values: Dict[str, Callable]
+    labels: Dict[str, List[tuple]]
+    message: str
+    actions: List[str] = field(default_factory=list)
+    actions_profile: Optional[str] = None
+    confidence: float = 0.95
+
+
+class AlertRuleEngine:
+    """
+    Loads alert rules from a YAML file, compiles their expressions once and
+    evaluates every rule across all FIPs in a single pass over a MetricMatrix.
+    """
+
+    NAMESPACES = ['current', 'window', 'thresholds', 'baselines', 'trend_thresholds', 'time_windows', 'settings']
+
+    def __init__(self, rules_file: str):
+        self.logger = logger
+        self.rules_file = rules_file
+
+        with open(rules_file, 'r') as f:
+            config = yaml.safe_load(f) or {}
+
+        self.parameters = config.get('parameters', {})
+        self.rules = [compiled for spec in config.get('rules', []) for compiled in self._compile_rule(spec)]
+
+        self.logger.info(f"📐 Loaded {len(self.rules)} alert rules from {rules_file}")
+
+    def _compile_rule(self, spec: Dict) -> List[CompiledRule]:
+        """Compile a rule spec, expanding it once per entry in its ``metrics`` list"""
+        if not isinstance(spec, dict) or not spec.get('name') or not spec.get('when'):
+            raise RuleCompileError(f"Rule {spec!r} needs a name and a when expression")
+        metrics = spec.get('metrics') or [None]
+        compiled = []
+
+        for metric in metrics:
+            substitutions = {'metric': metric or '', 'metric_label': (metric or '').replace('_', ' ')}
+
+            def expand(text: Any) -> Any:
+                return Template(text).safe_substitute(substitutions) if isinstance(text, str) else text
+
+            def compile_cases(cases: Any) -> List[tuple]:
+                if not isinstance(cases, list):
+                    return [(None, cases)]
+                return [
+                    (compile_expression(expand(case['when']), self.NAMESPACES) if case.get('when') else None,
+                     case['value'])
+                    for case in cases
+                ]
+
+            compiled.append(CompiledRule(
+                name=expand(spec['name']),
+                alert_type=spec.get('alert_type', spec['name']),
+                condition=compile_expression(expand(spec['when']), self.NAMESPACES),
+                severity=compile_cases(spec.get('severity', 'warning')),
+                values={
+                    key: compile_expression(expand(expression), self.NAMESPACES)
+                    for key, expression in spec.get('values', {}).items()
+                },
+                labels={key: compile_cases(cases) for key, cases in spec.get('labels', {}).items()},
+                message=expand(spec.get('message', '')),
+                actions=[expand(action) for action in spec.get('actions', [])],
+                actions_profile=expand(spec.get('actions_profile')),
+                confidence=float(spec.get('confidence', 0.95))
+            ))
+
+        return compiled
+
+    def _context(self, matrix: MetricMatrix) -> Dict[str, Any]:
+        context = {namespace: self.parameters.get(namespace, {}) for namespace in self.NAMESPACES}
+        context['current'] = matrix.current
+        context['window'] = matrix.window
+        return context
+
+    @staticmethod
+    def _broadcast(value: Any, size: int) -> np.ndarray:
+        return np.broadcast_to(np.asarray(value), (size,))
+
+    def _select(self, cases: List[tuple], context: Dict, size: int) -> np.ndarray:
+        """Pick the first case whose condition holds, per FIP"""
+        conditions, choices = [], []
+        for condition, value in cases:
+            if condition is None:
+                conditions.append(np.ones(size, dtype=bool))
+            else:
+                conditions.append(self._broadcast(condition(context), size).astype(bool))
+            choices.append(np.full(size, value, dtype=object))
+        return np.select(conditions, choices, default=None)
+
+    def evaluate(self, matrix: MetricMatrix) -> List[RuleMatch]:
+        """Evaluate every rule for every FIP and return the matches"""
+        size = len(matrix.fip_names)
+        if size == 0:
+            return []
+
+        context = self._context(matrix)
+        matches = []
+
+        for rule in self.rules:
+            try:
+                fired = self._broadcast(rule.condition(context), size).astype(bool)
+                if not fired.any():
+                    continue
+
+                severity = self._select(rule.severity, context, size)
+                values = {
+                    key: self._broadcast(expression(context), size).astype(float)
+                    for key, expression in rule.values.items()
+                }
+                labels = {key: self._select(cases, context, size) for key, cases in rule.labels.items()}
+
+            except KeyError as e:
+                # Metric not available in this pass (e.g. no historical data yet)
+                self.logger.debug(f"Skipping rule {rule.name}: missing metric {e}")
+                continue
+            except Exception as e:
+                self.logger.error(f"Error evaluating rule {rule.name}: {e}")
+                continue
+
+            for i in np.flatnonzero(fired):
+                matches.append(RuleMatch(
+                    rule_name=rule.name,
+                    alert_type=rule.alert_type,
+                    fip_index=int(i),
+                    fip_name=matrix.fip_names[i],
+                    severity=str(severity[i]),
+                    values={key: float(array[i]) for key, array in values.items()},
+                    labels={key: str(array[i]) for key, array in labels.items()},
+                    message_template=rule.message,
+                    actions=rule.actions,
+                    actions_profile=rule.actions_profile,
+                    confidence=rule.confidence
+                ))
+
+        return matches
@@ -2,14 +2,19 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from utils.logger import logger
 import requests
 from models.webhook import WebhookSubscription
 from models.alert import Alert as AlertModel
 from models import db
+from models.storage import db_writer
 import json
+import threading
 from config import Config
+from services.alert_lifecycle import AlertLifecycleEngine, AlertEvaluation
+from services.alert_rules import AlertRuleEngine, MetricMatrix, RuleMatch, FUNCTIONS
+from utils.enums import AlertStatus
 
 @dataclass
 class AlertMetrics:
@@ -37,147 +42,177 @@ class Alert:
     recommended_actions: List[str]
     timestamp: str
     confidence: float
+    fingerprint: Optional[str] = None
+    status: str = AlertStatus.FIRING.value
 
 class AlertService:
     """Service for generating proactive alerts based on FIP metrics"""
+
+    STORE_CHUNK_SIZE = 500
     
     def __init__(self):
         self.logger = logger
         
+        # Declarative alert rules, compiled once and evaluated across all FIPs per pass
+        self.rule_engine = AlertRuleEngine(Config.ALERT_RULES_FILE)
+        parameters = self.rule_engine.parameters
+
         # Alert thresholds
-        self.thresholds = {
-            'consent_success_rate': {
-                'critical': 70,
-                'warning': 85
-            },
-            'data_fetch_success_rate': {
-                'critical': 65,
-                'warning': 80
-            },
-            'response_time': {
-                'critical': 5.0,  # seconds
-                'warning': 3.0
-            }
-        }
-        
+        self.thresholds = parameters.get('thresholds', {})
+
         # Performance baseline expectations
-        self.baselines = {
-            'consent_success_rate': 95.0,
-            'data_fetch_success_rate': 90.0,
-            'response_time': 2.0
-        }
+        self.baselines = parameters.get('baselines', {})
 
         # Time windows for analysis (in minutes)
-        self.time_windows = {
-            'short_term': 180,  # 3 hours
-            'medium_term': 720,  # 12 hours
-            'long_term': 1440   # 24 hours
-        }
+        self.time_windows = parameters.get('time_windows', {})
 
         # Trend thresholds (percentage change)
-        self.trend_thresholds = {
-            'rapid_decline': -10.0,  # 10% decline in 3 hours
-            'gradual_decline': -5.0,  # 5% decline in 3 hours
-            'improvement': 5.0        # 5% improvement
-        }
+        self.trend_thresholds = parameters.get('trend_thresholds', {})
+
+        # Alert lifecycle tracking (firing/resolved) across evaluation passes
+        self.lifecycle = AlertLifecycleEngine()
+        self.last_evaluation: Optional[AlertEvaluation] = None
+
+        # Set once a committed pass has resolved the firing rows this process isn't tracking
+        self._orphans_resolved = threading.Event()
     
-    def notify_webhooks(self, alert_id: str) -> None:
-        """Send alert to all enabled webhook subscriptions"""
+    def notify_webhooks(self, alert) -> None:
+        """Send an alert (an Alert, or the alert_id of a stored one) to all enabled webhook subscriptions"""
         try:
-            # Get alert from database
-            alert_record = AlertModel.query.filter_by(alert_id=alert_id).first()
-            if not alert_record:
-                raise ValueError(f"Alert {alert_id} not found")
-
-            # Convert database record to Alert object
-            alert = Alert(
-                alert_id=alert_record.alert_id,
-                fip_name=alert_record.fip_name,
-                severity=alert_record.severity,
-                alert_type=alert_record.alert_type,
-                message=alert_record.message,
-                metrics=AlertMetrics(**alert_record.metrics),
-                context=AlertContext(**alert_record.context),
-                recommended_actions=alert_record.recommended_actions,
-                timestamp=alert_record.timestamp.isoformat(),
-                confidence=alert_record.confidence
-            )
+            if isinstance(alert, str):
+                alert_record = AlertModel.query.filter_by(alert_id=alert).first()
+                if not alert_record:
+                    raise ValueError(f"Alert {alert} not found")
+                alert = self._alert_from_record(alert_record)
             
             # Get all enabled webhooks that match the alert type
             subscriptions = WebhookSubscription.query.filter_by(enabled=True).all()
-            
-            for subscription in subscriptions:
-                if alert.severity in subscription.alert_types:
-                    try:
-                        # Prepare notification payload
-                        payload = {
-                            'alert_id': alert.alert_id,
-                            'type': alert.alert_type,
-                            'severity': alert.severity,
-                            'fip_name': alert.fip_name,
-                            'message': alert.message,
-                            'metrics': {
-                                'current_rate': alert.metrics.current_rate,
-                                'historical_avg': alert.metrics.historical_avg,
-                                'deviation': alert.metrics.deviation,
-                                'threshold': alert.metrics.threshold
-                            },
-                            'context': {
-                                'affected_users': alert.context.affected_users,
-                                'business_impact': alert.context.business_impact,
-                                'historical_pattern': alert.context.historical_pattern,
-                                'peak_hour': alert.context.peak_hour
-                            },
-                            'timestamp': alert.timestamp,
-                            'recommended_actions': alert.recommended_actions
-                        }
-                        
-                        # Send webhook notification
-                        response = requests.request(
-                            method=subscription.method,
-                            url=subscription.url,
-                            json=payload,
-                            headers=subscription.headers or {},
-                            timeout=5
-                        )
-                        
-                        if response.status_code >= 400:
-                            self.logger.error(f"Webhook notification failed for {subscription.url}: {response.text}")
-                    except Exception as e:
-                        self.logger.error(f"Error sending webhook notification to {subscription.url}: {e}")
+            self._send_webhooks([alert], [self._webhook_target(s) for s in subscriptions])
             
         except Exception as e:
             self.logger.error(f"Error in notify_webhooks: {e}")
             raise
+
+    def _notify_transitions(self, evaluation: AlertEvaluation) -> None:
+        """Webhooks only hear about transitions: once when an alert starts firing, once when it resolves"""
+        transitions = evaluation.new + evaluation.resolved
+        if not transitions:
+            return
+        try:
+            targets = [self._webhook_target(s) for s in WebhookSubscription.query.filter_by(enabled=True).all()]
+        except Exception as e:
+            self.logger.error(f"Error loading webhook subscriptions: {e}")
+            return
+        if targets:
+            # Delivery can take seconds per subscriber, so it stays off the evaluation pass
+            threading.Thread(
+                target=self._send_webhooks, args=(transitions, targets), name='alert-webhooks', daemon=True
+            ).start()
+
+    @staticmethod
+    def _webhook_target(subscription: WebhookSubscription) -> Dict:
+        """Plain copy of a subscription, usable outside the session that loaded it"""
+        return {
+            'url': subscription.url,
+            'method': subscription.method,
+            'headers': subscription.headers or {},
+            'alert_types': subscription.alert_types or []
+        }
+
+    def _send_webhooks(self, alerts: List[Alert], targets: List[Dict]) -> None:
+        for alert in alerts:
+            payload = self._webhook_payload(alert)
+            for target in targets:
+                if alert.severity not in target['alert_types']:
+                    continue
+                try:
+                    response = requests.request(
+                        method=target['method'],
+                        url=target['url'],
+                        json=payload,
+                        headers=target['headers'],
+                        timeout=5
+                    )
+                    
+                    if response.status_code >= 400:
+                        self.logger.error(f"Webhook notification failed for {target['url']}: {response.text}")
+                except Exception as e:
+                    self.logger.error(f"Error sending webhook notification to {target['url']}: {e}")
+
+    @staticmethod
+    def _webhook_payload(alert: Alert) -> Dict:
+        return {
+            'alert_id': alert.alert_id,
+            'fingerprint': alert.fingerprint,
+            'status': alert.status,
+            'type': alert.alert_type,
+            'severity': alert.severity,
+            'fip_name': alert.fip_name,
+            'message': alert.message,
+            'metrics': asdict(alert.metrics),
+            'context': asdict(alert.context),
+            'timestamp': alert.timestamp,
+            'recommended_actions': alert.recommended_actions
+        }
+
+    @staticmethod
+    def _alert_from_record(record: AlertModel) -> Alert:
+        return Alert(
+            alert_id=record.alert_id,
+            fip_name=record.fip_name,
+            severity=record.severity,
+            alert_type=record.alert_type,
+            message=record.message,
+            metrics=AlertMetrics(**record.metrics),
+            context=AlertContext(**record.context),
+            recommended_actions=record.recommended_actions,
+            timestamp=record.timestamp.isoformat(),
+            confidence=record.confidence,
+            fingerprint=record.fingerprint,
+            status=record.status
+        )
+
+    def restore_active_alerts(self) -> int:
+        """
+        Seed the lifecycle with the alerts still firing in the database, so a restart
+        continues their episodes instead of raising (and notifying) them again
+        """
+        records = AlertModel.query.filter(
+            AlertModel.status == AlertStatus.FIRING.value,
+            AlertModel.fingerprint.isnot(None)
+        ).order_by(AlertModel.timestamp.desc()).all()
+        restored = self.lifecycle.restore([self._alert_from_record(record) for record in records])
+        if restored:
+            self.logger.info(f"♻️ Restored {restored} firing alerts from the database")
+        return restored
     
     def generate_alerts(self, historical_data: Dict, current_metrics: Dict) -> List[Alert]:
         """Generate alerts based on metrics analysis with focus on last 3 hours"""
-        alerts = []
         if not Config.USE_REAL_BEDROCK:
-            return self.generate_mock_alerts()
+            return self._apply_lifecycle(self.generate_mock_alerts())
         
+        candidates = []
         try:
-            # Process each FIP
-            for fip_name, metrics in current_metrics.items():
-                # Get time-sliced data for different windows
-                short_term_data = self._get_time_sliced_data(historical_data, fip_name, self.time_windows['short_term'])
-                
-                # Generate different types of alerts
-                alerts.extend(self._check_threshold_violations(fip_name, metrics, short_term_data))
-                alerts.extend(self._check_trend_anomalies(fip_name, metrics, short_term_data))
-                alerts.extend(self._check_pattern_anomalies(fip_name, metrics, short_term_data))
-                alerts.extend(self._check_stability_issues(fip_name, metrics, short_term_data))
-                
-                # Deduplicate alerts
-                alerts = self._deduplicate_alerts(alerts)
-                
-                # Sort by severity and confidence
-                alerts.sort(key=lambda x: (x.severity == 'critical', x.confidence), reverse=True)
-                
+            # Align the short-term window of every FIP and evaluate all rules in one pass
+            matrix = MetricMatrix.build(historical_data, current_metrics, self.time_windows['short_term'])
+            matches = self.rule_engine.evaluate(matrix)
+
+            if matches:
+                contexts = self._get_enhanced_contexts(matrix)
+                candidates = [self._alert_from_match(match, contexts) for match in matches]
+
         except Exception as e:
             self.logger.error(f"Error generating alerts: {e}")
         
-        return alerts
+        # Deduplicate, sort and track state once per evaluation pass
+        return self._apply_lifecycle(candidates)
+
+    def _apply_lifecycle(self, candidates: List[Alert]) -> List[Alert]:
+        """Run one lifecycle pass and return the alerts that are currently firing"""
+        self.last_evaluation = self.lifecycle.evaluate(candidates)
+        self._store_evaluation(self.last_evaluation)
+        self._notify_transitions(self.last_evaluation)
+        return self.last_evaluation.firing
 
     def generate_mock_alerts(self) -> List[Alert]:
         """Generate mock alerts for testing and development"""
@@ -324,267 +359,85 @@ class AlertService:
         
         return mock_alerts
 
-    def _get_time_sliced_data(self, historical_data: Dict, fip_name: str, minutes: int) -> Dict[str, pd.DataFrame]:
-        """Get data for specified time window"""
-        sliced_data = {}
-        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
-        
-        for metric_name, df in historical_data.items():
-            if not df.empty:
-                # Filter for FIP and time window
-                mask = (df['fip_name'] == fip_name) & (df.index >= cutoff_time)
-                sliced_data[metric_name] = df[mask].copy()
-        
-        return sliced_data
-
-    def _check_threshold_violations(self, fip_name: str, current_metrics: Dict, 
-                                  short_term_data: Dict[str, pd.DataFrame]) -> List[Alert]:
-        """Check for immediate threshold violations with short-term context"""
-        alerts = []
-        
-        # Check consent success rate
-        current_consent_rate = current_metrics.get('consent_success_rate', 0)
-        if current_consent_rate < self.thresholds['consent_success_rate']['critical']:
-            # Calculate short-term trend
-            if 'consent_success_rate' in short_term_data:
-                df = short_term_data['consent_success_rate']
-                trend = self._calculate_trend(df['value']) if not df.empty else 0
-                
-                severity = 'critical' if trend < self.trend_thresholds['rapid_decline'] else 'warning'
-                confidence = 0.95 if trend < self.trend_thresholds['rapid_decline'] else 0.85
-                
-                alert = self._create_alert(
-                    fip_name=fip_name,
-                    severity=severity,
-                    alert_type='consent_rate_violation',
-                    message=self._generate_threshold_message(fip_name, current_consent_rate, trend),
-                    metrics=AlertMetrics(
-                        current_rate=current_consent_rate,
-                        historical_avg=df['value'].mean() if not df.empty else self.baselines['consent_success_rate'],
-                        deviation=trend,
-                        threshold=self.thresholds['consent_success_rate']['critical']
-                    ),
-                    context=self._get_enhanced_context(fip_name, current_metrics, short_term_data),
-                    recommended_actions=self._get_recommended_actions('consent_rate', severity, trend)
-                )
-                alerts.append(alert)
-        
-        # Similar checks for data fetch rate
-        current_fetch_rate = current_metrics.get('data_fetch_success_rate', 0)
-        if current_fetch_rate < self.thresholds['data_fetch_success_rate']['critical']:
-            if 'data_fetch_success_rate' in short_term_data:
-                df = short_term_data['data_fetch_success_rate']
-                trend = self._calculate_trend(df['value']) if not df.empty else 0
-                
-                alert = self._create_alert(
-                    fip_name=fip_name,
-                    severity='critical' if trend < self.trend_thresholds['rapid_decline'] else 'warning',
-                    alert_type='data_fetch_violation',
-                    message=self._generate_threshold_message(fip_name, current_fetch_rate, trend, metric_type='data fetch'),
-                    metrics=AlertMetrics(
-                        current_rate=current_fetch_rate,
-                        historical_avg=df['value'].mean() if not df.empty else self.baselines['data_fetch_success_rate'],
-                        deviation=trend,
-                        threshold=self.thresholds['data_fetch_success_rate']['critical']
-                    ),
-                    context=self._get_enhanced_context(fip_name, current_metrics, short_term_data),
-                    recommended_actions=self._get_recommended_actions('data_fetch', 'critical' if trend < self.trend_thresholds['rapid_decline'] else 'warning', trend)
-                )
-                alerts.append(alert)
-        
-        return alerts
-
-    def _check_trend_anomalies(self, fip_name: str, current_metrics: Dict, 
-                              short_term_data: Dict[str, pd.DataFrame]) -> List[Alert]:
-        """Analyze trends in the last 3 hours"""
-        alerts = []
-        
-        for metric_name in ['consent_success_rate', 'data_fetch_success_rate']:
-            if metric_name in short_term_data:
-                df = short_term_data[metric_name]
-                if not df.empty:
-                    # Calculate trend using rolling windows
-                    window_sizes = [30, 60, 180]  # 30min, 1hr, 3hr windows
-                    trends = []
-                    
-                    for window in window_sizes:
-                        trend = self._calculate_rolling_trend(df['value'], window)
-                        trends.append(trend)
-                    
-                    # Check for accelerating decline
-                    if all(t < 0 for t in trends) and trends[0] < trends[1] < trends[2]:
-                        alert = self._create_alert(
-                            fip_name=fip_name,
-                            severity='warning',
-                            alert_type='accelerating_decline',
-                            message=f"Accelerating decline detected in {metric_name.replace('_', ' ')}: -"
-                                   f"{abs(trends[0]):.1f}% (30min), -{abs(trends[1]):.1f}% (1hr), -{abs(trends[2]):.1f}% (3hr)",
-                            metrics=AlertMetrics(
-                                current_rate=current_metrics.get(metric_name, 0),
-                                historical_avg=df['value'].mean(),
-                                deviation=trends[0],
-                                threshold=self.trend_thresholds['rapid_decline']
-                            ),
-                            context=self._get_enhanced_context(fip_name, current_metrics, short_term_data),
-                            recommended_actions=self._get_recommended_actions(metric_name, 'warning', trends[0])
-                        )
-                        alerts.append(alert)
-        
-        return alerts
-
-    def _check_pattern_anomalies(self, fip_name: str, current_metrics: Dict,
-                                short_term_data: Dict[str, pd.DataFrame]) -> List[Alert]:
-        """Check for unusual patterns in metrics"""
-        alerts = []
-        
-        # Check for diverging metrics
-        consent_rate = current_metrics.get('consent_success_rate', 0)
-        data_fetch_rate = current_metrics.get('data_fetch_success_rate', 0)
-        
-        if abs(consent_rate - data_fetch_rate) > 20:  # Significant divergence
-            worse_metric = 'consent' if consent_rate < data_fetch_rate else 'data fetch'
-            better_metric = 'data fetch' if consent_rate < data_fetch_rate else 'consent'
-            
-            alert = self._create_alert(
-                fip_name=fip_name,
-                severity='warning',
-                alert_type='metric_divergence',
-                message=f"Unusual pattern: {worse_metric} rate ({min(consent_rate, data_fetch_rate):.1f}%) "
-                       f"significantly lower than {better_metric} rate ({max(consent_rate, data_fetch_rate):.1f}%)",
-                metrics=AlertMetrics(
-                    current_rate=min(consent_rate, data_fetch_rate),
-                    historical_avg=max(consent_rate, data_fetch_rate),
-                    deviation=abs(consent_rate - data_fetch_rate),
-                    threshold=20.0
-                ),
-                context=self._get_enhanced_context(fip_name, current_metrics, short_term_data),
-                recommended_actions=[
-                    f"Investigate {worse_metric} service health",
-                    f"Check {worse_metric} API endpoints",
-                    "Review error logs for specific failure patterns",
-                    "Monitor service dependencies"
-                ]
-            )
-            alerts.append(alert)
-        
-        return alerts
-
-    def _check_stability_issues(self, fip_name: str, current_metrics: Dict,
-                               short_term_data: Dict[str, pd.DataFrame]) -> List[Alert]:
-        """Check for stability issues in the last 3 hours"""
-        alerts = []
-        
-        for metric_name in ['consent_success_rate', 'data_fetch_success_rate']:
-            if metric_name in short_term_data:
-                df = short_term_data[metric_name]
-                if not df.empty:
-                    # Calculate volatility
-                    volatility = df['value'].std()
-                    mean_value = df['value'].mean()
-                    cv = (volatility / mean_value) * 100 if mean_value > 0 else 0
-                    
-                    if cv > 15:  # High coefficient of variation
-                        alert = self._create_alert(
-                            fip_name=fip_name,
-                            severity='warning',
-                            alert_type='stability_issue',
-                            message=f"High variability in {metric_name.replace('_', ' ')}: "
-                                   f"±{volatility:.1f}% around mean of {mean_value:.1f}%",
-                            metrics=AlertMetrics(
-                                current_rate=current_metrics.get(metric_name, 0),
-                                historical_avg=mean_value,
-                                deviation=volatility,
-                                threshold=15.0
-                            ),
-                            context=self._get_enhanced_context(fip_name, current_metrics, short_term_data),
-                            recommended_actions=[
-                                "Monitor service stability",
-                                "Check for intermittent issues",
-                                "Review system resources",
-                                "Investigate potential network issues"
-                            ]
-                        )
-                        alerts.append(alert)
-        
-        return alerts
+    def _alert_from_match(self, match: RuleMatch, contexts: List[AlertContext]) -> Alert:
+        """Build an Alert from a rule that fired for one FIP"""
+        fields = {'fip_name': match.fip_name, **match.values, **match.labels}
+        deviation = match.values.get('deviation', 0.0)
 
-    def _calculate_rolling_trend(self, series: pd.Series, window_minutes: int) -> float:
-        """Calculate trend using rolling windows"""
-        if len(series) < 2:
-            return 0.0
-        
-        try:
-            rolling_mean = series.rolling(window=window_minutes//5).mean()  # Assuming 5-minute intervals
-            if len(rolling_mean) >= 2:
-                return ((rolling_mean.iloc[-1] - rolling_mean.iloc[0]) / rolling_mean.iloc[0]) * 100
-            return 0.0
-        except Exception:
-            return 0.0
+        if match.actions_profile:
+            recommended_actions = self._get_recommended_actions(match.actions_profile, match.severity, deviation)
+        else:
+            recommended_actions = [action.format(**fields) for action in match.actions]
 
-    def _generate_threshold_message(self, fip_name: str, current_rate: float, trend: float, 
-                                  metric_type: str = 'consent') -> str:
-        """Generate detailed alert message"""
-        trend_desc = "declining rapidly" if trend < self.trend_thresholds['rapid_decline'] else \
-                    "declining gradually" if trend < 0 else "stable"
-        
-        return (f"Critical: {metric_type} success rate for {fip_name} is {current_rate:.1f}%, "
-                f"below threshold and {trend_desc} (trend: {trend:.1f}% over 3 hours)")
+        return self._create_alert(
+            fip_name=match.fip_name,
+            severity=match.severity,
+            alert_type=match.alert_type,
+            message=match.message_template.format(**fields),
+            metrics=AlertMetrics(
+                current_rate=match.values.get('current_rate', 0.0),
+                historical_avg=match.values.get('historical_avg', 0.0),
+                deviation=deviation,
+                threshold=match.values.get('threshold', 0.0)
+            ),
+            context=contexts[match.fip_index],
+            recommended_actions=recommended_actions,
+            confidence=match.confidence
+        )
 
-    def _get_enhanced_context(self, fip_name: str, current_metrics: Dict,
-                            short_term_data: Dict[str, pd.DataFrame]) -> AlertContext:
-        """Get enhanced context with short-term analysis"""
+    def _get_enhanced_contexts(self, matrix: MetricMatrix) -> List[AlertContext]:
+        """Get enhanced context with short-term analysis for every FIP at once"""
         current_hour = datetime.utcnow().hour
         is_business_hours = 9 <= current_hour <= 18
-        
+        size = len(matrix.fip_names)
+
         # Calculate user impact
-        base_users = current_metrics.get('user_base', 0)
-        affected_users = int(base_users * (1 - current_metrics.get('consent_success_rate', 0) / 100))
-        
-        # Determine business impact
-        if is_business_hours and affected_users > base_users * 0.3:
-            business_impact = "Severe impact on business operations during peak hours"
-        elif is_business_hours:
-            business_impact = "Moderate impact on business operations"
-        else:
-            business_impact = "Limited business impact during off-hours"
-        
-        return AlertContext(
-            affected_users=affected_users,
-            business_impact=business_impact,
-            historical_pattern=self._analyze_short_term_pattern(short_term_data),
-            peak_hour=is_business_hours
+        base_users = matrix.current.get('user_base', np.zeros(size))
+        consent_rate = matrix.current.get('consent_success_rate', np.zeros(size))
+        affected_users = (base_users * (1 - consent_rate / 100)).astype(int)
+
+        # Analyze pattern in short-term data; the most severe pattern wins
+        has_data = np.zeros(size, dtype=bool)
+        variable = np.zeros(size, dtype=bool)
+        declining = np.zeros(size, dtype=bool)
+        improving = np.zeros(size, dtype=bool)
+        for window in matrix.window.values():
+            present = FUNCTIONS['has_data'](window)
+            noisy = present & (FUNCTIONS['std'](window) > 10)
+            trend = FUNCTIONS['trend'](window)
+            has_data |= present
+            variable |= noisy
+            declining |= present & ~noisy & (trend < -5)
+            improving |= present & ~noisy & (trend > 5)
+
+        historical_pattern = np.select(
+            [~has_data, variable, declining, improving],
+            ["Insufficient short-term data",
+             "Highly variable performance in last 3 hours",
+             "Declining performance trend in last 3 hours",
+             "Improving performance trend in last 3 hours"],
+            default="Stable performance in last 3 hours"
         )
 
-    def _analyze_short_term_pattern(self, short_term_data: Dict[str, pd.DataFrame]) -> str:
-        """Analyze pattern in short-term data"""
-        patterns = []
-        
-        for metric_name, df in short_term_data.items():
-            if not df.empty:
-                recent_std = df['value'].std()
-                recent_trend = self._calculate_trend(df['value'])
-                
-                if recent_std > 10:
-                    patterns.append("highly variable")
-                elif recent_trend < -5:
-                    patterns.append("declining")
-                elif recent_trend > 5:
-                    patterns.append("improving")
-                else:
-                    patterns.append("stable")
-        
-        if not patterns:
-            return "Insufficient short-term data"
-        
-        # Return most severe pattern
-        if "highly variable" in patterns:
-            return "Highly variable performance in last 3 hours"
-        elif "declining" in patterns:
-            return "Declining performance trend in last 3 hours"
-        elif "improving" in patterns:
-            return "Improving performance trend in last 3 hours"
-        else:
-            return "Stable performance in last 3 hours"
+        contexts = []
+        for i in range(size):
+            # Determine business impact
+            if is_business_hours and affected_users[i] > base_users[i] * 0.3:
+                business_impact = "Severe impact on business operations during peak hours"
+            elif is_business_hours:
+                business_impact = "Moderate impact on business operations"
+            else:
+                business_impact = "Limited business impact during off-hours"
+
+            contexts.append(AlertContext(
+                affected_users=int(affected_users[i]),
+                business_impact=business_impact,
+                historical_pattern=str(historical_pattern[i]),
+                peak_hour=is_business_hours
+            ))
+
+        return contexts
+
 
     def _get_recommended_actions(self, metric_type: str, severity: str, trend: float) -> List[str]:
         """Get context-aware recommended actions"""
@@ -624,26 +477,13 @@ class AlertService:
         
         return actions[:5]  # Return top 5 most relevant actions
 
-    def _deduplicate_alerts(self, alerts: List[Alert]) -> List[Alert]:
-        """Remove duplicate or similar alerts"""
-        unique_alerts = []
-        seen_combinations = set()
-        
-        for alert in alerts:
-            # Create a unique key for similar alerts
-            key = f"{alert.fip_name}:{alert.alert_type}:{alert.severity}"
-            
-            if key not in seen_combinations:
-                unique_alerts.append(alert)
-                seen_combinations.add(key)
-        
-        return unique_alerts
-
     def _create_alert(self, fip_name: str, severity: str, alert_type: str, message: str,
-                     metrics: AlertMetrics, context: AlertContext, recommended_actions: List[str]) -> Alert:
-        """Create a new alert instance"""
+                     metrics: AlertMetrics, context: AlertContext, recommended_actions: List[str],
+                     confidence: float = 0.95) -> Alert:
+        """Create a new alert instance keyed by its stable fingerprint"""
+        fingerprint = AlertLifecycleEngine.fingerprint(fip_name, alert_type, severity)
         return Alert(
-            alert_id=f"alert_{datetime.utcnow().timestamp()}",
+            alert_id=f"alert_{fingerprint}",
             fip_name=fip_name,
             severity=severity,
             alert_type=alert_type,
@@ -652,47 +492,136 @@ class AlertService:
             context=context,
             recommended_actions=recommended_actions,
             timestamp=datetime.utcnow().isoformat(),
-            confidence=0.95
+            confidence=confidence,
+            fingerprint=fingerprint
         )
 
-    def _store_alert(self, alert: Alert) -> None:
-        """Store alert in database"""
-        try:
-            # Check if alert already exists
-            existing_alert = AlertModel.query.filter_by(alert_id=alert.alert_id).first()
-            if existing_alert:
-                return
-
-            # Create new alert record
-            alert_record = AlertModel(
-                alert_id=alert.alert_id,
-                fip_name=alert.fip_name,
-                severity=alert.severity,
-                alert_type=alert.alert_type,
-                message=alert.message,
-                metrics={
-                    'current_rate': alert.metrics.current_rate,
-                    'historical_avg': alert.metrics.historical_avg,
-                    'deviation': alert.metrics.deviation,
-                    'threshold': alert.metrics.threshold
-                },
-                context={
-                    'affected_users': alert.context.affected_users,
-                    'business_impact': alert.context.business_impact,
-                    'historical_pattern': alert.context.historical_pattern,
-                    'peak_hour': alert.context.peak_hour
-                },
-                recommended_actions=alert.recommended_actions,
-                timestamp=datetime.fromisoformat(alert.timestamp.replace('Z', '+00:00')),
-                confidence=alert.confidence
+    def _store_evaluation(self, evaluation: AlertEvaluation) -> None:
+        """Queue the evaluation pass for the database writer (committed with the next batch)"""
+        if not evaluation.firing and not evaluation.resolved and self._orphans_resolved.is_set():
+            return
+
+        def on_stored(future):
+            if future.exception() is not None:
+                self.logger.error(f"Error storing alerts in database: {future.exception()}")
+            elif future.result():
+                # Only after the commit: a rolled-back batch retries the orphan sweep
+                self._orphans_resolved.set()
+
+        db_writer.submit(lambda: self._write_evaluation(evaluation)).add_done_callback(on_stored)
+
+    def _write_evaluation(self, evaluation: AlertEvaluation) -> bool:
+        """
+        Upsert every alert of an evaluation pass (firing and resolved); runs on the writer.
+        Returns whether the pass also swept orphaned firing rows
+        """
+        alerts = {alert.alert_id: alert for alert in evaluation.firing + evaluation.resolved}
+        evaluated_at = datetime.fromisoformat(evaluation.evaluated_at)
+        alert_ids = list(alerts)
+
+        swept_orphans = not self._orphans_resolved.is_set()
+        if swept_orphans:
+            self._resolve_orphans(evaluation, evaluated_at)
+
+        # One lookup per chunk instead of one per alert (keeps IN lists under SQLite limits)
+        existing = {}
+        for i in range(0, len(alert_ids), self.STORE_CHUNK_SIZE):
+            chunk = alert_ids[i:i + self.STORE_CHUNK_SIZE]
+            for record in AlertModel.query.filter(AlertModel.alert_id.in_(chunk)).all():
+                existing[record.alert_id] = record
+
+        for alert_id, alert in alerts.items():
+            record = existing.get(alert_id)
+            if record is None:
+                record = AlertModel(
+                    alert_id=alert_id,
+                    fingerprint=alert.fingerprint,
+                    fip_name=alert.fip_name,
+                    severity=alert.severity,
+                    alert_type=alert.alert_type,
+                    timestamp=datetime.fromisoformat(alert.timestamp.replace('Z', '+00:00'))
+                )
+                db.session.add(record)
+
+            record.message = alert.message
+            record.metrics = asdict(alert.metrics)
+            record.context = asdict(alert.context)
+            record.recommended_actions = alert.recommended_actions
+            record.confidence = alert.confidence
+            record.status = alert.status
+
+            if alert.status == AlertStatus.RESOLVED.value:
+                record.resolved_at = evaluated_at
+            else:
+                record.last_seen_at = evaluated_at
+
+        return swept_orphans
+
+    def _resolve_orphans(self, evaluation: AlertEvaluation, evaluated_at: datetime) -> None:
+        """
+        Resolve firing rows left by an earlier process that the lifecycle doesn't track
+        (older episodes of a restored fingerprint, rows without a fingerprint); otherwise
+        they stay firing until retention and are never compacted
+        """
+        tracked = {alert.alert_id for alert in evaluation.firing + evaluation.resolved}
+        orphan_ids = [
+            row.id for row in db.session.query(AlertModel.id, AlertModel.alert_id).filter(
+                AlertModel.status == AlertStatus.FIRING.value
             )
-            
-            db.session.add(alert_record)
-            db.session.commit()
-            
+            if row.alert_id not in tracked
+        ]
+        for i in range(0, len(orphan_ids), self.STORE_CHUNK_SIZE):
+            AlertModel.query.filter(AlertModel.id.in_(orphan_ids[i:i + self.STORE_CHUNK_SIZE])).update({
+                AlertModel.status: AlertStatus.RESOLVED.value,
+                AlertModel.resolved_at: evaluated_at,
+                AlertModel.resolution_note: 'No longer reported after a restart'
+            }, synchronize_session=False)
+        if orphan_ids:
+            self.logger.info(f"🧹 Resolved {len(orphan_ids)} firing alerts left by a previous run")
+
+    def compact_alert_history(self, retention_days: Optional[int] = None,
+                              max_rows: Optional[int] = None) -> Dict[str, int]:
+        """
+        Keep the alerts table bounded.
+
+        Alerts with no activity (resolved, last seen or raised) within the retention
+        period are deleted, then the oldest resolved alerts are dropped until the table
+        fits within max_rows. Alerts still reported by the evaluator are never removed.
+        """
+        retention_days = Config.ALERT_RETENTION_DAYS if retention_days is None else retention_days
+        max_rows = Config.ALERT_MAX_ROWS if max_rows is None else max_rows
+        resolved = AlertModel.status == AlertStatus.RESOLVED.value
+
+        def compact() -> Dict[str, int]:
+            result = {'expired': 0, 'compacted': 0}
+            cutoff = datetime.utcnow() - timedelta(days=retention_days)
+            last_activity = db.func.coalesce(AlertModel.resolved_at, AlertModel.last_seen_at, AlertModel.timestamp)
+            result['expired'] = AlertModel.query.filter(
+                last_activity < cutoff
+            ).delete(synchronize_session=False)
+
+            excess = AlertModel.query.count() - max_rows
+            if excess > 0:
+                oldest = db.session.query(AlertModel.id).filter(resolved).order_by(
+                    AlertModel.resolved_at.asc(), AlertModel.id.asc()
+                ).limit(excess).subquery()
+                result['compacted'] = AlertModel.query.filter(
+                    AlertModel.id.in_(db.select(oldest.c.id))
+                ).delete(synchronize_session=False)
+            return result
+
+        try:
+            result = db_writer.run(compact)
         except Exception as e:
-            self.logger.error(f"Error storing alert in database: {e}")
-            db.session.rollback()
+            self.logger.error(f"Error compacting alert history: {e}")
+            return {'expired': 0, 'compacted': 0}
+
+        if result['expired'] or result['compacted']:
+            self.logger.info(
+                f"🧹 Alert retention: removed {result['expired']} expired and "
+                f"{result['compacted']} excess resolved alerts"
+            )
+        return result
 
     def _analyze_historical_pattern(self, historical_data: Dict, fip_name: str, metric_type: str) -> str:
         """Analyze historical data to detect patterns"""
@@ -793,39 +722,6 @@ class AlertService:
         
         return alerts
     
-    def _check_pattern_anomalies(self, fip_name: str, current_metrics: Dict,
-                                historical_data: Dict[str, pd.DataFrame]) -> List[Alert]:
-        """Check for anomalies in performance patterns"""
-        alerts = []
-        current_hour = datetime.utcnow().hour
-        
-        # Check for unusual combinations
-        consent_rate = current_metrics.get('consent_success_rate', 0)
-        data_fetch_rate = current_metrics.get('data_fetch_success_rate', 0)
-        
-        if consent_rate > 90 and data_fetch_rate < 60:
-            alerts.append(self._create_alert(
-                fip_name=fip_name,
-                severity='warning',
-                alert_type='pattern_anomaly',
-                message=f"Unusual pattern: High consent success ({consent_rate:.1f}%) but low data fetch success ({data_fetch_rate:.1f}%)",
-                metrics=AlertMetrics(
-                    current_rate=data_fetch_rate,
-                    historical_avg=consent_rate,
-                    deviation=consent_rate - data_fetch_rate,
-                    threshold=80.0
-                ),
-                context=self._get_alert_context(fip_name, current_metrics, historical_data),
-                recommended_actions=[
-                    "Investigate data fetch service",
-                    "Check data fetch API permissions",
-                    "Verify data availability at source"
-                ],
-                confidence=0.88
-            ))
-        
-        return alerts
-    
     def _check_trend_issues(self, fip_name: str, current_metrics: Dict,
                            historical_data: Dict[str, pd.DataFrame]) -> List[Alert]:
         """Check for concerning trends in metrics"""
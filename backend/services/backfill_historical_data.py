@@ -1,223 +1,32 @@
 #!/usr/bin/env python3
 
-import json
 import random
-from typing import Any, Dict
-import requests
-import time
+from typing import Any, Dict, Optional
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from utils.logger import logger
+from services.vm_importer import StreamingVMImporter
+from services.synthetic_history import DEFAULT_FIPS, SyntheticHistoryGenerator, bank_modifier, downtime_windows
 
-def json_to_vm_import(json_file_path, vm_url="http://localhost:8428"):
+def json_to_vm_import(json_file_path, vm_url="http://localhost:8428", resume=True):
     """
     Import JSON metrics directly into VictoriaMetrics using /api/v1/import
     This is the fastest way to backfill historical data
     """
-    
-    try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
-    except Exception as e:
-        logger.error(f"❌ Error reading JSON file: {e}")
-        return False
-    
-    logger.info(f"📊 Processing {len(data)} entries from {json_file_path}")
-    
-    # Prepare data for VictoriaMetrics import format
-    import_lines = []
-    
-    for entry in data:
-        fip_name = entry['fip_name']
-        bank_name = entry['bank_name']
-        metrics = entry['metrics']
-        
-        # Get timestamp (VictoriaMetrics expects milliseconds)
-        timestamp = entry.get('timestamp')
-        if timestamp:
-            if timestamp < 10**12:  # Convert seconds to milliseconds
-                timestamp_ms = int(timestamp * 1000)
-            else:
-                timestamp_ms = int(timestamp)
-        else:
-            timestamp_ms = int(time.time() * 1000)
-        
-        # Convert to VictoriaMetrics import format
-        # Format: {"metric":{"__name__":"metric_name","label1":"value1"},"value":123,"timestamp":1234567890000}
-        
-        metrics_data = [
-            {
-                "metric": {
-                    "__name__": "fip_consent_success_rate",
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "job":"manual"
-                },
-                "values": [metrics["consent_success_rate"]],
-                "timestamps": [timestamp_ms]
-            },
-            {
-                "metric": {
-                    "__name__": "fip_data_fetch_success_rate", 
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "job":"manual"
-                },
-                "values": [metrics["data_fetch_success_rate"]],
-                "timestamps": [timestamp_ms]
-            },
-            {
-                "metric": {
-                    "__name__": "fip_avg_response_time_seconds",
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "job":"manual"
-                },
-                "values": [metrics["avg_response_time"]],
-                "timestamps": [timestamp_ms]
-            },
-            {
-                "metric": {
-                    "__name__": "fip_error_rate",
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "job":"manual"
-                },
-                "values": [metrics["error_rate"]],
-                "timestamps": [timestamp_ms]
-            },
-            {
-                "metric": {
-                    "__name__": "fip_total_requests",
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "request_type": "total",
-                    "job":"manual"
-                },
-                "values": [metrics["total_requests"]],
-                "timestamps": [timestamp_ms]
-            },
-            {
-                "metric": {
-                    "__name__": "fip_status",
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "job":"manual"
-                },
-                "values": [metrics["status"]],
-                "timestamps": [timestamp_ms]
-            }
-        ]
+    return _streaming_import(json_file_path, vm_url, 'jsonl', resume)
 
-        import_lines.extend(metrics_data)
-    
-    logger.info(f"📈 Prepared {len(import_lines)} total metrics for import")
-    
-    # Convert to JSONL format (one JSON object per line)
-    jsonl_data = '\n'.join(json.dumps(line) for line in import_lines)
-    
-    # Import into VictoriaMetrics
-    try:
-        logger.info(f"🚀 Importing to VictoriaMetrics at {vm_url}")
-        
-        headers = {
-            'Content-Type': 'application/x-jsonlines'
-        }
-        
-        response = requests.post(
-            f"{vm_url}/api/v1/import",
-            data=jsonl_data,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 204:
-            logger.info("✅ Import successful!")
-            
-            # Show sample timestamp info
-            if import_lines:
-                sample_ts = import_lines[0]['timestamps'][0]
-                sample_datetime = datetime.fromtimestamp(sample_ts/1000).strftime('%Y-%m-%d %H:%M:%S')
-                logger.info(f"📅 Sample timestamp: {sample_datetime}")
-            
-            return True
-        else:
-            logger.error(f"❌ Import failed: {response.status_code}")
-            logger.error(f"Response: {response.text}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"❌ Error during import: {e}")
-        return False
-
-def prometheus_format_import(json_file_path, vm_url="http://localhost:8428"):
+def prometheus_format_import(json_file_path, vm_url="http://localhost:8428", resume=True):
     """
     Alternative: Import using Prometheus format via /api/v1/import/prometheus
     """
-    
-    try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
-    except Exception as e:
-        logger.error(f"❌ Error reading JSON file: {e}")
-        return False
-    
-    logger.info(f"📊 Converting {len(data)} entries to Prometheus format")
-    
-    # Generate Prometheus format
-    lines = []
-    
-    for entry in data:
-        fip_name = entry['fip_name']
-        bank_name = entry['bank_name']
-        metrics = entry['metrics']
-        
-        # Get timestamp in milliseconds
-        timestamp = entry.get('timestamp')
-        if timestamp:
-            if timestamp < 10**12:
-                timestamp_ms = int(timestamp * 1000)
-            else:
-                timestamp_ms = int(timestamp)
-        else:
-            timestamp_ms = int(time.time() * 1000)
-        
-        lines.extend([
-            f'fip_consent_success_rate{{fip_name="{fip_name}",bank_name="{bank_name}"}} {metrics["consent_success_rate"]} {timestamp_ms}',
-            f'fip_data_fetch_success_rate{{fip_name="{fip_name}",bank_name="{bank_name}"}} {metrics["data_fetch_success_rate"]} {timestamp_ms}',
-            f'fip_avg_response_time_seconds{{fip_name="{fip_name}",bank_name="{bank_name}"}} {metrics["avg_response_time"]} {timestamp_ms}',
-            f'fip_error_rate{{fip_name="{fip_name}",bank_name="{bank_name}"}} {metrics["error_rate"]} {timestamp_ms}',
-            f'fip_total_requests{{fip_name="{fip_name}",bank_name="{bank_name}",request_type="total"}} {metrics["total_requests"]} {timestamp_ms}',
-            f'fip_status{{fip_name="{fip_name}",bank_name="{bank_name}"}} {metrics["status"]} {timestamp_ms}'
-        ])
-    
-    prometheus_data = '\n'.join(lines)
-    
-    # Import using Prometheus format
+    return _streaming_import(json_file_path, vm_url, 'prometheus', resume)
+
+def _streaming_import(json_file_path, vm_url, import_format, resume):
+    """Stream the file to VictoriaMetrics in compressed chunks; True when every chunk was acknowledged"""
     try:
-        logger.info("🚀 Importing Prometheus format to VictoriaMetrics")
-        
-        headers = {
-            'Content-Type': 'text/plain'
-        }
-        
-        response = requests.post(
-            f"{vm_url}/api/v1/import/prometheus",
-            data=prometheus_data,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 204:
-            logger.info("✅ Prometheus format import successful!")
-            logger.info(f"📊 Imported {len(lines)} metrics")
-            return True
-        else:
-            logger.error(f"❌ Import failed: {response.status_code}")
-            logger.error(f"Response: {response.text}")
-            return False
-            
+        importer = StreamingVMImporter(vm_url, import_format=import_format)
+        return importer.import_file(json_file_path, resume=resume).success
     except Exception as e:
         logger.error(f"❌ Error during import: {e}")
         return False
@@ -260,19 +69,7 @@ class GenerateHistoricalData:
         """
         
         # Sample FIP and Bank names for realistic data
-        self.fips = {
-            'sbi-fip': 'State Bank of India',
-            'hdfc-fip': 'HDFC Bank',
-            'icici-fip': 'ICICI Bank',
-            'axis-fip': 'Axis Bank',
-            'kotak-fip': 'Kotak Mahindra Bank',
-            'boi-fip': 'Bank of India',
-            'pnb-fip': 'Punjab National Bank',
-            'canara-fip': 'Canara Bank',
-            'ubi-fip': 'Union Bank of India',
-            'iob-fip': 'Indian Overseas Bank',
-            'central-fip': 'Central Bank of India'
-        }
+        self.fips = dict(DEFAULT_FIPS)
         self.request_types = ["consent", "data_fetch", "account_discovery"]
     
     def generate_realistic_metrics(self, timestamp: int, fip_name: str, bank_name: str) -> Dict[str, Any]:
@@ -299,31 +96,10 @@ class GenerateHistoricalData:
             base_data_fetch_success += 0.03
         
         # Add some randomness and bank-specific variations
-        bank_modifier = hash(bank_name) % 10 / 100  # -0.05 to +0.05 range
+        bank_offset = bank_modifier(bank_name)  # 0.00 to 0.09, stable across runs
 
-        # Define downtime windows for each FIP
-        forced_downtime = False
-        
-        if fip_name == 'axis-fip' and 19 <= hour < 23:  # 7pm-11pm
-            forced_downtime = True
-        elif fip_name == 'hdfc-fip' and (23 <= hour < 24 or 0 <= hour < 1):  # 11pm-1am
-            forced_downtime = True
-        elif fip_name == 'icici-fip' and 2 <= hour < 3:  # 2-3am
-            forced_downtime = True
-        elif fip_name == 'sbi-fip' and (13 <= hour < 14 or 20 <= hour < 21):  # 1-2pm AND 8-9pm
-            forced_downtime = True
-        elif fip_name == 'kotak-fip' and 12 <= hour < 16:  # 12-4pm
-            forced_downtime = True
-        elif fip_name == 'pnb-fip' and (20 <= hour < 21 or 22 <= hour < 24):  # 8-9pm AND 10-12pm
-            forced_downtime = True
-        elif fip_name == 'canara-fip' and 13 <= hour < 14:  # 1-2pm
-            forced_downtime = True
-        elif fip_name == 'ubi-fip' and 3 <= hour < 4:  # 3-4am
-            forced_downtime = True
-        elif fip_name == 'iob-fip' and 22 <= hour < 24:  # 10-12pm
-            forced_downtime = True
-        elif fip_name == 'central-fip' and 14 <= hour < 16:  # 2-4pm
-            forced_downtime = True
+        # Each FIP has fixed downtime windows (see DOWNTIME_WINDOWS)
+        forced_downtime = any(start <= hour < end for start, end in downtime_windows(fip_name))
 
         if forced_downtime:
             # Severe downtime - near complete failure
@@ -333,8 +109,8 @@ class GenerateHistoricalData:
             error_rate = 1 - consent_success
             status_val = 0.0  # critical status
         else:
-            consent_success = max(0.7, min(1.0, base_consent_success + random.uniform(-0.1, 0.05) + bank_modifier))
-            data_success = max(0.7, min(1.0, base_data_fetch_success + random.uniform(-0.08, 0.05) + bank_modifier))
+            consent_success = max(0.7, min(1.0, base_consent_success + random.uniform(-0.1, 0.05) + bank_offset))
+            data_success = max(0.7, min(1.0, base_data_fetch_success + random.uniform(-0.08, 0.05) + bank_offset))
             avg_resp = max(0.1, 2.5 + random.uniform(-1.0, 3.0) + (2.0 if is_peak_hour else 0))
             error_rate = 1 - consent_success
             status_val = random.choices([1.0, 0.5, 0.0], weights=[85, 12, 3])[0]
@@ -350,52 +126,16 @@ class GenerateHistoricalData:
         
         return metrics
 
-    def export_to_file(self, days_back: int = 30, interval_minutes: int = 15, output_file: str = "metrics_data.json"):
+    def export_to_file(self, days_back: int = 30, interval_minutes: int = 15, output_file: str = "metrics_data.json",
+                       seed: Optional[int] = None):
         """
-        Export historical data to JSON file for import into Prometheus/Grafana
+        Export historical data to a file for import into Prometheus/Grafana
+        (JSON array, .jsonl or .parquet depending on the extension)
         """
         logger.info(f"Exporting data to {output_file}")
         
-        # Calculate time range starting from 30 days ago
-        end_time = datetime.now()
-        start_time = end_time - timedelta(days=days_back)
-        current_time = start_time
-        
-        all_data = []
-        
-        while current_time <= end_time:
-            timestamp = int(current_time.timestamp())
-            
-            for fip_name, bank_name in self.fips.items():
-                if random.random() > 0.7:  # 70% chance of having data
-                    continue
-                
-                metrics = self.generate_realistic_metrics(timestamp, fip_name, bank_name)
-                
-                data_point = {
-                    "timestamp": timestamp,
-                    "datetime": current_time.isoformat(),
-                    "fip_name": fip_name,
-                    "bank_name": bank_name,
-                    "metrics": metrics
-                }
-                all_data.append(data_point)
-            
-            # Move forward by interval
-            current_time += timedelta(minutes=interval_minutes)
-            
-            # Log progress every hour
-            if current_time.minute == 0:
-                logger.info(f"Generating data for {current_time.isoformat()}")
-        
-        # Sort data by timestamp to ensure chronological order
-        all_data.sort(key=lambda x: x['timestamp'])
-        
-        # Save to file
-        with open(output_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
-        
-        logger.info(f"Exported {len(all_data)} data points from {start_time.isoformat()} to {end_time.isoformat()}")
+        generator = SyntheticHistoryGenerator(self.fips, seed=seed)
+        generator.export(output_file, days_back=days_back, interval_minutes=interval_minutes)
         return output_file
 
     def generate_historical_data(self, output_file: str = "fip_metrics_historical.json"):
@@ -2,9 +2,9 @@ import json
 import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
-import boto3
-from botocore.exceptions import ClientError
 from utils.logger import logger
+from utils.aws import get_aws_client
+from utils.instrumentation import timed_bedrock_call
 import numpy as np
 
 class NumpyEncoder(json.JSONEncoder):
@@ -28,60 +28,71 @@ class BedrockService:
         self.use_mock = use_mock
         self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
         
+        self.region_name = 'us-east-1'
+        
         if not use_mock:
-            try:
-                self.bedrock_client = boto3.client(
-                    'bedrock-runtime',
-                    region_name='us-east-1'
-                )
-                print("✅ Real Bedrock client initialized")
-            except Exception as e:
-                print(f"⚠️  Bedrock initialization failed, falling back to mock: {e}")
-                self.use_mock = True
+            print("✅ Real Bedrock enabled (client created on first call)")
         else:
             print("🎭 Using mock Bedrock responses for development")
     
+    @property
+    def bedrock_client(self):
+        """Created on first real call; if that fails the service falls back to mock responses"""
+        if self.use_mock:
+            return None
+        try:
+            return get_aws_client('bedrock-runtime', self.region_name)
+        except Exception as e:
+            print(f"⚠️  Bedrock initialization failed, falling back to mock: {e}")
+            self.use_mock = True
+            return None
+    
+    @timed_bedrock_call
     def predict_downtime(self, metrics_data: Dict, time_horizon: str = "24h") -> Dict:
         """
         Predict FIP downtime using AI analysis
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._generate_mock_downtime_predictions(metrics_data, time_horizon)
         else:
             return self._call_real_bedrock_prediction(metrics_data, time_horizon)
     
+    @timed_bedrock_call
     def analyze_business_impact(self, predictions: Dict) -> Dict:
         """
         Analyze business impact of predicted outages
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._generate_mock_business_impact(predictions)
         else:
             return self._call_real_bedrock_impact_analysis(predictions)
     
+    @timed_bedrock_call
     def generate_proactive_alerts(self, current_metrics: Dict) -> Dict:
         """
         Generate proactive alerts based on current FIP status
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._generate_mock_proactive_alerts(current_metrics)
         else:
             return self._call_real_bedrock_alerts(current_metrics)
     
+    @timed_bedrock_call
     def generate_recommendations(self, situation: Dict) -> Dict:
         """
         Generate operational recommendations
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._generate_mock_recommendations(situation)
         else:
             return self._call_real_bedrock_recommendations(situation)
     
+    @timed_bedrock_call
     def generate_system_overview(self) -> Dict:
         """
         Generate system-wide health overview
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._generate_mock_system_overview()
         else:
             return self._call_real_bedrock_overview()
@@ -63,7 +63,7 @@ class DataPipeline:
                     # Step 5: Store processed results
                     self._store_processed_data({
                         'timestamp': datetime.utcnow().isoformat(),
-                        'metrics': current_metrics,
+                        'metrics': dict(current_metrics),
                         'predictions': predictions,
                         'pipeline_status': 'success'
                     })
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+import numpy as np
+
+
+DOWNTIME_HEALTH_THRESHOLD = 30.0
+MIN_EPISODE_POINTS = 3          # 15 minutes at 5-minute resolution
+RECURRING_RATE_THRESHOLD = 0.1  # hour/day slots down more than 10% of the time
+HIGH_RISK_THRESHOLD = 0.4
+BUSINESS_HOURS = (9, 17)        # inclusive
+WEEKEND_DAYS = (5, 6)
+
+
+def hour_of_day(timestamps: np.ndarray) -> np.ndarray:
+    return timestamps.astype('datetime64[h]').astype(np.int64) % 24
+
+
+def day_of_week(timestamps: np.ndarray) -> np.ndarray:
+    """Monday=0 (1970-01-01 was a Thursday)"""
+    return (timestamps.astype('datetime64[D]').astype(np.int64) + 3) % 7
+
+
+@dataclass
+class Episodes:
+    """Runs of consecutive True values, one entry per run, for every FIP at once"""
+    fip_index: np.ndarray
+    start: np.ndarray   # time index of the first point
+    end: np.ndarray     # time index of the last point (inclusive)
+
+    @property
+    def length(self) -> np.ndarray:
+        return self.end - self.start + 1
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def select(self, keep: np.ndarray) -> 'Episodes':
+        return Episodes(self.fip_index[keep], self.start[keep], self.end[keep])
+
+    def reduce(self, values: np.ndarray, ufunc: np.ufunc) -> np.ndarray:
+        """ufunc.reduce of a [time, fip] array over each episode"""
+        if len(self) == 0:
+            return np.empty(0, dtype=values.dtype)
+        n_times = values.shape[0]
+        flat = np.append(np.ascontiguousarray(values.T).ravel(), values.dtype.type(0))  # sentinel for the last run
+        offsets = self.fip_index * n_times
+        bounds = np.column_stack([offsets + self.start, offsets + self.end + 1]).ravel()
+        return ufunc.reduceat(flat, bounds)[::2]
+
+    def count_within(self, flags: np.ndarray) -> np.ndarray:
+        """Number of True time flags (shared by all FIPs) inside each episode"""
+        cumulative = np.concatenate([[0], np.cumsum(flags, dtype=np.int64)])
+        return cumulative[self.end + 1] - cumulative[self.start]
+
+
+def run_length_episodes(mask: np.ndarray, min_length: int = 1) -> Episodes:
+    """Run-length encode a [time] or [time, fip] boolean array into episodes"""
+    mask = mask.reshape(len(mask), -1)
+    n_times, n_fips = mask.shape
+    padded = np.zeros((n_fips, n_times + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T
+
+    edges = np.diff(padded, axis=1)
+    fip_index, start = np.nonzero(edges == 1)
+    _, end_exclusive = np.nonzero(edges == -1)  # row-major order pairs each end with its start
+
+    episodes = Episodes(fip_index, start, end_exclusive - 1)
+    if min_length > 1:
+        episodes = episodes.select(episodes.length >= min_length)
+    return episodes
+
+
+def detect_downtime_episodes(health_score: np.ndarray, timestamps: np.ndarray,
+                             threshold: float = DOWNTIME_HEALTH_THRESHOLD,
+                             min_length: int = MIN_EPISODE_POINTS):
+    """
+    Downtime episodes (health below threshold for at least min_length points) for all FIPs.
+    Returns (episodes, is_maintenance), where an episode counts as maintenance when it
+    never touches business hours or touches a weekend.
+    """
+    episodes = run_length_episodes(health_score < threshold, min_length)
+    hours, days = hour_of_day(timestamps), day_of_week(timestamps)
+    business = (hours >= BUSINESS_HOURS[0]) & (hours <= BUSINESS_HOURS[1])
+    weekend = np.isin(days, WEEKEND_DAYS)
+    is_maintenance = (episodes.count_within(business) == 0) | (episodes.count_within(weekend) > 0)
+    return episodes, is_maintenance
+
+
+@dataclass
+class RecurringProfile:
+    """Per-FIP downtime rates by hour of day, day of week, weekend and business hours"""
+    hour_rate: np.ndarray       # [fip, 24], NaN where the hour never occurs
+    day_rate: np.ndarray        # [fip, 7]
+    weekend_rate: np.ndarray    # [fip]
+    business_rate: np.ndarray   # [fip]
+
+    @property
+    def high_risk_hours(self) -> np.ndarray:
+        return np.nan_to_num(self.hour_rate) > RECURRING_RATE_THRESHOLD
+
+    @property
+    def high_risk_days(self) -> np.ndarray:
+        return np.nan_to_num(self.day_rate) > RECURRING_RATE_THRESHOLD
+
+
+def _grouped_rate(downtime: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Mean of a [time, fip] 0/1 array per group of the time axis -> [fip, n_groups]"""
+    one_hot = np.zeros((len(groups), n_groups))
+    one_hot[np.arange(len(groups)), groups] = 1.0
+    counts = one_hot.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (one_hot.T @ downtime / counts[:, None]).T
+
+
+def recurring_profile(health_score: np.ndarray, timestamps: np.ndarray,
+                      threshold: float = DOWNTIME_HEALTH_THRESHOLD) -> RecurringProfile:
+    health_score = health_score.reshape(len(health_score), -1)
+    downtime = (health_score < threshold).astype(np.float64)
+    hours, days = hour_of_day(timestamps), day_of_week(timestamps)
+    weekend = np.isin(days, WEEKEND_DAYS).astype(np.int64)
+    business = ((hours >= BUSINESS_HOURS[0]) & (hours <= BUSINESS_HOURS[1])).astype(np.int64)
+    return RecurringProfile(
+        hour_rate=_grouped_rate(downtime, hours, 24),
+        day_rate=_grouped_rate(downtime, days, 7),
+        weekend_rate=_grouped_rate(downtime, weekend, 2)[:, 1],
+        business_rate=_grouped_rate(downtime, business, 2)[:, 1]
+    )
+
+
+@dataclass
+class RiskProjection:
+    """Hourly risk for the next horizon_hours, for every FIP"""
+    times: List[datetime]
+    risk: np.ndarray            # [fip, hour]
+    hour_pattern: np.ndarray    # [fip, hour] slot is a recurring high-risk hour
+    weekend_pattern: np.ndarray  # [fip, hour] weekend slot with weekend risk above 10%
+    declining: np.ndarray       # [fip]
+    current_health: np.ndarray  # [fip]
+
+    @property
+    def high_risk(self) -> np.ndarray:
+        return self.risk > HIGH_RISK_THRESHOLD
+
+
+def project_risk(profile: RecurringProfile, current_health: np.ndarray, health_trend: np.ndarray,
+                 horizon_hours: int = 24, now: Optional[datetime] = None) -> RiskProjection:
+    """
+    Risk per FIP and future hour: a 10% base plus the recurring hour-of-week risk, adjusted
+    for the 24h health trend and the current health score, capped at 1.0.
+    """
+    now = now or datetime.now()
+    times = [now + timedelta(hours=offset) for offset in range(horizon_hours)]
+    slots = np.array([t.weekday() * 24 + t.hour for t in times])
+
+    weekend_slot = np.isin(slots // 24, WEEKEND_DAYS)
+    trend_adjustment = np.where(health_trend < -1, 0.2, np.where(health_trend > 1, -0.1, 0.0))
+    health_adjustment = np.where(current_health < 50, 0.3, np.where(current_health < 70, 0.1, 0.0))
+
+    # Terms are added in a fixed order so scores on the 0.4/0.6 boundaries are reproducible
+    risk = 0.1 + 0.3 * profile.high_risk_hours[:, slots % 24]
+    risk = risk + 0.2 * profile.high_risk_days[:, slots // 24]
+    risk = risk + np.where(weekend_slot, 0.5 * profile.weekend_rate[:, None], 0.0)
+    risk = risk + trend_adjustment[:, None]
+    risk = risk + health_adjustment[:, None]
+
+    return RiskProjection(
+        times=times,
+        risk=np.minimum(risk, 1.0),
+        hour_pattern=profile.high_risk_hours[:, slots % 24],
+        weekend_pattern=weekend_slot[None, :] & (np.nan_to_num(profile.weekend_rate) > 0.1)[:, None],
+        declining=health_trend < -1,
+        current_health=current_health
+    )
@@ -1,10 +1,11 @@
 import json
-import boto3
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 import numpy as np
 from utils.logger import logger
+from utils.aws import get_aws_client
+from utils.instrumentation import timed_bedrock_call
 
 @dataclass
 class PredictionResult:
@@ -39,38 +40,45 @@ class EnhancedBedrockService:
         self.logger = logger
         
         if not use_mock:
-            try:
-                self.bedrock_client = boto3.client(
-                    'bedrock-runtime',
-                    region_name=region_name
-                )
-                self.logger.info("✅ Enhanced Bedrock client initialized")
-            except Exception as e:
-                self.logger.warning(f"⚠️ Bedrock initialization failed, using mock mode: {e}")
-                self.use_mock = True
+            self.logger.info("✅ Enhanced Bedrock enabled (client created on first call)")
         else:
             self.logger.info("🎭 Using enhanced mock Bedrock for development")
     
+    @property
+    def bedrock_client(self):
+        """Created on first real call; if that fails the service falls back to mock responses"""
+        if self.use_mock:
+            return None
+        try:
+            return get_aws_client('bedrock-runtime', self.region_name)
+        except Exception as e:
+            self.logger.warning(f"⚠️  Bedrock initialization failed, falling back to mock: {e}")
+            self.use_mock = True
+            return None
+    
+    @timed_bedrock_call
     def analyze_historical_patterns(self, comprehensive_report: Dict) -> Dict[str, Any]:
         """
         Analyze historical data patterns using AI to identify trends,
         anomalies, and maintenance windows
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._mock_analyze_historical_patterns(comprehensive_report)
         else:
             return self._bedrock_analyze_historical_patterns(comprehensive_report)
     
+    @timed_bedrock_call
     def predict_downtime_events(self, comprehensive_report: Dict, 
                                prediction_horizon: str = "24h") -> Dict[str, PredictionResult]:
         """
         Generate AI-powered downtime predictions for each FIP
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._mock_predict_downtime_events(comprehensive_report, prediction_horizon)
         else:
             return self._bedrock_predict_downtime_events(comprehensive_report, prediction_horizon)
     
+    @timed_bedrock_call
     def generate_proactive_alerts(self, comprehensive_report: Dict,
                                  current_metrics: Dict) -> List[Alert]:
         """
@@ -78,18 +86,19 @@ class EnhancedBedrockService:
         and current system state
         """
         logger.info(f"Bedrock use mock: {self.use_mock}")
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             logger.info(f"Bedrock use mock: {self.use_mock} | _mock_generate_proactive_alerts")
             return self._mock_generate_proactive_alerts(comprehensive_report, current_metrics)
         else:
             return self._bedrock_generate_proactive_alerts(comprehensive_report, current_metrics)
     
+    @timed_bedrock_call
     def generate_business_insights(self, comprehensive_report: Dict,
                                  predictions: Dict[str, PredictionResult]) -> Dict[str, Any]:
         """
         Generate business-focused insights and recommendations
         """
-        if self.use_mock:
+        if self.use_mock or self.bedrock_client is None:
             return self._mock_generate_business_insights(comprehensive_report, predictions)
         else:
             return self._bedrock_generate_business_insights(comprehensive_report, predictions)
@@ -0,0 +1,630 @@
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from utils.logger import logger
+
+_STEP_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def step_to_timedelta(step: str) -> timedelta:
+    """Convert a Prometheus step such as "15m" to a timedelta"""
+    return timedelta(seconds=int(step[:-1]) * _STEP_UNITS[step[-1]])
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated quantile of a sorted list (same as pandas' default)"""
+    position = q * (len(sorted_values) - 1)
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _count_outside(sorted_values: List[float], lower: float, upper: float) -> int:
+    """Number of values strictly below lower or strictly above upper"""
+    return bisect_left(sorted_values, lower) + len(sorted_values) - bisect_right(sorted_values, upper)
+
+
+def _remove_sorted(sorted_values: List[float], value: float) -> None:
+    del sorted_values[bisect_left(sorted_values, value)]
+
+
+# ================================
+# SLIDING WINDOW PER SERIES
+# ================================
+
+class SeriesWindow:
+    """
+    Sliding-window aggregates for one (FIP, metric) series.
+
+    Samples are appended as new buckets arrive and retired once they fall out of the
+    window; every aggregate is updated by adding or subtracting the changed bucket, so
+    the cost of a cycle depends on the number of changed buckets, not the window length.
+    Running sums are rebuilt from the live samples whenever the buffers are compacted,
+    which keeps floating-point drift bounded at amortized O(1) cost.
+    """
+
+    RECENT_FRACTION = 0.8  # "recent" anomalies are those in the last 20% of samples
+
+    def __init__(self):
+        # All samples (including NaN) for data-quality features
+        self._times: List[datetime] = []
+        self._head = 0
+        self.missing = 0
+
+        # Non-NaN samples; list index doubles as the regression x coordinate
+        self._nn_times: List[datetime] = []
+        self._nn_values: List[float] = []
+        self._nn_cum: List[float] = []  # prefix sums of shifted values
+        self._nn_head = 0
+
+        self._sorted: List[float] = []
+        self._recent_sorted: List[float] = []
+        self._recent_from = 0
+
+        self._shift: Optional[float] = None
+        self._reset_sums()
+
+    # ---------- bookkeeping ----------
+
+    def _reset_sums(self) -> None:
+        self._power = [0.0, 0.0, 0.0, 0.0]  # sums of shifted values to the 1st..4th power
+        self._sx = self._sxx = self._sxy = 0.0
+        self._hour = np.zeros((24, 3))      # sum, sum of squares, count (shifted values)
+        self._weekend = np.zeros((2, 2))    # [weekday, weekend] x (sum, count)
+        self._changes = 0                   # adjacent non-NaN pairs that differ
+
+    def _add(self, index: int, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) the contribution of non-NaN sample ``index``"""
+        timestamp, value = self._nn_times[index], self._nn_values[index]
+        y = value - self._shift
+        power = y
+        for k in range(4):
+            self._power[k] += sign * power
+            power *= y
+        self._sx += sign * index
+        self._sxx += sign * index * index
+        self._sxy += sign * index * y
+        self._hour[timestamp.hour] += sign * np.array([y, y * y, 1.0])
+        self._weekend[int(timestamp.weekday() >= 5)] += sign * np.array([y, 1.0])
+
+    def _rebuild(self) -> None:
+        """Compact the buffers and recompute every running sum from the live samples"""
+        head = self._nn_head
+        self._times = self._times[self._head:]
+        self._head = 0
+        self._nn_times = self._nn_times[head:]
+        self._nn_values = self._nn_values[head:]
+        self._recent_from -= head
+        self._nn_head = 0
+
+        self._reset_sums()
+        self._shift = self._nn_values[0] if self._nn_values else None
+        self._nn_cum = []
+        total = 0.0
+        for index, value in enumerate(self._nn_values):
+            self._add(index, 1)
+            total += value - self._shift
+            self._nn_cum.append(total)
+            if index > 0 and value != self._nn_values[index - 1]:
+                self._changes += 1
+
+    def _rebalance_recent(self) -> None:
+        """Keep _recent_sorted equal to the last 20% of non-NaN samples"""
+        target = self._nn_head + int(self.count * self.RECENT_FRACTION)
+        while self._recent_from > target:
+            self._recent_from -= 1
+            insort(self._recent_sorted, self._nn_values[self._recent_from])
+        while self._recent_from < target:
+            _remove_sorted(self._recent_sorted, self._nn_values[self._recent_from])
+            self._recent_from += 1
+
+    # ---------- updates ----------
+
+    def append(self, timestamp: datetime, value: float) -> None:
+        self._times.append(timestamp)
+        if value is None or np.isnan(value):
+            self.missing += 1
+            return
+
+        value = float(value)
+        if self._shift is None:
+            self._shift = value
+
+        if self.count > 0 and value != self._nn_values[-1]:
+            self._changes += 1
+
+        index = len(self._nn_values)
+        self._nn_times.append(timestamp)
+        self._nn_values.append(value)
+        self._nn_cum.append((self._nn_cum[-1] if index > 0 else 0.0) + value - self._shift)
+        self._add(index, 1)
+
+        insort(self._sorted, value)
+        insort(self._recent_sorted, value)
+        self._rebalance_recent()
+
+    def retire(self, cutoff: datetime) -> None:
+        """Drop samples older than cutoff"""
+        nn_end = len(self._nn_times)
+        while self._head < len(self._times) and self._times[self._head] < cutoff:
+            timestamp = self._times[self._head]
+            self._head += 1
+            if self._nn_head < nn_end and self._nn_times[self._nn_head] == timestamp:
+                self._retire_oldest()
+            else:
+                self.missing -= 1
+
+        if self._nn_head > 1024 and self._nn_head > self.count:
+            self._rebuild()
+
+    def _retire_oldest(self) -> None:
+        index = self._nn_head
+        value = self._nn_values[index]
+        if index + 1 < len(self._nn_values) and self._nn_values[index + 1] != value:
+            self._changes -= 1
+
+        self._add(index, -1)
+        _remove_sorted(self._sorted, value)
+        if self._recent_from <= index:
+            _remove_sorted(self._recent_sorted, value)
+            self._recent_from = index + 1
+        self._nn_head += 1
+        self._rebalance_recent()
+
+    # ---------- aggregates ----------
+
+    @property
+    def count(self) -> int:
+        return len(self._nn_values) - self._nn_head
+
+    @property
+    def total_points(self) -> int:
+        return len(self._times) - self._head
+
+    @property
+    def last_time(self) -> Optional[datetime]:
+        return self._times[-1] if self.total_points else None
+
+    def mean(self) -> float:
+        n = self.count
+        return self._power[0] / n + self._shift if n else float('nan')
+
+    def _central_sums(self):
+        """Sums of the 2nd..4th powers of deviations from the mean"""
+        n = self.count
+        s1, s2, s3, s4 = self._power
+        m = s1 / n
+        m2 = max(s2 - n * m * m, 0.0)
+        m3 = s3 - 3 * m * s2 + 3 * m * m * s1 - n * m ** 3
+        m4 = s4 - 4 * m * s3 + 6 * m * m * s2 - 4 * m ** 3 * s1 + n * m ** 4
+        return m2, m3, m4
+
+    def std(self) -> float:
+        n = self.count
+        if n < 2:
+            return float('nan')
+        return math.sqrt(self._central_sums()[0] / (n - 1))
+
+    def skew(self) -> float:
+        n = self.count
+        if n < 3:
+            return float('nan')
+        m2, m3, _ = self._central_sums()
+        if m2 == 0:
+            return 0.0
+        return (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+
+    def kurtosis(self) -> float:
+        n = self.count
+        if n < 4:
+            return float('nan')
+        m2, _, m4 = self._central_sums()
+        denominator = (n - 2) * (n - 3) * m2 ** 2
+        if denominator == 0:
+            return 0.0
+        adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        return n * (n + 1) * (n - 1) * m4 / denominator - adjustment
+
+    def quantile(self, q: float) -> float:
+        return _quantile(self._sorted, q)
+
+    def slope(self) -> float:
+        """Least-squares slope over sample positions (gaps skipped)"""
+        n = self.count
+        sxx = self._sxx - self._sx * self._sx / n
+        if sxx == 0:
+            return 0.0
+        return (self._sxy - self._sx * self._power[0] / n) / sxx
+
+    def range_mean(self, start: int, stop: int) -> float:
+        """Mean of non-NaN samples [start, stop) counted from the oldest live sample"""
+        start += self._nn_head
+        stop += self._nn_head
+        if stop <= start:
+            return float('nan')
+        total = self._nn_cum[stop - 1] - (self._nn_cum[start - 1] if start > 0 else 0.0)
+        return total / (stop - start) + self._shift
+
+    def fraction(self, below: Optional[float] = None, above: Optional[float] = None,
+                 equal: Optional[float] = None) -> float:
+        n = self.count
+        if below is not None:
+            matches = bisect_left(self._sorted, below)
+        elif above is not None:
+            matches = n - bisect_right(self._sorted, above)
+        else:
+            matches = bisect_right(self._sorted, equal) - bisect_left(self._sorted, equal)
+        return matches / n
+
+    # ---------- feature groups (mirror PrometheusHistoricalAnalyzer) ----------
+
+    def data_quality_features(self) -> Dict:
+        total = self.total_points
+        first, last = self._times[self._head], self._times[-1]
+        span_seconds = (last - first).total_seconds()
+        return {
+            'total_points': total,
+            'missing_values': self.missing,
+            'missing_percentage': (self.missing / total) * 100,
+            'data_span_hours': span_seconds / 3600,
+            'avg_interval_minutes': span_seconds / (total - 1) / 60 if total > 1 else float('nan')
+        }
+
+    def statistical_features(self, metric_name: str) -> Optional[Dict]:
+        if self.count == 0:
+            return None
+        scale = 1.0 if metric_name == 'response_time' else 100.0
+        mean, std = self.mean(), self.std()
+        return {
+            'mean': mean * scale,
+            'median': self.quantile(0.5) * scale,
+            'std': std * scale,
+            'min': self._sorted[0] * scale,
+            'max': self._sorted[-1] * scale,
+            'p25': self.quantile(0.25) * scale,
+            'p75': self.quantile(0.75) * scale,
+            'p95': self.quantile(0.95) * scale,
+            'skewness': float(self.skew()),
+            'kurtosis': float(self.kurtosis()),
+            'coefficient_of_variation': float(std / mean) if mean != 0 else 0
+        }
+
+    def trend_features(self) -> Optional[Dict]:
+        n = self.count
+        if n <= 1:
+            return None
+        slope = self.slope()
+
+        split_point = n // 2
+        recent_mean = self.range_mean(split_point, n)
+        historical_mean = self.range_mean(0, split_point)
+        relative_change = ((recent_mean - historical_mean) / historical_mean) * 100 if historical_mean != 0 else 0
+
+        ma_short = self.range_mean(n - min(6, n // 2), n)
+        ma_long = self.range_mean(n - min(12, n // 2), n)
+
+        return {
+            'linear_slope': float(slope),
+            'trend_direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
+            'recent_vs_historical_change_pct': float(relative_change),
+            'trend_strength': abs(float(slope)),
+            'moving_avg_crossover': bool(ma_short > ma_long)
+        }
+
+    def pattern_features(self) -> Optional[Dict]:
+        if self.count == 0:
+            return None
+
+        sums, squares, counts = self._hour[:, 0], self._hour[:, 1], self._hour[:, 2]
+        present = counts > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hourly_mean = np.where(present, sums / counts, np.nan) + self._shift
+            hourly_var = (squares - counts * (sums / counts) ** 2) / (counts - 1)
+            hourly_std = np.where(counts > 1, np.sqrt(np.maximum(hourly_var, 0.0)), np.nan)
+
+        means = hourly_mean[present]
+        means_mean = float(means.mean())
+        means_std = float(means.std(ddof=1)) if len(means) > 1 else float('nan')
+
+        weekday_sum, weekday_count = self._weekend[0]
+        weekend_sum, weekend_count = self._weekend[1]
+        weekday_mean = weekday_sum / weekday_count + self._shift if weekday_count else float('nan')
+        weekend_mean = weekend_sum / weekend_count + self._shift if weekend_count else float('nan')
+
+        return {
+            'peak_hour': int(np.nanargmax(hourly_mean)),
+            'low_hour': int(np.nanargmin(hourly_mean)),
+            'hourly_variation_coefficient': float(means_std / means_mean) if means_mean != 0 else 0,
+            'weekend_vs_weekday_ratio': float(weekend_mean / weekday_mean) if weekday_mean != 0 and not np.isnan(weekend_mean) else 1,
+            'has_clear_daily_pattern': bool(means_std > means_mean * 0.1),
+            'most_stable_hour': int(np.nanargmin(hourly_std)) if not np.isnan(hourly_std).all() else 0
+        }
+
+    def anomaly_features(self) -> Optional[Dict]:
+        n = self.count
+        if n <= 5:
+            return None
+
+        mean, std = self.mean(), self.std()
+        anomaly_threshold = 2.5
+        if std > 0:
+            lower, upper = mean - anomaly_threshold * std, mean + anomaly_threshold * std
+            total_anomalies = _count_outside(self._sorted, lower, upper)
+            recent_anomalies = _count_outside(self._recent_sorted, lower, upper)
+            max_z_score = max(self._sorted[-1] - mean, mean - self._sorted[0]) / std
+        else:
+            total_anomalies = recent_anomalies = 0
+            max_z_score = float('nan')
+
+        q1, q3 = self.quantile(0.25), self.quantile(0.75)
+        iqr = q3 - q1
+        anomaly_rate = total_anomalies / n
+
+        return {
+            'total_anomalies': int(total_anomalies),
+            'anomaly_rate': float(anomaly_rate),
+            'recent_anomalies': int(recent_anomalies),
+            'iqr_anomalies': int(_count_outside(self._sorted, q1 - 1.5 * iqr, q3 + 1.5 * iqr)),
+            'max_z_score': float(max_z_score),
+            'anomaly_severity': 'high' if anomaly_rate > 0.1 else 'medium' if anomaly_rate > 0.05 else 'low'
+        }
+
+    def status_features(self) -> Optional[Dict]:
+        if self.count <= 1:
+            return None
+
+        healthy_time = self.fraction(equal=1.0)
+        degraded_time = self.fraction(equal=0.5)
+        critical_time = self.fraction(equal=0.0)
+
+        return {
+            # the first sample counts as a change, as with Series.diff() != 0
+            'status_changes': int(self._changes + 1),
+            'healthy_time_pct': float(healthy_time * 100),
+            'degraded_time_pct': float(degraded_time * 100),
+            'critical_time_pct': float(critical_time * 100),
+            'stability_score': float(healthy_time * 1.0 + degraded_time * 0.5 + critical_time * 0.0),
+            'status_volatility': float(self.std())
+        }
+
+
+# ================================
+# PER-FIP STATE
+# ================================
+
+class PairWindow:
+    """Sliding Pearson correlation between two series aligned on identical timestamps"""
+
+    def __init__(self):
+        self._pending: Dict[datetime, List[Optional[float]]] = {}
+        self._pairs: List[tuple] = []
+        self._head = 0
+        self._sums = np.zeros(6)  # n, sx, sy, sxx, syy, sxy over pairs where both are valid
+
+    def append(self, side: int, timestamp: datetime, value: float) -> None:
+        pending = self._pending.setdefault(timestamp, [None, None])
+        pending[side] = value
+        if pending[0] is not None and pending[1] is not None:
+            del self._pending[timestamp]
+            x, y = pending
+            self._pairs.append((timestamp, x, y))
+            self._update(x, y, 1)
+
+    def _update(self, x: float, y: float, sign: int) -> None:
+        if not (np.isnan(x) or np.isnan(y)):
+            self._sums += sign * np.array([1.0, x, y, x * x, y * y, x * y])
+
+    def retire(self, cutoff: datetime) -> None:
+        while self._head < len(self._pairs) and self._pairs[self._head][0] < cutoff:
+            _, x, y = self._pairs[self._head]
+            self._update(x, y, -1)
+            self._head += 1
+        for timestamp in [t for t in self._pending if t < cutoff]:
+            del self._pending[timestamp]
+        if self._head > 1024 and self._head > len(self._pairs) - self._head:
+            self._pairs = self._pairs[self._head:]
+            self._head = 0
+            self._sums = np.zeros(6)
+            for _, x, y in self._pairs:
+                self._update(x, y, 1)
+
+    @property
+    def merged_rows(self) -> int:
+        return len(self._pairs) - self._head
+
+    def correlation(self) -> float:
+        n, sx, sy, sxx, syy, sxy = self._sums
+        if n < 2:
+            return float('nan')
+        cov = sxy - sx * sy / n
+        var_x, var_y = sxx - sx * sx / n, syy - sy * sy / n
+        if var_x <= 0 or var_y <= 0:
+            return float('nan')
+        return cov / math.sqrt(var_x * var_y)
+
+
+class FIPFeatureState:
+    """Sliding-window feature state for one FIP across all metrics"""
+
+    CORRELATED = ('consent_success_rate', 'response_time')
+
+    def __init__(self, fip_name: str):
+        self.fip_name = fip_name
+        self.series: Dict[str, SeriesWindow] = {}
+        self.consent_response = PairWindow()
+
+    def append(self, metric_name: str, timestamps, values) -> None:
+        window = self.series.setdefault(metric_name, SeriesWindow())
+        side = self.CORRELATED.index(metric_name) if metric_name in self.CORRELATED else None
+        last_time = window.last_time
+
+        for timestamp, value in zip(timestamps, values):
+            if last_time is not None and timestamp <= last_time:
+                continue  # bucket already in the window
+            window.append(timestamp, value)
+            if side is not None:
+                self.consent_response.append(side, timestamp, float(value))
+
+    def retire(self, cutoff: datetime) -> None:
+        for window in self.series.values():
+            window.retire(cutoff)
+        self.consent_response.retire(cutoff)
+
+    def features(self) -> Dict:
+        """Features in the same shape as PrometheusHistoricalAnalyzer._calculate_fip_features"""
+        features = {
+            'fip_name': self.fip_name,
+            'analysis_timestamp': datetime.utcnow().isoformat(),
+            'data_quality': {},
+            'statistical_features': {},
+            'trend_features': {},
+            'pattern_features': {},
+            'anomaly_features': {},
+            'performance_features': {},
+            'stability_features': {}
+        }
+
+        live = {name: window for name, window in self.series.items() if window.total_points > 0}
+        if not live:
+            return features
+
+        groups = {
+            'statistical_features': lambda name, window: window.statistical_features(name),
+            'trend_features': lambda name, window: window.trend_features(),
+            'pattern_features': lambda name, window: window.pattern_features(),
+            'anomaly_features': lambda name, window: window.anomaly_features(),
+        }
+        for name, window in live.items():
+            features['data_quality'][name] = window.data_quality_features()
+            for group, compute in groups.items():
+                result = compute(name, window)
+                if result is not None:
+                    features[group][name] = result
+
+        features['performance_features'] = self._performance_features(live)
+        features['stability_features'] = self._stability_features(live)
+        return features
+
+    def _performance_features(self, live: Dict[str, SeriesWindow]) -> Dict:
+        performance_features = {}
+
+        if all(name in live for name in self.CORRELATED) and self.consent_response.merged_rows > 2:
+            correlation = self.consent_response.correlation()
+            performance_features['consent_response_correlation'] = float(correlation) if not np.isnan(correlation) else 0
+
+        consent = live.get('consent_success_rate')
+        if consent is not None and consent.count > 0:
+            performance_features['consent_stability'] = {
+                'below_80_pct_time': float(consent.fraction(below=80)),
+                'below_50_pct_time': float(consent.fraction(below=50)),
+                'average_success_rate': float(consent.mean()),
+                'worst_performance_period': float(consent.quantile(0.0)),
+                'performance_volatility': float(consent.std())
+            }
+
+        response = live.get('response_time')
+        if response is not None and response.count > 0:
+            performance_features['response_time_analysis'] = {
+                'above_5s_time': float(response.fraction(above=5)),
+                'above_10s_time': float(response.fraction(above=10)),
+                'average_response_time': float(response.mean()),
+                'worst_response_time': float(response.quantile(1.0)),
+                'response_time_volatility': float(response.std())
+            }
+
+        return performance_features
+
+    def _stability_features(self, live: Dict[str, SeriesWindow]) -> Dict:
+        stability_features = {}
+
+        status = live.get('status')
+        status_analysis = status.status_features() if status is not None else None
+        if status_analysis is not None:
+            stability_features['status_analysis'] = status_analysis
+
+        all_metrics_stability = []
+        for name in ['consent_success_rate', 'data_fetch_success_rate']:
+            window = live.get(name)
+            if window is not None and window.count > 0:
+                mean = window.mean()
+                all_metrics_stability.append(window.std() / mean if mean != 0 else float('inf'))
+
+        if all_metrics_stability:
+            average_cv = np.mean(all_metrics_stability)
+            stability_features['overall_stability'] = {
+                'average_coefficient_of_variation': float(average_cv),
+                'stability_grade': 'excellent' if average_cv < 0.1 else
+                                'good' if average_cv < 0.2 else
+                                'fair' if average_cv < 0.3 else 'poor'
+            }
+
+        return stability_features
+
+
+# ================================
+# INCREMENTAL PIPELINE
+# ================================
+
+class IncrementalFeaturePipeline:
+    """
+    Keeps the per-FIP feature state for a sliding window of history.
+
+    The first refresh loads the full window; later refreshes only query the buckets
+    newer than the last one seen and retire buckets that fell out of the window.
+    """
+
+    def __init__(self, historical_analyzer, days_back: int = 30, step: str = "15m"):
+        self.logger = logger
+        self.historical_analyzer = historical_analyzer
+        self.window = timedelta(days=days_back)
+        self.step = step
+        self._step_delta = step_to_timedelta(step)
+        self._states: Dict[str, FIPFeatureState] = {}
+        self._next_start: Dict[str, datetime] = {}  # UTC start of the next query per metric
+        self._lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, Dict]:
+        """Pull new buckets, retire expired ones and return features for every FIP"""
+        with self._lock:
+            end_time = datetime.utcnow()
+            new_points = 0
+
+            for metric_name, metric_query in self.historical_analyzer.metric_queries.items():
+                start_time = self._next_start.get(metric_name, end_time - self.window)
+                if start_time > end_time:
+                    continue
+
+                df = self.historical_analyzer._query_range(
+                    query=metric_query.query,
+                    start_time=start_time,
+                    end_time=end_time,
+                    step=self.step
+                )
+                if df.empty:
+                    continue
+
+                for fip_name, group in df.groupby('fip_name', sort=False):
+                    state = self._states.get(fip_name)
+                    if state is None:
+                        state = self._states[fip_name] = FIPFeatureState(fip_name)
+                    state.append(metric_name, group.index.to_pydatetime(), group['value'].to_numpy(dtype=float))
+
+                new_points += len(df)
+                # Sample timestamps are local wall-clock (datetime.fromtimestamp); queries take UTC
+                last_seen = df.index.max().to_pydatetime().timestamp()
+                self._next_start[metric_name] = datetime.utcfromtimestamp(last_seen) + self._step_delta
+
+            cutoff = datetime.fromtimestamp((end_time - self.window - datetime(1970, 1, 1)).total_seconds())
+            for state in self._states.values():
+                state.retire(cutoff)
+
+            self.logger.info(f"🔄 Incremental feature refresh: {new_points} new points across {len(self._states)} FIPs")
+
+            return {
+                fip_name: state.features()
+                for fip_name, state in self._states.items()
+                if any(window.total_points > 0 for window in state.series.values())
+            }
@@ -5,11 +5,19 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 from utils.logger import logger
+from utils.instrumentation import PipelineTimer, cache_stats, stage
+from config import Config
 
 # Import our custom services
 from services.historical_analyzer import PrometheusHistoricalAnalyzer
+from services.feature_state import IncrementalFeaturePipeline
+from services.history_store import ColumnarHistoryStore
+from services.shared_matrix import SharedMatrixReader
 from services.enhanced_bedrock_service import EnhancedBedrockService, PredictionResult, Alert
 
+HISTORY_STORE_CACHE = cache_stats('history_store')        # long-range loads served from Parquet
+FEATURE_PIPELINE_CACHE = cache_stats('feature_pipeline')  # incremental feature state reused
+
 @dataclass
 class AnalyticsResult:
     """Complete analytics result combining all AI insights"""
@@ -37,6 +45,8 @@ class FIPAIAnalyticsService:
         
         # Initialize component services
         self.historical_analyzer = PrometheusHistoricalAnalyzer(prometheus_url)
+        if Config.SHARED_MATRIX_ENABLED:
+            self.historical_analyzer.shared_matrix = SharedMatrixReader()
         self.bedrock_service = EnhancedBedrockService(
             use_mock=not use_real_bedrock, 
             region_name=bedrock_region
@@ -46,6 +56,12 @@ class FIPAIAnalyticsService:
         self._cache = {}
         self._cache_ttl = 300  # 5 minutes
         
+        # Sliding-window feature state, created on first use per (days_back, step)
+        self._feature_pipelines: Dict[tuple, IncrementalFeaturePipeline] = {}
+        
+        # Local Parquet history for long-range analytics, kept current by the compactor
+        self.history_store = ColumnarHistoryStore(self.historical_analyzer)
+        
         self.logger.info("🚀 FIP AI Analytics Service initialized")
     
     async def generate_comprehensive_analysis(self, 
@@ -65,6 +81,7 @@ class FIPAIAnalyticsService:
         """
         
         self.logger.info(f"🔍 Starting comprehensive FIP analysis for {days_back} days")
+        timer = PipelineTimer('comprehensive_analysis').start()
         
         try:
             # Step 1: Extract historical data
@@ -105,7 +122,8 @@ class FIPAIAnalyticsService:
             current_metrics = {}
             if include_current_metrics:
                 self.logger.info("⏱️ Fetching current metrics...")
-                current_metrics = await self._get_current_metrics()
+                with stage('get_current_metrics'):
+                    current_metrics = await self._get_current_metrics()
             
             # Step 8: Generate proactive alerts
             self.logger.info("🚨 Generating proactive alerts...")
@@ -120,24 +138,27 @@ class FIPAIAnalyticsService:
             )
             
             # Step 10: Create final result
-            result = AnalyticsResult(
-                timestamp=datetime.utcnow().isoformat(),
-                time_range_analyzed=comprehensive_report.get('time_range_analyzed', {}),
-                historical_patterns=historical_patterns,
-                predictions=predictions,
-                proactive_alerts=proactive_alerts,
-                business_insights=business_insights,
-                maintenance_windows=maintenance_windows,
-                summary=self._generate_executive_summary(
-                    comprehensive_report, predictions, proactive_alerts, business_insights
+            with stage('build_result'):
+                result = AnalyticsResult(
+                    timestamp=datetime.utcnow().isoformat(),
+                    time_range_analyzed=comprehensive_report.get('time_range_analyzed', {}),
+                    historical_patterns=historical_patterns,
+                    predictions=predictions,
+                    proactive_alerts=proactive_alerts,
+                    business_insights=business_insights,
+                    maintenance_windows=maintenance_windows,
+                    summary=self._generate_executive_summary(
+                        comprehensive_report, predictions, proactive_alerts, business_insights
+                    )
                 )
-            )
             
-            self.logger.info("✅ Comprehensive analysis completed successfully")
+            timer.stop()
+            self.logger.info(f"✅ Comprehensive analysis completed successfully in {timer.summary()}")
             return result
             
         except Exception as e:
-            self.logger.error(f"❌ Error in comprehensive analysis: {e}")
+            timer.stop()
+            self.logger.error(f"❌ Error in comprehensive analysis after {timer.summary()}: {e}")
             raise
     
     async def generate_quick_insights(self, 
@@ -744,10 +765,7 @@ class FIPAIAnalyticsService:
         
         try:
             # Extract historical data
-            historical_data = self.historical_analyzer.extract_historical_data(
-                days_back=days_back,
-                step="1h"
-            )
+            historical_data = self._load_long_range_history(days_back=days_back, step="1h")
             
             import pandas as pd
             import numpy as np
@@ -830,9 +848,10 @@ class FIPAIAnalyticsService:
         
         try:
             # Extract longer historical data for trend analysis
-            historical_data = self.historical_analyzer.extract_historical_data(
+            historical_data = self._load_long_range_history(
                 days_back=90,  # 3 months for trend analysis
-                step="1d"  # Daily aggregation for capacity planning
+                step="1d",  # Daily aggregation for capacity planning
+                metrics=['consent_success_rate', 'total_requests']
             )
             
             capacity_analysis = {}
@@ -1011,6 +1030,16 @@ class FIPAIAnalyticsService:
     # HELPER METHODS FOR ADVANCED ANALYTICS
     # ================================
     
+    def _load_long_range_history(self, days_back: int, step: str,
+                                 metrics: Optional[List[str]] = None) -> Dict:
+        """Read from the columnar history store, falling back to the TSDB when it is not covered"""
+        historical_data = self.history_store.load(days_back, step, metrics)
+        HISTORY_STORE_CACHE.record(historical_data is not None)
+        if historical_data is not None:
+            self.logger.info(f"📦 Loaded {days_back} days at {step} step from history store")
+            return historical_data
+        return self.historical_analyzer.extract_historical_data(days_back=days_back, step=step)
+    
     def _generate_correlation_insights(self, correlations: Dict) -> List[str]:
         """Generate insights from correlation analysis"""
         insights = []
@@ -1336,6 +1365,25 @@ class FIPAIAnalyticsService:
             self.logger.error(f"❌ Error getting FIP features: {e}")
             raise
 
+    def get_incremental_fip_features(self, days_back: int = 30, step: str = "15m") -> Dict:
+        """
+        Get FIP features over a sliding window, only fetching buckets added since the last call
+        """
+        try:
+            key = (days_back, step)
+            FEATURE_PIPELINE_CACHE.record(key in self._feature_pipelines)
+            if key not in self._feature_pipelines:
+                self._feature_pipelines[key] = IncrementalFeaturePipeline(self.historical_analyzer, days_back, step)
+
+            fip_features = self._feature_pipelines[key].refresh()
+            if not fip_features:
+                raise Exception("No historical data available for analysis")
+
+            return fip_features
+        except Exception as e:
+            self.logger.error(f"❌ Error getting incremental FIP features: {e}")
+            raise
+
     async def predict_downtime_events(self,fips:List[str], prediction_horizon: str = "24h") -> Dict:
         """
         Predict downtime events for a list of FIPs
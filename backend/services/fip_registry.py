@@ -0,0 +1,243 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import yaml
+from config import Config
+from utils.logger import logger
+
+
+STATUS_NAMES = ['healthy', 'warning', 'degraded', 'critical']
+
+DEFAULT_FIP_PROFILES = {
+    'sbi-fip': {
+        'bank_name': 'State Bank of India',
+        'base_success_rate': 95.0,
+        'base_response_time': 1.2,
+        'user_base': 4500,
+        'maintenance_hours': [2, 3, 4],  # 2 AM - 4 AM
+        'status': 'healthy'
+    },
+    'hdfc-fip': {
+        'bank_name': 'HDFC Bank',
+        'base_success_rate': 92.0,
+        'base_response_time': 1.5,
+        'user_base': 3200,
+        'maintenance_hours': [1, 2, 3],
+        'status': 'degraded'
+    },
+    'icici-fip': {
+        'bank_name': 'ICICI Bank',
+        'base_success_rate': 90.0,
+        'base_response_time': 1.8,
+        'user_base': 2800,
+        'maintenance_hours': [23, 0, 1],
+        'status': 'healthy'
+    },
+    'axis-fip': {
+        'bank_name': 'Axis Bank',
+        'base_success_rate': 88.0,
+        'base_response_time': 2.1,
+        'user_base': 1200,
+        'maintenance_hours': [3, 4, 5],
+        'status': 'critical'
+    },
+    'kotak-fip': {
+        'bank_name': 'Kotak Mahindra Bank',
+        'base_success_rate': 87.0,
+        'base_response_time': 2.3,
+        'user_base': 800,
+        'maintenance_hours': [2, 3],
+        'status': 'healthy'
+    },
+    'boi-fip': {
+        'bank_name': 'Bank of India',
+        'base_success_rate': 85.0,
+        'base_response_time': 2.8,
+        'user_base': 600,
+        'maintenance_hours': [1, 2, 3, 4],
+        'status': 'degraded'
+    },
+    'pnb-fip': {
+        'bank_name': 'Punjab National Bank',
+        'base_success_rate': 82.0,
+        'base_response_time': 3.2,
+        'user_base': 700,
+        'maintenance_hours': [0, 1, 2],
+        'status': 'healthy'
+    },
+    'canara-fip': {
+        'bank_name': 'Canara Bank',
+        'base_success_rate': 80.0,
+        'base_response_time': 3.5,
+        'user_base': 500,
+        'maintenance_hours': [2, 3, 4, 5],
+        'status': 'healthy'
+    },
+    'ubi-fip': {
+        'bank_name': 'Union Bank of India',
+        'base_success_rate': 78.0,
+        'base_response_time': 4.0,
+        'user_base': 400,
+        'maintenance_hours': [1, 2],
+        'status': 'degraded'
+    },
+    'iob-fip': {
+        'bank_name': 'Indian Overseas Bank',
+        'base_success_rate': 75.0,
+        'base_response_time': 4.5,
+        'user_base': 300,
+        'maintenance_hours': [3, 4],
+        'status': 'healthy'
+    },
+    'central-fip': {
+        'bank_name': 'Central Bank of India',
+        'base_success_rate': 72.0,
+        'base_response_time': 5.0,
+        'user_base': 250,
+        'maintenance_hours': [2, 3, 4],
+        'status': 'warning'
+    }
+}
+
+
+@dataclass
+class FIPRegistry:
+    """
+    The simulated FIP fleet as column arrays (one entry per FIP), so a simulation
+    step can update every FIP at once. ``fips`` gives the per-FIP config dicts.
+    """
+    names: List[str]
+    bank_names: List[str]
+    base_success_rate: np.ndarray    # float, percent
+    base_response_time: np.ndarray   # float, seconds
+    user_base: np.ndarray            # int
+    maintenance_mask: np.ndarray     # bool, [fip, 24], True in a maintenance hour (UTC)
+    status: List[str]                # configured status, drives the degradation factor
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def index(self) -> Dict[str, int]:
+        return {name: i for i, name in enumerate(self.names)}
+
+    @property
+    def fips(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                'bank_name': self.bank_names[i],
+                'base_success_rate': float(self.base_success_rate[i]),
+                'base_response_time': float(self.base_response_time[i]),
+                'user_base': int(self.user_base[i]),
+                'maintenance_hours': np.flatnonzero(self.maintenance_mask[i]).tolist(),
+                'status': self.status[i]
+            }
+            for i, name in enumerate(self.names)
+        }
+
+    @classmethod
+    def from_profiles(cls, profiles: Dict[str, Dict]) -> 'FIPRegistry':
+        names = list(profiles)
+        maintenance_mask = np.zeros((len(names), 24), dtype=bool)
+        for i, name in enumerate(names):
+            maintenance_mask[i, [int(h) % 24 for h in profiles[name].get('maintenance_hours', [])]] = True
+
+        return cls(
+            names=names,
+            bank_names=[profiles[name].get('bank_name', name) for name in names],
+            base_success_rate=np.array([float(profiles[name]['base_success_rate']) for name in names]),
+            base_response_time=np.array([float(profiles[name]['base_response_time']) for name in names]),
+            user_base=np.array([int(profiles[name].get('user_base', 0)) for name in names], dtype=np.int64),
+            maintenance_mask=maintenance_mask,
+            status=[profiles[name].get('status', 'healthy') for name in names]
+        )
+
+    @classmethod
+    def default(cls) -> 'FIPRegistry':
+        return cls.from_profiles(DEFAULT_FIP_PROFILES)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'FIPRegistry':
+        """
+        JSON or YAML, either a mapping of fip_name -> profile (the DEFAULT_FIP_PROFILES
+        layout) or a list of profiles that each carry a fip_name
+        """
+        with open(path) as f:
+            data = yaml.safe_load(f) if path.endswith(('.yml', '.yaml')) else json.load(f)
+        if isinstance(data, dict) and 'fips' in data:
+            data = data['fips']
+        if isinstance(data, list):
+            data = {profile['fip_name']: profile for profile in data}
+        return cls.from_profiles(data)
+
+    @classmethod
+    def synthetic(cls, n_fips: int, seed: Optional[int] = None) -> 'FIPRegistry':
+        """
+        n_fips FIPs: the default profiles first, then numbered variants of them with
+        jittered baselines and user bases and a maintenance window shifted by up to 3 hours
+        """
+        default = cls.default()
+        if n_fips <= len(default):
+            return default.subset(np.arange(n_fips))
+
+        rng = np.random.default_rng(seed)
+        template = np.arange(n_fips) % len(default)
+        extra = np.arange(len(default), n_fips)
+        names = default.names + [f"{default.names[template[i]]}-{i:05d}" for i in extra]
+        bank_names = default.bank_names + [f"{default.bank_names[template[i]]} {i:05d}" for i in extra]
+
+        base_success_rate = default.base_success_rate[template].copy()
+        base_response_time = default.base_response_time[template].copy()
+        user_base = default.user_base[template].copy()
+        maintenance_mask = default.maintenance_mask[template].copy()
+
+        n_extra = len(extra)
+        base_success_rate[extra] = np.clip(base_success_rate[extra] + rng.uniform(-5, 5, n_extra), 50, 99)
+        base_response_time[extra] *= rng.uniform(0.8, 1.25, n_extra)
+        user_base[extra] = (user_base[extra] * rng.uniform(0.5, 1.5, n_extra)).astype(np.int64)
+        shifts = rng.integers(-3, 4, n_extra)
+        maintenance_mask[extra] = maintenance_mask[extra][np.arange(n_extra)[:, None], (np.arange(24) - shifts[:, None]) % 24]
+
+        return cls(
+            names=names,
+            bank_names=bank_names,
+            base_success_rate=base_success_rate,
+            base_response_time=base_response_time,
+            user_base=user_base,
+            maintenance_mask=maintenance_mask,
+            status=[default.status[t] for t in template]
+        )
+
+    def subset(self, rows: np.ndarray) -> 'FIPRegistry':
+        return FIPRegistry(
+            names=[self.names[i] for i in rows],
+            bank_names=[self.bank_names[i] for i in rows],
+            base_success_rate=self.base_success_rate[rows],
+            base_response_time=self.base_response_time[rows],
+            user_base=self.user_base[rows],
+            maintenance_mask=self.maintenance_mask[rows],
+            status=[self.status[i] for i in rows]
+        )
+
+
+def load_fip_registry(source: Optional[str] = None) -> FIPRegistry:
+    """
+    FIP_REGISTRY_SOURCE: 'default' (the 11 sample FIPs), 'synthetic' (TOTAL_FIPS
+    generated FIPs, seeded by FIP_REGISTRY_SEED) or a path to a JSON/YAML file
+    """
+    source = source or Config.FIP_REGISTRY_SOURCE
+    if source == 'default':
+        return FIPRegistry.default()
+    if source == 'synthetic':
+        registry = FIPRegistry.synthetic(Config.get_fip_config()['total_fips'], seed=Config.FIP_REGISTRY_SEED)
+        logger.info(f"🧪 Simulating a synthetic fleet of {len(registry)} FIPs")
+        return registry
+    if os.path.exists(source):
+        registry = FIPRegistry.from_file(source)
+        logger.info(f"📋 Loaded {len(registry)} FIPs from {source}")
+        return registry
+
+    logger.warning(f"⚠️ FIP registry source '{source}' not found, using the default FIPs")
+    return FIPRegistry.default()
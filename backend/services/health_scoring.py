@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+
+RISK_LEVELS = np.array(['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'], dtype=object)
+RISK_LEVEL_EDGES = np.array([30.0, 60.0, 85.0])  # right-closed bins over 0-100
+RISK_SCORE_THRESHOLD = 0.5  # a metric scoring below this is a risk factor
+
+
+@dataclass
+class FleetHealth:
+    """Health scores for an aligned (time x FIP) grid; risk factors stay bitmasks until decoded"""
+    timestamps: np.ndarray
+    fip_names: List[str]
+    health_score: np.ndarray    # float, [time, fip], 0-100
+    risk_mask: np.ndarray       # uint, [time, fip], bit i = metric_names[i] is a risk factor
+    metric_names: List[str]
+
+    @property
+    def risk_level_codes(self) -> np.ndarray:
+        return np.searchsorted(RISK_LEVEL_EDGES, self.health_score, side='left').astype(np.int8)
+
+    def risk_factors(self, mask: int) -> List[str]:
+        return decode_risk_mask(mask, self.metric_names)
+
+    def latest(self) -> Dict[str, Dict]:
+        """Current score, level and decoded risk factors per FIP"""
+        if len(self.timestamps) == 0:
+            return {}
+        scores, masks = self.health_score[-1], self.risk_mask[-1]
+        levels = RISK_LEVELS[np.searchsorted(RISK_LEVEL_EDGES, scores, side='left')]
+        factors = decode_risk_masks(masks, self.metric_names)
+        return {
+            fip_name: {
+                'health_score': float(scores[i]),
+                'risk_level': levels[i],
+                'risk_factors': factors[i]
+            }
+            for i, fip_name in enumerate(self.fip_names)
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long (timestamp, fip_name) frame; risk factors decoded once per distinct mask"""
+        n_times, n_fips = self.health_score.shape
+        return pd.DataFrame({
+            'timestamp': np.repeat(self.timestamps, n_fips),
+            'fip_name': pd.Categorical.from_codes(np.tile(np.arange(n_fips), n_times), self.fip_names),
+            'health_score': self.health_score.ravel(),
+            'risk_level': pd.Categorical.from_codes(self.risk_level_codes.ravel(), RISK_LEVELS),
+            'risk_factors': decode_risk_masks(self.risk_mask.ravel(), self.metric_names, as_string=True)
+        })
+
+
+def decode_risk_mask(mask: int, metric_names: Sequence[str]) -> List[str]:
+    return [name for bit, name in enumerate(metric_names) if int(mask) >> bit & 1]
+
+
+def decode_risk_masks(masks: np.ndarray, metric_names: Sequence[str], as_string: bool = False) -> np.ndarray:
+    """Decode an array of masks via a lookup over its distinct values"""
+    unique, inverse = np.unique(masks, return_inverse=True)
+    if as_string:
+        table = np.array([''.join(f"{name}," for name in decode_risk_mask(m, metric_names)) for m in unique], dtype=object)
+    else:
+        table = np.empty(len(unique), dtype=object)
+        table[:] = [decode_risk_mask(m, metric_names) for m in unique]
+    return table[inverse]
+
+
+class HealthScoringEngine:
+    """
+    Vectorized composite health score.
+
+    Each metric scores 1.0 at or beyond its warning threshold, 0.0 at or beyond its
+    critical threshold and linearly in between; for both orientations that is
+    clip((v - critical) / (warning - critical), 0, 1). Missing values score 0.
+    The health score is the weighted sum scaled to 0-100, and every metric scoring
+    below 0.5 sets its bit in the risk mask.
+    """
+
+    def __init__(self, metrics_config: Dict[str, Dict]):
+        self.metrics_config = metrics_config
+
+    def mask_dtype(self, n_metrics: int) -> np.dtype:
+        return np.min_scalar_type((1 << n_metrics) - 1)
+
+    def score(self, values: np.ndarray, metric_names: Sequence[str]):
+        """
+        Score an array whose last axis is metric_names (any leading shape, e.g. time x FIP).
+        Metrics without a config entry are ignored. Returns (health_score, risk_mask).
+        """
+        dtype = np.result_type(values.dtype, np.float32)
+        health = np.zeros(values.shape[:-1], dtype=dtype)
+        risk_mask = np.zeros(values.shape[:-1], dtype=self.mask_dtype(len(metric_names)))
+
+        for bit, metric_name in enumerate(metric_names):
+            config = self.metrics_config.get(metric_name)
+            if config is None:
+                continue
+
+            critical, warning = config['threshold_critical'], config['threshold_warning']
+            metric_score = (values[..., bit] - critical) / (warning - critical)
+            np.clip(metric_score, 0.0, 1.0, out=metric_score)
+            metric_score[np.isnan(metric_score)] = 0.0
+
+            health += metric_score * config['weight']
+            risk_mask |= (metric_score < RISK_SCORE_THRESHOLD).astype(risk_mask.dtype) << bit
+
+        np.clip(health * 100, 0, 100, out=health)
+        return health, risk_mask
+
+    def score_fleet(self, values: np.ndarray, metric_names: Sequence[str],
+                    timestamps: np.ndarray, fip_names: List[str]) -> FleetHealth:
+        """Score an aligned [time, fip, metric] array for all FIPs in one pass"""
+        health, risk_mask = self.score(values, metric_names)
+        return FleetHealth(
+            timestamps=timestamps,
+            fip_names=list(fip_names),
+            health_score=health,
+            risk_mask=risk_mask,
+            metric_names=list(metric_names)
+        )
+
+    @staticmethod
+    def align(df: pd.DataFrame, metric_names: Sequence[str], fip_names: Optional[List[str]] = None):
+        """
+        Build the [time, fip, metric] array from a wide frame with timestamp and fip_name
+        columns plus one column per metric. Returns (values, timestamps, fip_names).
+        """
+        timestamps, time_idx = np.unique(df['timestamp'].to_numpy(), return_inverse=True)
+        if fip_names is None:
+            fip_names = sorted(df['fip_name'].unique())
+        fip_idx = pd.Index(fip_names).get_indexer(df['fip_name'])
+        keep = fip_idx >= 0
+
+        values = np.full((len(timestamps), len(fip_names), len(metric_names)), np.nan, dtype=np.float32)
+        for m, metric_name in enumerate(metric_names):
+            if metric_name in df.columns:
+                values[time_idx[keep], fip_idx[keep], m] = df[metric_name].to_numpy(dtype=np.float32)[keep]
+        return values, timestamps, list(fip_names)
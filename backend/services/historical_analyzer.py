@@ -1,4 +1,5 @@
 import requests
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -6,6 +7,10 @@ from typing import Dict, List, Any, Tuple
 import json
 from dataclasses import dataclass
 from utils.logger import logger
+from utils.instrumentation import cache_stats, timed_stage
+
+SHARED_MATRIX_CACHE = cache_stats('shared_matrix')  # windows served from the shared matrix instead of the TSDB
+
 
 @dataclass
 class MetricQuery:
@@ -13,6 +18,105 @@ class MetricQuery:
     query: str
     description: str
 
+
+# ================================
+# CLOCKS
+# ================================
+# Default-layout frames are indexed by naive local wall-clock time (datetime.fromtimestamp
+# of each sample), which is what the hour and weekday features see. Anything stored or
+# compared against a query range (which is UTC) goes through epoch seconds instead.
+
+CLOCK_BUCKET_SECONDS = 900  # UTC offsets only change on quarter-hour boundaries
+
+
+def epoch_to_local(epochs) -> np.ndarray:
+    """Epoch seconds -> naive local datetime64[s], as datetime.fromtimestamp() gives"""
+    epochs = np.asarray(epochs, dtype=np.int64)
+    buckets, inverse = np.unique(epochs // CLOCK_BUCKET_SECONDS, return_inverse=True)
+    offsets = np.array([time.localtime(int(b) * CLOCK_BUCKET_SECONDS).tm_gmtoff for b in buckets], dtype=np.int64)
+    return (epochs + offsets[inverse]).astype('datetime64[s]')
+
+
+def local_to_epoch(timestamps) -> np.ndarray:
+    """Naive local times -> epoch seconds, as datetime.timestamp() gives (one offset lookup per bucket)"""
+    local = np.asarray(timestamps).astype('datetime64[s]').astype(np.int64)
+    buckets, inverse = np.unique(local // CLOCK_BUCKET_SECONDS, return_inverse=True)
+    offsets = np.array([
+        int(b) * CLOCK_BUCKET_SECONDS - int(datetime.utcfromtimestamp(int(b) * CLOCK_BUCKET_SECONDS).timestamp())
+        for b in buckets
+    ], dtype=np.int64)
+    return local - offsets[inverse]
+
+
+# ================================
+# COMPACT FRAMES
+# ================================
+# Compact frames carry the same rows as the default layout but with an int64 'epoch'
+# index (true epoch seconds, back to local wall-clock on expansion), float32 values,
+# categorical fip_name/bank_name and a series_id pointing into a per-series label
+# table kept in df.attrs['series_labels'].
+
+def is_compact_frame(df: pd.DataFrame) -> bool:
+    return df.index.name == 'epoch'
+
+
+def compact_history_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a default-layout history frame to the compact layout"""
+    if df.empty or is_compact_frame(df):
+        return df
+
+    series = df[['fip_name', 'bank_name']].drop_duplicates().reset_index(drop=True)
+    series_id = pd.MultiIndex.from_frame(series).get_indexer(pd.MultiIndex.from_frame(df[['fip_name', 'bank_name']]))
+    compact = pd.DataFrame({
+        'series_id': series_id.astype(np.int32),
+        'fip_name': df['fip_name'].astype('category'),
+        'bank_name': df['bank_name'].astype('category'),
+        'value': df['value'].to_numpy(dtype=np.float32)
+    }, index=pd.Index(local_to_epoch(df.index.values), name='epoch'))
+    series['labels'] = [{'fip_name': f, 'bank_name': b} for f, b in zip(series['fip_name'], series['bank_name'])]
+    compact.attrs['series_labels'] = series
+    return compact
+
+
+def expand_history_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a compact frame (or a slice of one) back to the default layout"""
+    if df.empty or not is_compact_frame(df):
+        return df
+
+    expanded = pd.DataFrame({
+        'fip_name': df['fip_name'].astype(object).to_numpy(),
+        'bank_name': df['bank_name'].astype(object).to_numpy(),
+        'value': df['value'].to_numpy(dtype=np.float64)
+    }, index=pd.DatetimeIndex(epoch_to_local(df.index.to_numpy()).astype('datetime64[ns]'), name='timestamp'))
+    labels = df.attrs.get('series_labels')
+    if labels is not None:
+        expanded['labels'] = labels['labels'].to_numpy()[df['series_id'].to_numpy()]
+    return expanded
+
+
+def history_memory_report(historical_data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Rows and deep memory usage per metric frame, including label tables"""
+    metrics = {}
+    for metric_name, df in historical_data.items():
+        size = int(df.memory_usage(deep=True).sum()) if not df.empty else 0
+        labels = df.attrs.get('series_labels')
+        if labels is not None:
+            size += int(labels.memory_usage(deep=True).sum())
+        metrics[metric_name] = {
+            'rows': len(df),
+            'bytes': size,
+            'bytes_per_row': round(size / len(df), 1) if len(df) else 0,
+            'compact': is_compact_frame(df)
+        }
+
+    total_bytes = sum(m['bytes'] for m in metrics.values())
+    return {
+        'metrics': metrics,
+        'total_rows': sum(m['rows'] for m in metrics.values()),
+        'total_bytes': total_bytes,
+        'total_mb': round(total_bytes / (1024 * 1024), 2)
+    }
+
 class PrometheusHistoricalAnalyzer:
     """
     Service to extract and analyze historical Prometheus/VictoriaMetrics data
@@ -23,6 +127,9 @@ class PrometheusHistoricalAnalyzer:
         self.prometheus_url = prometheus_url
         self.logger = logger
         
+        # Optional SharedMatrixReader; when it covers a request no TSDB download is needed
+        self.shared_matrix = None
+        
         # Define key metrics for analysis
         self.metric_queries = {
             'consent_success_rate': MetricQuery(
@@ -57,17 +164,29 @@ class PrometheusHistoricalAnalyzer:
             )
         }
     
-    def extract_historical_data(self, days_back: int = 7, step: str = "15m") -> Dict[str, pd.DataFrame]:
+    @timed_stage()
+    def extract_historical_data(self, days_back: int = 7, step: str = "15m",
+                                compact: bool = False) -> Dict[str, pd.DataFrame]:
         """
         Extract historical metrics for all FIPs over specified time period
         
         Args:
             days_back: Number of days to look back
             step: Query resolution (e.g., "15m", "1h", "1d")
+            compact: Return compact frames (see compact_history_frame)
             
         Returns:
             Dictionary of DataFrames by metric type
         """
+        if self.shared_matrix is not None:
+            historical_data = self.shared_matrix.load(days_back, step)
+            SHARED_MATRIX_CACHE.record(historical_data is not None)
+            if historical_data is not None:
+                if compact:
+                    historical_data = {k: compact_history_frame(v) for k, v in historical_data.items()}
+                self._log_memory_report(historical_data, days_back, step)
+                return historical_data
+        
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days_back)
         
@@ -82,7 +201,8 @@ class PrometheusHistoricalAnalyzer:
                     query=metric_query.query,
                     start_time=start_time,
                     end_time=end_time,
-                    step=step
+                    step=step,
+                    compact=compact
                 )
                 historical_data[metric_name] = df
                 self.logger.info(f"Retrieved {len(df)} data points for {metric_name}")
@@ -91,9 +211,18 @@ class PrometheusHistoricalAnalyzer:
                 self.logger.error(f"Error querying {metric_name}: {e}")
                 historical_data[metric_name] = pd.DataFrame()
         
+        self._log_memory_report(historical_data, days_back, step)
         return historical_data
     
-    def _query_range(self, query: str, start_time: datetime, end_time: datetime, step: str) -> pd.DataFrame:
+    def _log_memory_report(self, historical_data: Dict[str, pd.DataFrame], days_back: int, step: str) -> None:
+        report = history_memory_report(historical_data)
+        self.logger.info(
+            f"📏 Historical data ({days_back}d @ {step}): {report['total_rows']} rows, "
+            f"{report['total_mb']} MB{' (compact)' if any(m['compact'] for m in report['metrics'].values()) else ''}"
+        )
+    
+    def _query_range(self, query: str, start_time: datetime, end_time: datetime, step: str,
+                     compact: bool = False) -> pd.DataFrame:
         """
         Execute Prometheus range query and return as DataFrame
         """
@@ -118,6 +247,9 @@ class PrometheusHistoricalAnalyzer:
             if data['status'] != 'success':
                 raise Exception(f"Prometheus query failed: {data}")
             
+            if compact:
+                return self._compact_frame_from_result(data['data']['result'])
+            
             # Convert to DataFrame
             results = []
             for result in data['data']['result']:
@@ -145,6 +277,43 @@ class PrometheusHistoricalAnalyzer:
             self.logger.error(f"Error executing Prometheus query: {e}")
             return pd.DataFrame()
     
+    def _compact_frame_from_result(self, result: List[Dict]) -> pd.DataFrame:
+        """Build a compact frame straight from a query_range result, without per-row dicts"""
+        epochs, values, series_ids, series = [], [], [], []
+        for series_id, item in enumerate(result):
+            labels = item['metric']
+            series.append({
+                'fip_name': labels.get('fip_name', 'unknown'),
+                'bank_name': labels.get('bank_name', 'unknown'),
+                'labels': labels
+            })
+            points = item['values']
+            epochs.append(np.fromiter((float(t) for t, _ in points), dtype=np.float64, count=len(points)))
+            values.append(np.fromiter((float(v) for _, v in points), dtype=np.float32, count=len(points)))
+            series_ids.append(np.full(len(points), series_id, dtype=np.int32))
+
+        if not series:
+            return pd.DataFrame()
+
+        series_labels = pd.DataFrame(series)
+        series_id = np.concatenate(series_ids)
+        order = np.argsort(np.concatenate(epochs), kind='stable')
+        series_id = series_id[order]
+
+        df = pd.DataFrame({
+            'series_id': series_id,
+            'fip_name': pd.Categorical.from_codes(
+                *np.unique(series_labels['fip_name'], return_inverse=True)[::-1]
+            )[series_id],
+            'bank_name': pd.Categorical.from_codes(
+                *np.unique(series_labels['bank_name'], return_inverse=True)[::-1]
+            )[series_id],
+            'value': np.concatenate(values)[order]
+        }, index=pd.Index(np.concatenate(epochs)[order].astype(np.int64), name='epoch'))
+        df.attrs['series_labels'] = series_labels
+        return df
+    
+    @timed_stage()
     def calculate_features(self, historical_data: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
         """
         Calculate ML features from historical data for each FIP
@@ -199,7 +368,8 @@ class PrometheusHistoricalAnalyzer:
             if not df.empty:
                 fip_df = df[df['fip_name'] == fip_name].copy()
                 if not fip_df.empty:
-                    fip_data[metric_name] = fip_df
+                    # Compact frames are only expanded one FIP slice at a time
+                    fip_data[metric_name] = expand_history_frame(fip_df)
         
         if not fip_data:
             return features
@@ -476,6 +646,7 @@ class PrometheusHistoricalAnalyzer:
         
         return stability_features
     
+    @timed_stage()
     def detect_maintenance_windows(self, historical_data: Dict[str, pd.DataFrame]) -> Dict[str, List[Dict]]:
         """
         Detect recurring maintenance windows from historical data
@@ -532,6 +703,7 @@ class PrometheusHistoricalAnalyzer:
         
         return maintenance_windows
     
+    @timed_stage()
     def generate_summary_report(self, historical_data: Dict[str, pd.DataFrame], 
                                fip_features: Dict[str, Dict], 
                                maintenance_windows: Dict[str, List[Dict]]) -> Dict:
@@ -0,0 +1,260 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config import Config
+from services.feature_state import step_to_timedelta
+from services.historical_analyzer import epoch_to_local, local_to_epoch
+from utils.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs as pafs
+    PYARROW_AVAILABLE = True
+except ImportError:  # optional dependency: analytics fall back to the TSDB
+    PYARROW_AVAILABLE = False
+
+
+HISTORY_COLUMNS = ['timestamp', 'fip_name', 'bank_name', 'value']
+MANIFEST_FILE = '_manifest.json'
+PARTITION_FILE = 'part-0.parquet'
+STORE_CLOCK = 'utc'  # manifest marker; stores from before it held local wall-clock times
+
+
+def parse_history_profiles(spec: str) -> List[Tuple[str, int]]:
+    """Parse "1h:30,1d:90" into [(step, days_back), ...]"""
+    profiles = []
+    for item in spec.split(','):
+        if item.strip():
+            step, days = item.strip().split(':')
+            profiles.append((step.strip(), int(days)))
+    return profiles
+
+
+class ColumnarHistoryStore:
+    """
+    Local Parquet copy of the TSDB history used by long-range analytics.
+
+    Series are stored per step and metric, partitioned by day:
+        <root>/<step>/<metric>/date=YYYY-MM-DD/part-0.parquet
+    Rows are sorted by (fip_name, timestamp) so row-group statistics let reads push
+    FIP and time predicates down to the files, which are memory-mapped on read.
+    Timestamps, partitions and the manifest are naive UTC like the query ranges;
+    reads hand back local wall-clock frames like extract_historical_data().
+    compact() folds new TSDB samples into the latest partitions and drops partitions
+    that fall out of retention; a manifest per step records what has been covered.
+    """
+
+    def __init__(self, historical_analyzer, root_dir: Optional[str] = None,
+                 profiles: Optional[List[Tuple[str, int]]] = None):
+        self.logger = logger
+        self.historical_analyzer = historical_analyzer
+        self.root_dir = root_dir or Config.HISTORY_STORE_DIR
+        self.profiles = profiles or parse_history_profiles(Config.HISTORY_STORE_PROFILES)
+        self.enabled = Config.HISTORY_STORE_ENABLED and PYARROW_AVAILABLE
+
+        if Config.HISTORY_STORE_ENABLED and not PYARROW_AVAILABLE:
+            self.logger.warning("pyarrow not installed, columnar history store disabled")
+
+    # ================================
+    # READS
+    # ================================
+
+    def load(self, days_back: int, step: str,
+             metrics: Optional[Iterable[str]] = None) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Historical data shaped like extract_historical_data(), or None when the store
+        does not fully cover the window (callers then query the TSDB directly)
+        """
+        if not self.enabled:
+            return None
+
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=days_back)
+        metric_names = list(metrics or self.historical_analyzer.metric_queries.keys())
+
+        manifest = self._read_manifest(step)
+        if not all(self._covers(manifest.get(name), start_time, end_time, step) for name in metric_names):
+            return None
+
+        return {name: self.read(name, step, start_time, end_time) for name in metric_names}
+
+    def read(self, metric_name: str, step: str, start_time: datetime, end_time: datetime,
+             fip_names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Read one metric's series for a time range (and optionally a set of FIPs)"""
+        metric_dir = self._metric_dir(step, metric_name)
+        if not self.enabled or not os.path.isdir(metric_dir):
+            return pd.DataFrame()
+
+        dataset = ds.dataset(
+            metric_dir,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'),
+            filesystem=pafs.LocalFileSystem(use_mmap=True)
+        )
+
+        # Partition pruning on the day directory, then row-group pruning on the columns
+        expression = (
+            (ds.field('date') >= start_time.date().isoformat()) &
+            (ds.field('date') <= end_time.date().isoformat()) &
+            (ds.field('timestamp') >= pa.scalar(start_time, type=pa.timestamp('ms'))) &
+            (ds.field('timestamp') <= pa.scalar(end_time, type=pa.timestamp('ms')))
+        )
+        if fip_names is not None:
+            expression = expression & ds.field('fip_name').isin(list(fip_names))
+
+        table = dataset.to_table(columns=HISTORY_COLUMNS, filter=expression)
+        if table.num_rows == 0:
+            return pd.DataFrame()
+
+        df = table.to_pandas()
+        for column in ('fip_name', 'bank_name'):
+            df[column] = df[column].astype(object)
+        # Stored as UTC, returned in the default layout's local wall-clock time
+        epochs = df['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        df['timestamp'] = epoch_to_local(epochs).astype('datetime64[ns]')
+        df.set_index('timestamp', inplace=True)
+        df.sort_index(inplace=True)
+        return df
+
+    def _covers(self, entry: Optional[Dict], start_time: datetime, end_time: datetime, step: str) -> bool:
+        if not entry or entry.get('clock') != STORE_CLOCK:
+            return False
+        covered_from = datetime.fromisoformat(entry['covered_from'])
+        last_compacted = datetime.fromisoformat(entry['last_compacted'])
+        max_lag = max(timedelta(seconds=2 * Config.HISTORY_STORE_COMPACTION_INTERVAL), step_to_timedelta(step))
+        return covered_from <= start_time + step_to_timedelta(step) and end_time - last_compacted <= max_lag
+
+    # ================================
+    # COMPACTION
+    # ================================
+
+    def compact(self) -> Dict[str, int]:
+        """Fold new TSDB samples into the store for every profile; returns rows written per step"""
+        if not self.enabled:
+            return {}
+
+        written = {}
+        for step, days_back in self.profiles:
+            written[step] = self._compact_profile(step, days_back)
+            self._apply_retention(step, days_back)
+        return written
+
+    def _compact_profile(self, step: str, days_back: int) -> int:
+        manifest = self._read_manifest(step)
+        end_time = datetime.utcnow()
+        window_start = end_time - timedelta(days=days_back)
+        rows_written = 0
+
+        for metric_name, metric_query in self.historical_analyzer.metric_queries.items():
+            entry = manifest.get(metric_name)
+            if entry and entry.get('clock') != STORE_CLOCK:
+                # Written in local time by an older version; rebuild rather than mix clocks
+                shutil.rmtree(self._metric_dir(step, metric_name), ignore_errors=True)
+                entry = None
+            if entry and datetime.fromisoformat(entry['covered_from']) <= window_start + step_to_timedelta(step):
+                # Re-read the last step so a partially filled bucket gets its final value
+                start_time = max(window_start, datetime.fromisoformat(entry['last_sample']) - step_to_timedelta(step))
+                covered_from = entry['covered_from']
+            else:
+                start_time = window_start
+                covered_from = window_start.isoformat()
+
+            df = self.historical_analyzer._query_range(
+                query=metric_query.query,
+                start_time=start_time,
+                end_time=end_time,
+                step=step
+            )
+            if df.empty:
+                continue
+
+            frame = df.reset_index()[HISTORY_COLUMNS]
+            frame['timestamp'] = local_to_epoch(frame['timestamp'].to_numpy()).astype('datetime64[s]').astype('datetime64[ns]')
+            for day, day_frame in frame.groupby(frame['timestamp'].dt.date):
+                self._merge_partition(step, metric_name, day.isoformat(), day_frame)
+
+            rows_written += len(frame)
+            manifest[metric_name] = {
+                'covered_from': covered_from,
+                'last_sample': frame['timestamp'].max().to_pydatetime().isoformat(),
+                'last_compacted': end_time.isoformat(),
+                'clock': STORE_CLOCK
+            }
+
+        self._write_manifest(step, manifest)
+        if rows_written:
+            self.logger.info(f"🗜️ Compacted {rows_written} samples into history store ({step} step)")
+        return rows_written
+
+    def _merge_partition(self, step: str, metric_name: str, day: str, frame: pd.DataFrame) -> None:
+        partition_dir = os.path.join(self._metric_dir(step, metric_name), f"date={day}")
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, PARTITION_FILE)
+
+        if os.path.exists(path):
+            existing = pq.read_table(path, columns=HISTORY_COLUMNS).to_pandas()
+            for column in ('fip_name', 'bank_name'):
+                existing[column] = existing[column].astype(object)
+            frame = pd.concat([existing, frame], ignore_index=True)
+
+        frame = frame.drop_duplicates(['fip_name', 'timestamp'], keep='last')
+        frame = frame.sort_values(['fip_name', 'timestamp'])
+
+        table = pa.table({
+            'timestamp': pa.array(frame['timestamp'], type=pa.timestamp('ms')),
+            'fip_name': pa.array(frame['fip_name'].astype(str)).dictionary_encode(),
+            'bank_name': pa.array(frame['bank_name'].astype(str)).dictionary_encode(),
+            'value': pa.array(frame['value'], type=pa.float64())
+        })
+
+        # Write then rename so concurrent readers never see a half-written file
+        tmp_path = path + '.tmp'
+        pq.write_table(
+            table, tmp_path,
+            compression=Config.HISTORY_STORE_COMPRESSION,
+            row_group_size=Config.HISTORY_STORE_ROW_GROUP_SIZE
+        )
+        os.replace(tmp_path, path)
+
+    def _apply_retention(self, step: str, days_back: int) -> None:
+        cutoff = (datetime.utcnow() - timedelta(days=days_back + 1)).date().isoformat()
+        step_dir = os.path.join(self.root_dir, step)
+        if not os.path.isdir(step_dir):
+            return
+
+        for metric_name in os.listdir(step_dir):
+            metric_dir = os.path.join(step_dir, metric_name)
+            if not os.path.isdir(metric_dir):
+                continue
+            for partition in os.listdir(metric_dir):
+                if partition.startswith('date=') and partition[len('date='):] < cutoff:
+                    shutil.rmtree(os.path.join(metric_dir, partition), ignore_errors=True)
+
+    # ================================
+    # LAYOUT
+    # ================================
+
+    def _metric_dir(self, step: str, metric_name: str) -> str:
+        return os.path.join(self.root_dir, step, metric_name)
+
+    def _read_manifest(self, step: str) -> Dict[str, Dict]:
+        path = os.path.join(self.root_dir, step, MANIFEST_FILE)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, step: str, manifest: Dict[str, Dict]) -> None:
+        step_dir = os.path.join(self.root_dir, step)
+        os.makedirs(step_dir, exist_ok=True)
+        path = os.path.join(step_dir, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+TREND_NAMES = ['stable', 'improving', 'declining']
+
+# field -> decimals the simulated values are rounded to
+HISTORY_FIELDS = {
+    'consent_success_rate': 1,
+    'data_fetch_success_rate': 1,
+    'avg_response_time': 2
+}
+
+
+class MetricsRingBuffer:
+    """
+    Fixed-capacity metrics history for a whole fleet.
+
+    Each field is a preallocated [fip, capacity] float32 array and every append
+    writes one column for all FIPs at the slot after the newest one, overwriting
+    the oldest once full, so appends are O(1) in the history length and nothing
+    is ever resliced or copied. Timestamps (epoch ms) are shared by all FIPs.
+    """
+
+    def __init__(self, n_fips: int, capacity: int, fields: Optional[Dict[str, int]] = None):
+        self.n_fips = n_fips
+        self.capacity = max(1, capacity)
+        self.fields = dict(fields or HISTORY_FIELDS)
+        self.values = {field: np.full((n_fips, self.capacity), np.nan, dtype=np.float32) for field in self.fields}
+        self.status = np.zeros((n_fips, self.capacity), dtype=np.int8)
+        self.timestamps = np.zeros(self.capacity, dtype=np.int64)
+        self.head = 0     # slot the next append writes
+        self.count = 0    # points held, at most capacity
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, timestamp_ms: int, columns: Dict[str, np.ndarray], status: np.ndarray) -> None:
+        for field, values in self.values.items():
+            values[:, self.head] = columns[field]
+        self.status[:, self.head] = status
+        self.timestamps[self.head] = timestamp_ms
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def slots(self, last: Optional[int] = None) -> np.ndarray:
+        """Ring slots of the newest `last` points (all held points by default), oldest first"""
+        n = self.count if last is None else min(last, self.count)
+        return (self.head - n + np.arange(n)) % self.capacity
+
+    def window(self, field: str, last: Optional[int] = None) -> np.ndarray:
+        """[fip, points] values of one field, oldest first"""
+        return np.round(self.values[field][:, self.slots(last)].astype(np.float64), self.fields[field])
+
+    def latest(self, field: str) -> np.ndarray:
+        """Newest value per FIP (NaN while the buffer is empty)"""
+        if self.count == 0:
+            return np.full(self.n_fips, np.nan)
+        return self.values[field][:, (self.head - 1) % self.capacity].astype(np.float64)
+
+    def trend(self, field: str, current: np.ndarray, threshold: float = 2.0, min_points: int = 3) -> np.ndarray:
+        """
+        Trend codes (indexes into TREND_NAMES) for every FIP: improving/declining when
+        the current value moved more than `threshold` from the newest stored point,
+        once at least `min_points` points are held
+        """
+        codes = np.zeros(len(current), dtype=np.int8)
+        if self.count < min_points:
+            return codes
+        previous = np.round(self.latest(field), self.fields[field])
+        codes[current > previous + threshold] = TREND_NAMES.index('improving')
+        codes[current < previous - threshold] = TREND_NAMES.index('declining')
+        return codes
+
+    def points(self, row: int, status_names: Sequence[str], last: Optional[int] = None) -> List[Dict]:
+        """One FIP's history as the per-point dicts the service used to keep"""
+        slots = self.slots(last)
+        timestamps = self.timestamps[slots].astype('datetime64[ms]')
+        fields = {field: np.round(self.values[field][row, slots].astype(np.float64), decimals).tolist()
+                  for field, decimals in self.fields.items()}
+        return [
+            {
+                'timestamp': str(timestamps[k]),
+                **{field: values[k] for field, values in fields.items()},
+                'current_status': status_names[self.status[row, slot]]
+            }
+            for k, slot in enumerate(slots)
+        ]
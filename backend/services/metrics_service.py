@@ -1,108 +1,132 @@
-import random
 import time
+from collections.abc import Mapping
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import json
+import numpy as np
+from config import Config
+from services.fip_registry import FIPRegistry, STATUS_NAMES, load_fip_registry
+from services.metrics_history import MetricsRingBuffer, TREND_NAMES
+from utils.instrumentation import cache_stats
+
+PEAK_HOURS = [9, 10, 11, 14, 15, 16]
+STATUS_FACTOR_RANGES = {
+    'healthy': (0.95, 1.0),
+    'degraded': (0.65, 0.85),
+    'critical': (0.1, 0.35),
+    'warning': (0.75, 0.95)
+}
+DEFAULT_STATUS_FACTOR = 0.9
+VIEW_CACHE = cache_stats('metrics_view')  # per-FIP dicts reused within a simulation step
+
+
+class FIPMetricsView(Mapping):
+    """
+    Per-FIP metrics dicts over the arrays of one simulation step.
+
+    Dicts are built on first access and cached for the lifetime of the step, so a
+    caller that updates a FIP's dict in place keeps its change until the next step
+    replaces the whole view, as with the plain dict this used to be.
+    """
+
+    def __init__(self, registry: FIPRegistry, index: Dict[str, int], state: Dict[str, np.ndarray], updated_at: str):
+        self.registry = registry
+        self.index = index
+        self.state = state
+        self.updated_at = updated_at
+        self._columns = None
+        self._cache = {}
+
+    def __getitem__(self, fip_name: str) -> Dict:
+        metrics = self._cache.get(fip_name)
+        VIEW_CACHE.record(metrics is not None)
+        if metrics is None:
+            metrics = self._cache[fip_name] = self._build(self.index[fip_name])
+        return metrics
+
+    def __iter__(self):
+        return iter(self.registry.names)
+
+    def __len__(self) -> int:
+        return len(self.registry)
+
+    def __contains__(self, fip_name) -> bool:
+        return fip_name in self.index
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {fip_name: self[fip_name] for fip_name in self}
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Numeric fields as rounded per-FIP arrays, exactly as they appear in the dicts"""
+        if self._columns is None:
+            consent = self.state['consent_success_rate']
+            self._columns = {
+                'consent_success_rate': np.round(consent, 1),
+                'data_fetch_success_rate': np.round(self.state['data_fetch_success_rate'], 1),
+                'avg_response_time': np.round(self.state['avg_response_time'], 2),
+                'error_rate': np.round(100 - consent, 1),
+                'user_base': self.registry.user_base.astype(float)
+            }
+        return self._columns
+
+    def numeric_columns(self) -> Dict[str, np.ndarray]:
+        """columns(), with any in-place edits of materialized dicts applied"""
+        columns = {key: values.copy() for key, values in self.columns().items()}
+        for fip_name, metrics in self._cache.items():
+            i = self.index[fip_name]
+            for key, values in columns.items():
+                value = metrics.get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[i] = value
+        return columns
+
+    def status_codes(self) -> np.ndarray:
+        """Status codes (indexes into STATUS_NAMES), with in-place current_status edits applied"""
+        codes = self.state['status'].copy()
+        for fip_name, metrics in self._cache.items():
+            if metrics.get('current_status') in STATUS_NAMES:
+                codes[self.index[fip_name]] = STATUS_NAMES.index(metrics['current_status'])
+        return codes
+
+    def _build(self, i: int) -> Dict:
+        columns = self.columns()
+        return {
+            'fip_name': self.registry.names[i],
+            'bank_name': self.registry.bank_names[i],
+            'consent_success_rate': columns['consent_success_rate'][i].item(),
+            'data_fetch_success_rate': columns['data_fetch_success_rate'][i].item(),
+            'avg_response_time': columns['avg_response_time'][i].item(),
+            'error_rate': columns['error_rate'][i].item(),
+            'current_status': STATUS_NAMES[self.state['status'][i]],
+            'user_base': int(self.registry.user_base[i]),
+            'last_updated': self.updated_at,
+            'trend': TREND_NAMES[self.state['trend'][i]],
+            'maintenance_window': bool(self.state['maintenance_window'][i])
+        }
+
 
 class MetricsService:
     """
     Service for managing FIP metrics and generating realistic data
+
+    The fleet comes from a pluggable FIPRegistry (the 11 sample FIPs, a file or a
+    synthetic fleet of any size) and every simulation step updates all FIPs at once
+    with NumPy; current_metrics exposes the familiar per-FIP dicts as a view.
     """
     
-    def __init__(self):
-        self.fips = {
-            'sbi-fip': {
-                'bank_name': 'State Bank of India',
-                'base_success_rate': 95.0,
-                'base_response_time': 1.2,
-                'user_base': 4500,
-                'maintenance_hours': [2, 3, 4],  # 2 AM - 4 AM
-                'status': 'healthy'
-            },
-            'hdfc-fip': {
-                'bank_name': 'HDFC Bank',
-                'base_success_rate': 92.0,
-                'base_response_time': 1.5,
-                'user_base': 3200,
-                'maintenance_hours': [1, 2, 3],
-                'status': 'degraded'
-            },
-            'icici-fip': {
-                'bank_name': 'ICICI Bank',
-                'base_success_rate': 90.0,
-                'base_response_time': 1.8,
-                'user_base': 2800,
-                'maintenance_hours': [23, 0, 1],
-                'status': 'healthy'
-            },
-            'axis-fip': {
-                'bank_name': 'Axis Bank',
-                'base_success_rate': 88.0,
-                'base_response_time': 2.1,
-                'user_base': 1200,
-                'maintenance_hours': [3, 4, 5],
-                'status': 'critical'
-            },
-            'kotak-fip': {
-                'bank_name': 'Kotak Mahindra Bank',
-                'base_success_rate': 87.0,
-                'base_response_time': 2.3,
-                'user_base': 800,
-                'maintenance_hours': [2, 3],
-                'status': 'healthy'
-            },
-            'boi-fip': {
-                'bank_name': 'Bank of India',
-                'base_success_rate': 85.0,
-                'base_response_time': 2.8,
-                'user_base': 600,
-                'maintenance_hours': [1, 2, 3, 4],
-                'status': 'degraded'
-            },
-            'pnb-fip': {
-                'bank_name': 'Punjab National Bank',
-                'base_success_rate': 82.0,
-                'base_response_time': 3.2,
-                'user_base': 700,
-                'maintenance_hours': [0, 1, 2],
-                'status': 'healthy'
-            },
-            'canara-fip': {
-                'bank_name': 'Canara Bank',
-                'base_success_rate': 80.0,
-                'base_response_time': 3.5,
-                'user_base': 500,
-                'maintenance_hours': [2, 3, 4, 5],
-                'status': 'healthy'
-            },
-            'ubi-fip': {
-                'bank_name': 'Union Bank of India',
-                'base_success_rate': 78.0,
-                'base_response_time': 4.0,
-                'user_base': 400,
-                'maintenance_hours': [1, 2],
-                'status': 'degraded'
-            },
-            'iob-fip': {
-                'bank_name': 'Indian Overseas Bank',
-                'base_success_rate': 75.0,
-                'base_response_time': 4.5,
-                'user_base': 300,
-                'maintenance_hours': [3, 4],
-                'status': 'healthy'
-            },
-            'central-fip': {
-                'bank_name': 'Central Bank of India',
-                'base_success_rate': 72.0,
-                'base_response_time': 5.0,
-                'user_base': 250,
-                'maintenance_hours': [2, 3, 4],
-                'status': 'warning'
-            }
-        }
+    def __init__(self, registry: Optional[FIPRegistry] = None, seed: Optional[int] = None):
+        self.registry = registry or load_fip_registry()
+        self.fips = self.registry.fips
+        self.fip_index = self.registry.index
+        self.rng = np.random.default_rng(seed)
+        
+        status_ranges = [STATUS_FACTOR_RANGES.get(status, (DEFAULT_STATUS_FACTOR, DEFAULT_STATUS_FACTOR))
+                         for status in self.registry.status]
+        self._status_factor_low = np.array([low for low, _ in status_ranges])
+        self._status_factor_high = np.array([high for _, high in status_ranges])
         
-        # Track metrics over time for trend analysis
-        self.metrics_history = {}
+        # Track metrics over time for trend analysis (fixed-size ring buffer)
+        self.metrics_history = MetricsRingBuffer(len(self.registry), Config.METRICS_HISTORY_CAPACITY)
         self.last_update = datetime.utcnow()
         
         # Initialize current metrics
@@ -112,6 +136,13 @@ class MetricsService:
         """
         Get current status of all FIPs
         """
+        return self.current_metrics.to_dict()
+    
+    def get_metrics_view(self) -> FIPMetricsView:
+        """
+        Array-backed view of the current step, for the column fast paths
+        (a new object every step)
+        """
         return self.current_metrics
     
     def get_fips_metrics(self, fip_names: List[str]) -> Dict:
@@ -119,7 +150,7 @@ class MetricsService:
         Get metrics for specific FIPs
         """
         if not fip_names:
-            return self.current_metrics
+            return self.current_metrics.to_dict()
         
         return {
             fip: self.current_metrics[fip] 
@@ -132,12 +163,12 @@ class MetricsService:
         Get comprehensive health analysis
         """
         total_fips = len(self.current_metrics)
-        healthy_count = sum(1 for fip in self.current_metrics.values() if fip['current_status'] == 'healthy')
-        degraded_count = sum(1 for fip in self.current_metrics.values() if fip['current_status'] == 'degraded')
-        critical_count = sum(1 for fip in self.current_metrics.values() if fip['current_status'] == 'critical')
+        status_counts = np.bincount(self.current_metrics.state['status'], minlength=len(STATUS_NAMES))
+        healthy_count, _, degraded_count, critical_count = (int(count) for count in status_counts)
         
-        avg_consent_success = sum(fip['consent_success_rate'] for fip in self.current_metrics.values()) / total_fips
-        avg_data_success = sum(fip['data_fetch_success_rate'] for fip in self.current_metrics.values()) / total_fips
+        columns = self.current_metrics.columns()
+        avg_consent_success = float(columns['consent_success_rate'].mean())
+        avg_data_success = float(columns['data_fetch_success_rate'].mean())
         
         return {
             'summary': {
@@ -152,185 +183,120 @@ class MetricsService:
                 'average_data_fetch_success_rate': round(avg_data_success, 2),
                 'system_availability': round((avg_consent_success + avg_data_success) / 2, 2)
             },
-            'fips': self.current_metrics,
+            'fips': self.current_metrics.to_dict(),
             'last_updated': datetime.utcnow().isoformat()
         }
     
     def update_fip_metrics(self):
         """
-        Update FIP metrics with realistic variations
+        Update FIP metrics with realistic variations (one vectorized step for all FIPs)
         """
         current_hour = datetime.utcnow().hour
+        n_fips = len(self.registry)
         
-        for fip_name, fip_config in self.fips.items():
-            # Get current metrics
-            current = self.current_metrics.get(fip_name, {})
-            
-            # Apply time-based variations
-            time_factor = self._get_time_factor(current_hour, fip_config['maintenance_hours'])
-            
-            # Apply status-based degradation
-            status_factor = self._get_status_factor(fip_config['status'])
-            
-            # Calculate new metrics with realistic variations
-            base_consent = fip_config['base_success_rate']
-            base_response = fip_config['base_response_time']
-            
-            # Add random variations
-            consent_variation = random.uniform(-5, 3)
-            response_variation = random.uniform(-0.3, 0.8)
-            
-            new_consent_rate = max(0, min(100, 
-                base_consent * time_factor * status_factor + consent_variation
-            ))
-            
-            new_data_rate = max(0, min(100, 
-                new_consent_rate * random.uniform(0.85, 0.98)  # Data fetch usually slightly lower
-            ))
-            
-            new_response_time = max(0.1, 
-                base_response * (2 - time_factor) * (2 - status_factor) + response_variation
-            )
-            
-            # Determine current status based on metrics
-            new_status = self._determine_status(new_consent_rate, new_data_rate, new_response_time)
-            
-            # Update metrics
-            self.current_metrics[fip_name] = {
-                'fip_name': fip_name,
-                'bank_name': fip_config['bank_name'],
-                'consent_success_rate': round(new_consent_rate, 1),
-                'data_fetch_success_rate': round(new_data_rate, 1),
-                'avg_response_time': round(new_response_time, 2),
-                'error_rate': round(100 - new_consent_rate, 1),
-                'current_status': new_status,
-                'user_base': fip_config['user_base'],
-                'last_updated': datetime.utcnow().isoformat(),
-                'trend': self._calculate_trend(fip_name, new_consent_rate),
-                'maintenance_window': self._check_maintenance_window(current_hour, fip_config['maintenance_hours'])
-            }
+        # Apply time-based variations and status-based degradation
+        time_factor, in_maintenance = self._get_time_factor(current_hour)
+        status_factor = self._get_status_factor()
+        
+        # Calculate new metrics with realistic variations
+        new_consent_rate = np.clip(
+            self.registry.base_success_rate * time_factor * status_factor + self.rng.uniform(-5, 3, n_fips), 0, 100
+        )
+        new_data_rate = np.clip(
+            new_consent_rate * self.rng.uniform(0.85, 0.98, n_fips), 0, 100  # Data fetch usually slightly lower
+        )
+        new_response_time = np.maximum(
+            0.1,
+            self.registry.base_response_time * (2 - time_factor) * (2 - status_factor) + self.rng.uniform(-0.3, 0.8, n_fips)
+        )
+        
+        self.current_metrics = FIPMetricsView(self.registry, self.fip_index, {
+            'consent_success_rate': new_consent_rate,
+            'data_fetch_success_rate': new_data_rate,
+            'avg_response_time': new_response_time,
+            'status': self._determine_status(new_consent_rate, new_data_rate, new_response_time),
+            'trend': self._calculate_trend(new_consent_rate),
+            'maintenance_window': in_maintenance
+        }, datetime.utcnow().isoformat())
         
         # Store in history for trend analysis
         self._store_metrics_history()
         self.last_update = datetime.utcnow()
     
-    def _generate_initial_metrics(self) -> Dict:
+    def _generate_initial_metrics(self) -> FIPMetricsView:
         """
         Generate initial realistic metrics for all FIPs
         """
-        metrics = {}
+        n_fips = len(self.registry)
+        status_factor = self._get_status_factor()
         
-        for fip_name, fip_config in self.fips.items():
-            base_consent = fip_config['base_success_rate']
-            base_response = fip_config['base_response_time']
-            status = fip_config['status']
-            
-            # Apply status-based modifications
-            status_factor = self._get_status_factor(status)
-            
-            consent_rate = base_consent * status_factor + random.uniform(-3, 2)
-            consent_rate = max(0, min(100, consent_rate))
-            
-            data_rate = consent_rate * random.uniform(0.90, 0.98)
-            data_rate = max(0, min(100, data_rate))
-            
-            response_time = base_response * (2 - status_factor) + random.uniform(-0.2, 0.5)
-            response_time = max(0.1, response_time)
-            
-            metrics[fip_name] = {
-                'fip_name': fip_name,
-                'bank_name': fip_config['bank_name'],
-                'consent_success_rate': round(consent_rate, 1),
-                'data_fetch_success_rate': round(data_rate, 1),
-                'avg_response_time': round(response_time, 2),
-                'error_rate': round(100 - consent_rate, 1),
-                'current_status': self._determine_status(consent_rate, data_rate, response_time),
-                'user_base': fip_config['user_base'],
-                'last_updated': datetime.utcnow().isoformat(),
-                'trend': 'stable',
-                'maintenance_window': False
-            }
+        consent_rate = np.clip(self.registry.base_success_rate * status_factor + self.rng.uniform(-3, 2, n_fips), 0, 100)
+        data_rate = np.clip(consent_rate * self.rng.uniform(0.90, 0.98, n_fips), 0, 100)
+        response_time = np.maximum(
+            0.1, self.registry.base_response_time * (2 - status_factor) + self.rng.uniform(-0.2, 0.5, n_fips)
+        )
         
-        return metrics
+        return FIPMetricsView(self.registry, self.fip_index, {
+            'consent_success_rate': consent_rate,
+            'data_fetch_success_rate': data_rate,
+            'avg_response_time': response_time,
+            'status': self._determine_status(consent_rate, data_rate, response_time),
+            'trend': np.zeros(n_fips, dtype=np.int8),
+            'maintenance_window': np.zeros(n_fips, dtype=bool)
+        }, datetime.utcnow().isoformat())
     
-    def _get_time_factor(self, current_hour: int, maintenance_hours: List[int]) -> float:
+    def _get_time_factor(self, current_hour: int):
         """
-        Get performance factor based on time of day
+        Get performance factor per FIP based on time of day; returns (factor, in_maintenance)
         """
-        if current_hour in maintenance_hours:
-            return random.uniform(0.3, 0.6)  # Severe degradation during maintenance
-        elif current_hour in [9, 10, 11, 14, 15, 16]:  # Business hours
-            return random.uniform(0.85, 0.95)  # Slight degradation during peak
+        n_fips = len(self.registry)
+        in_maintenance = self.registry.maintenance_mask[:, current_hour % 24]
+        if current_hour in PEAK_HOURS:  # Business hours: slight degradation during peak
+            normal = self.rng.uniform(0.85, 0.95, n_fips)
         else:
-            return random.uniform(0.95, 1.0)  # Normal performance
+            normal = self.rng.uniform(0.95, 1.0, n_fips)
+        # Severe degradation during maintenance
+        return np.where(in_maintenance, self.rng.uniform(0.3, 0.6, n_fips), normal), in_maintenance
     
-    def _get_status_factor(self, status: str) -> float:
+    def _get_status_factor(self) -> np.ndarray:
         """
-        Get performance factor based on current status
+        Get performance factor per FIP based on its configured status
         """
-        status_factors = {
-            'healthy': random.uniform(0.95, 1.0),
-            'degraded': random.uniform(0.65, 0.85),
-            'critical': random.uniform(0.1, 0.35),
-            'warning': random.uniform(0.75, 0.95)
-        }
-        return status_factors.get(status, 0.9)
+        return self.rng.uniform(self._status_factor_low, self._status_factor_high)
     
-    def _determine_status(self, consent_rate: float, data_rate: float, response_time: float) -> str:
+    def _determine_status(self, consent_rate: np.ndarray, data_rate: np.ndarray, response_time: np.ndarray) -> np.ndarray:
         """
-        Determine FIP status based on metrics
+        Determine FIP status codes (indexes into STATUS_NAMES) based on metrics
         """
         avg_success = (consent_rate + data_rate) / 2
         
-        if avg_success < 30 or response_time > 10:
-            return 'critical'
-        elif avg_success < 70 or response_time > 5:
-            return 'degraded'
-        elif avg_success < 85 or response_time > 3:
-            return 'warning'
-        else:
-            return 'healthy'
+        return np.select(
+            [(avg_success < 30) | (response_time > 10),
+             (avg_success < 70) | (response_time > 5),
+             (avg_success < 85) | (response_time > 3)],
+            [STATUS_NAMES.index('critical'), STATUS_NAMES.index('degraded'), STATUS_NAMES.index('warning')],
+            default=STATUS_NAMES.index('healthy')
+        ).astype(np.int8)
     
-    def _calculate_trend(self, fip_name: str, current_consent_rate: float) -> str:
+    def _calculate_trend(self, current_consent_rate: np.ndarray) -> np.ndarray:
         """
-        Calculate trend based on historical data
+        Calculate trend codes (indexes into TREND_NAMES) against the last stored data point
         """
-        if fip_name in self.metrics_history and len(self.metrics_history[fip_name]) > 2:
-            recent_rates = [m['consent_success_rate'] for m in self.metrics_history[fip_name][-3:]]
-            if len(recent_rates) >= 2:
-                if current_consent_rate > recent_rates[-1] + 2:
-                    return 'improving'
-                elif current_consent_rate < recent_rates[-1] - 2:
-                    return 'declining'
-        return 'stable'
+        return self.metrics_history.trend('consent_success_rate', current_consent_rate)
     
-    def _check_maintenance_window(self, current_hour: int, maintenance_hours: List[int]) -> bool:
+    def get_metrics_history(self, fip_name: str, limit: Optional[int] = None) -> List[Dict]:
         """
-        Check if currently in maintenance window
+        Stored data points for one FIP, oldest first
         """
-        return current_hour in maintenance_hours
+        if fip_name not in self.fip_index:
+            return []
+        return self.metrics_history.points(self.fip_index[fip_name], STATUS_NAMES, limit)
     
     def _store_metrics_history(self):
         """
         Store current metrics in history for trend analysis
         """
-        timestamp = datetime.utcnow()
-        
-        for fip_name, metrics in self.current_metrics.items():
-            if fip_name not in self.metrics_history:
-                self.metrics_history[fip_name] = []
-            
-            # Store historical data point
-            historical_point = {
-                'timestamp': timestamp.isoformat(),
-                'consent_success_rate': metrics['consent_success_rate'],
-                'data_fetch_success_rate': metrics['data_fetch_success_rate'],
-                'avg_response_time': metrics['avg_response_time'],
-                'current_status': metrics['current_status']
-            }
-            
-            self.metrics_history[fip_name].append(historical_point)
-            
-            # Keep only last 100 data points to prevent memory issues
-            if len(self.metrics_history[fip_name]) > 100:
-                self.metrics_history[fip_name] = self.metrics_history[fip_name][-100:]
+        timestamp_ms = int(time.time() * 1000)
+        self.metrics_history.append(
+            timestamp_ms, self.current_metrics.numeric_columns(), self.current_metrics.state['status']
+        )
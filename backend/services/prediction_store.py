@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Dict, Optional
+import json
+from models import db
+from models.storage import db_writer
+from models.predictions import Prediction, PredictionGeneration, PredictionTimeline, LatestPrediction
+from utils.enums import PredictionType, GenerationStatus
+from utils.helpers import build_prediction_timeline
+from utils.logger import logger
+from config import Config
+
+
+class PredictionStore:
+    """
+    Versioned storage for prediction runs.
+
+    Each run is written under a new generation id while the previous generation keeps
+    serving reads, then promoted in a single transaction through the shared database
+    writer. Readers resolve the active generation, so they always see one complete run.
+    Older generations are kept for comparison until pruned by the retention policy.
+    """
+
+    def __init__(self, generations_retained: Optional[int] = None):
+        self.logger = logger
+        self.generations_retained = generations_retained or Config.PREDICTION_GENERATIONS_RETAINED
+
+    def write_generation(self, predictions: Dict[str, Dict],
+                         prediction_type: PredictionType = PredictionType.DOWNTIME) -> int:
+        """Write a full prediction run under a new (not yet visible) generation; returns its id"""
+        def write() -> int:
+            generation = PredictionGeneration(prediction_type=prediction_type, fip_count=len(predictions))
+            db.session.add(generation)
+            db.session.flush()
+
+            for fip_name, prediction in predictions.items():
+                downtime_pred = prediction.get('downtime_prediction', {})
+                db.session.add(Prediction(
+                    generation_id=generation.id,
+                    fip_name=fip_name,
+                    prediction_type=prediction_type,
+                    probability=downtime_pred.get('probability', 0),
+                    time_window=downtime_pred.get('time_window', ''),
+                    confidence=downtime_pred.get('confidence', 'medium'),
+                    reasoning=downtime_pred.get('reasoning'),
+                    risk_level=prediction.get('risk_level'),
+                    health_score=prediction.get('health_score'),
+                    raw_prediction=json.dumps(prediction)
+                ))
+
+                # Precompute the hourly timeline served by /api/fips/predictions/hourly
+                db.session.add_all(
+                    PredictionTimeline(generation_id=generation.id, **entry)
+                    for entry in build_prediction_timeline(fip_name, prediction)
+                )
+
+            return generation.id
+
+        return db_writer.run(write)
+
+    def promote(self, generation_id: int) -> None:
+        """Make a generation the one readers see, atomically replacing the previous one"""
+        def swap() -> int:
+            generation = db.session.get(PredictionGeneration, generation_id)
+            PredictionGeneration.query.filter(
+                PredictionGeneration.prediction_type == generation.prediction_type,
+                PredictionGeneration.status == GenerationStatus.ACTIVE.value
+            ).update({'status': GenerationStatus.SUPERSEDED.value}, synchronize_session=False)
+
+            generation.status = GenerationStatus.ACTIVE.value
+            generation.promoted_at = datetime.utcnow()
+
+            # Swap the latest-prediction-per-FIP table to the new generation
+            LatestPrediction.query.filter(
+                LatestPrediction.prediction_type == generation.prediction_type
+            ).delete(synchronize_session=False)
+            db.session.add_all(
+                LatestPrediction.from_prediction(record)
+                for record in Prediction.query.filter_by(generation_id=generation.id).all()
+            )
+            return generation.fip_count
+
+        fip_count = db_writer.run(swap)
+        self.logger.info(f"🔁 Promoted prediction generation {generation_id} ({fip_count} FIPs)")
+
+    def active_generation_id(self, prediction_type: PredictionType = PredictionType.DOWNTIME) -> Optional[int]:
+        """Id of the generation currently served to readers"""
+        row = db.session.query(PredictionGeneration.id).filter(
+            PredictionGeneration.prediction_type == prediction_type,
+            PredictionGeneration.status == GenerationStatus.ACTIVE.value
+        ).order_by(PredictionGeneration.promoted_at.desc()).first()
+        return row[0] if row else None
+
+    def prune(self, prediction_type: PredictionType = PredictionType.DOWNTIME) -> int:
+        """
+        Delete generations beyond the retention count (newest first, active always kept),
+        including abandoned builds and rows written before generations existed.
+        """
+        def delete_expired() -> int:
+            generations = PredictionGeneration.query.filter_by(
+                prediction_type=prediction_type
+            ).order_by(PredictionGeneration.id.desc()).all()
+
+            expired = [
+                g.id for i, g in enumerate(generations)
+                if i >= self.generations_retained and g.status != GenerationStatus.ACTIVE.value
+            ]
+            if not generations:
+                return 0
+
+            # Rows from before generations are only this type's (the timeline is downtime-only)
+            Prediction.query.filter(
+                db.or_(
+                    Prediction.generation_id.in_(expired),
+                    db.and_(Prediction.generation_id.is_(None), Prediction.prediction_type == prediction_type)
+                )
+            ).delete(synchronize_session=False)
+            legacy_timeline = PredictionTimeline.generation_id.is_(None) \
+                if prediction_type == PredictionType.DOWNTIME else db.false()
+            PredictionTimeline.query.filter(
+                db.or_(PredictionTimeline.generation_id.in_(expired), legacy_timeline)
+            ).delete(synchronize_session=False)
+            PredictionGeneration.query.filter(
+                PredictionGeneration.id.in_(expired)
+            ).delete(synchronize_session=False)
+            return len(expired)
+
+        try:
+            pruned = db_writer.run(delete_expired)
+        except Exception as e:
+            self.logger.error(f"Error pruning prediction generations: {e}")
+            return 0
+
+        if pruned:
+            self.logger.info(f"🧹 Pruned {pruned} prediction generations")
+        return pruned
@@ -1,12 +1,25 @@
-import boto3
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import time
 import requests
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Tuple, Optional
 from utils.logger import logger
+from utils.aws import get_aws_client
+from config import Config
 from datetime import datetime, timedelta
+from services.health_scoring import HealthScoringEngine, FleetHealth, RISK_LEVELS, RISK_LEVEL_EDGES, decode_risk_masks
+from services.downtime_patterns import (
+    DOWNTIME_HEALTH_THRESHOLD, RecurringProfile, RiskProjection,
+    detect_downtime_episodes, recurring_profile, project_risk
+)
 
 class FIPDowntimePredictor:
     """
@@ -22,8 +35,7 @@ class FIPDowntimePredictor:
             aws_region: AWS region for Bedrock
         """
         self.vm_url = vm_url
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name=aws_region)
-        # self.lookout_client = boto3.client('lookoutmetrics', region_name=aws_region)
+        self.aws_region = aws_region
 
         # FIP metrics configuration based on your Prometheus service
         self.fip_metrics_config = {
@@ -60,7 +72,13 @@ class FIPDowntimePredictor:
                 'weight': 0.15
             }
         }
-    
+        self.health_engine = HealthScoringEngine(self.fip_metrics_config)
+
+    @property
+    def bedrock_client(self):
+        """Created on first Bedrock call, so fleet workers that never reach it skip boto3"""
+        return get_aws_client('bedrock-runtime', self.aws_region)
+
     def extract_fip_metrics(self, fip_name: str, bank_name: str, hours_back: int = 168) -> pd.DataFrame:
         """
         Extract FIP metrics from VictoriaMetrics for the last N hours
@@ -90,7 +108,8 @@ class FIPDowntimePredictor:
                     'step': '300'  # 5-minute intervals
                 }
                 
-                response = requests.get(f"{self.vm_url}/api/v1/query_range", params=params)
+                response = requests.get(f"{self.vm_url}/api/v1/query_range", params=params,
+                                        timeout=Config.VM_QUERY_TIMEOUT)
                 response.raise_for_status()
                 
                 data = response.json()
@@ -127,6 +146,87 @@ class FIPDowntimePredictor:
         
         return df
     
+    def extract_fleet_metrics(self, fip_list: Optional[List[Tuple[str, str]]] = None,
+                              hours_back: int = 168) -> Dict[str, pd.DataFrame]:
+        """
+        Extract metrics for many FIPs with one multi-series query per metric
+        
+        Args:
+            fip_list: (fip_name, bank_name) pairs to fetch (series under another
+                      bank_name are dropped); None fetches every FIP without a label filter
+            hours_back: Hours of historical data to fetch (default: 7 days)
+        
+        Returns:
+            Per-FIP DataFrames shaped like extract_fip_metrics()
+        """
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours_back)
+        
+        selector = ''
+        if fip_list:
+            # PromQL regex (RE2, fully anchored) inside a double-quoted string
+            fip_pattern = '|'.join(re.escape(fip_name) for fip_name, _ in fip_list).replace('\\', '\\\\')
+            bank_pattern = '|'.join(re.escape(bank_name) for _, bank_name in fip_list).replace('\\', '\\\\')
+            selector = f'{{fip_name=~"{fip_pattern}",bank_name=~"{bank_pattern}"}}'
+        
+        def fetch(metric_name: str) -> List[Dict]:
+            params = {
+                'query': f'{self.fip_metrics_config[metric_name]["query"]}{selector}',
+                'start': int(start_time.timestamp()),
+                'end': int(end_time.timestamp()),
+                'step': '300'  # 5-minute intervals
+            }
+            # POST keeps long FIP regexes out of the URL
+            response = requests.post(f"{self.vm_url}/api/v1/query_range", data=params,
+                                     timeout=Config.VM_QUERY_TIMEOUT)
+            response.raise_for_status()
+            return response.json().get('data', {}).get('result', [])
+        
+        # The per-metric queries are independent, so run them concurrently
+        series: Dict[str, Dict[str, pd.Series]] = {}
+        banks = dict(fip_list or [])
+        # The two regexes also match crossed pairs, so only the requested pairs are kept
+        wanted = {tuple(pair) for pair in fip_list} if fip_list else None
+        with ThreadPoolExecutor(max_workers=len(self.fip_metrics_config)) as executor:
+            futures = {name: executor.submit(fetch, name) for name in self.fip_metrics_config}
+            for metric_name, future in futures.items():
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to fetch {metric_name} for fleet: {e}")
+                    continue
+                
+                # Split the multi-series result per FIP (first series wins, as in extract_fip_metrics)
+                for result in results:
+                    labels = result.get('metric', {})
+                    fip_name = labels.get('fip_name')
+                    if fip_name is None or metric_name in series.get(fip_name, {}):
+                        continue
+                    if wanted is not None and (fip_name, labels.get('bank_name')) not in wanted:
+                        continue
+                    points = result.get('values', [])
+                    timestamps = pd.to_datetime(
+                        np.fromiter((float(t) for t, _ in points), dtype=np.float64, count=len(points)), unit='s'
+                    )
+                    values = np.fromiter((float(v) for _, v in points), dtype=np.float64, count=len(points))
+                    series.setdefault(fip_name, {})[metric_name] = pd.Series(values, index=timestamps)
+                    banks.setdefault(fip_name, labels.get('bank_name', 'unknown'))
+        
+        fleet = {}
+        for fip_name, metric_series in series.items():
+            df = pd.DataFrame(metric_series).sort_index()
+            df.index.name = 'timestamp'
+            df = df.reset_index()
+            df.insert(1, 'fip_name', fip_name)
+            df.insert(2, 'bank_name', banks[fip_name])
+            
+            numeric_columns = df.select_dtypes(include=[np.number]).columns
+            df[numeric_columns] = df[numeric_columns].fillna(method='ffill').fillna(method='bfill')
+            fleet[fip_name] = df
+        
+        logger.info(f"Fetched fleet metrics for {len(fleet)} FIPs with {len(self.fip_metrics_config)} queries")
+        return fleet
+    
     def calculate_health_score(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calculate composite health score for FIP service
@@ -139,58 +239,21 @@ class FIPDowntimePredictor:
         """
         df = df.copy()
         
-        # Initialize health score
-        df['health_score'] = 0.0
-        df['risk_factors'] = ''
-        
-        for metric_name, config in self.fip_metrics_config.items():
-            if metric_name in df.columns:
-                metric_values = df[metric_name]
-                weight = config['weight']
-                
-                if config.get('invert', False):
-                    # For metrics where higher is worse (error_rate, response_time)
-                    critical_threshold = config['threshold_critical']
-                    warning_threshold = config['threshold_warning']
-                    
-                    # Score: 1.0 (excellent) to 0.0 (critical)
-                    metric_score = np.where(
-                        metric_values <= warning_threshold, 1.0,
-                        np.where(
-                            metric_values <= critical_threshold,
-                            1.0 - (metric_values - warning_threshold) / (critical_threshold - warning_threshold),
-                            0.0
-                        )
-                    )
-                else:
-                    # For metrics where higher is better (success rates, status)
-                    critical_threshold = config['threshold_critical']
-                    warning_threshold = config['threshold_warning']
-                    
-                    metric_score = np.where(
-                        metric_values >= warning_threshold, 1.0,
-                        np.where(
-                            metric_values >= critical_threshold,
-                            (metric_values - critical_threshold) / (warning_threshold - critical_threshold),
-                            0.0
-                        )
-                    )
-                
-                df['health_score'] += metric_score * weight
-                
-                # Track risk factors
-                risk_mask = metric_score < 0.5
-                df.loc[risk_mask, 'risk_factors'] += f"{metric_name},"
-        
-        # Normalize health score to 0-100
-        df['health_score'] = np.clip(df['health_score'] * 100, 0, 100)
+        # Score every row in one vectorized pass; risk factors are kept as a bitmask
+        # over the scored metrics (decode with decode_risk_masks / df.attrs['risk_metrics'])
+        metric_names = [name for name in self.fip_metrics_config if name in df.columns]
+        health_score, risk_mask = self.health_engine.score(
+            df[metric_names].to_numpy(dtype=np.float64), metric_names
+        )
+        df['health_score'] = health_score
+        df['risk_mask'] = risk_mask
+        df.attrs['risk_metrics'] = metric_names
         
         # Determine risk level
-        df['risk_level'] = pd.cut(
-            df['health_score'],
-            bins=[0, 30, 60, 85, 100],
-            labels=['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'],
-            include_lowest=True
+        df['risk_level'] = pd.Categorical.from_codes(
+            np.searchsorted(RISK_LEVEL_EDGES, health_score, side='left'),
+            categories=list(RISK_LEVELS),
+            ordered=True
         )
         
         # Add time-based features
@@ -201,6 +264,22 @@ class FIPDowntimePredictor:
         
         return df
     
+    def calculate_fleet_health(self, df: pd.DataFrame, fip_names: Optional[List[str]] = None) -> FleetHealth:
+        """
+        Health scores for many FIPs at once
+        
+        Args:
+            df: Wide DataFrame with timestamp, fip_name and one column per metric
+            fip_names: FIP order for the FIP axis (default: sorted names in df)
+        
+        Returns:
+            FleetHealth over the aligned (time x FIP) grid
+        """
+        # Metrics absent from the frame contribute nothing, as in calculate_health_score
+        metric_names = [name for name in self.fip_metrics_config if name in df.columns]
+        values, timestamps, fip_names = HealthScoringEngine.align(df, metric_names, fip_names)
+        return self.health_engine.score_fleet(values, metric_names, timestamps, fip_names)
+    
     def detect_patterns(self, df: pd.DataFrame) -> Dict:
         """
         Detect downtime patterns and maintenance windows
@@ -219,62 +298,48 @@ class FIPDowntimePredictor:
         }
         
         # Define downtime as health score < 30 for more than 15 minutes
-        downtime_mask = df['health_score'] < 30
-        df['is_downtime'] = downtime_mask
-        
-        # Group consecutive downtime periods
-        df['downtime_group'] = (downtime_mask != downtime_mask.shift()).cumsum()
-        downtime_groups = df[downtime_mask].groupby('downtime_group')
-        
-        for group_id, group_data in downtime_groups:
-            if len(group_data) >= 3:  # At least 15 minutes (3 * 5min intervals)
-                start_time = group_data['timestamp'].min()
-                end_time = group_data['timestamp'].max()
-                duration_minutes = (end_time - start_time).total_seconds() / 60
-                
-                # Determine if it's planned maintenance
-                is_maintenance = (
-                    group_data['is_business_hours'].sum() == 0 or  # Outside business hours
-                    group_data['is_weekend'].sum() > 0  # During weekend
-                )
-                
-                event = {
-                    'start_time': start_time.isoformat(),
-                    'end_time': end_time.isoformat(),
-                    'duration_minutes': duration_minutes,
-                    'min_health_score': group_data['health_score'].min(),
-                    'affected_metrics': group_data['risk_factors'].iloc[0].rstrip(',').split(','),
-                    'is_maintenance': is_maintenance
-                }
-                
-                if is_maintenance:
-                    patterns['maintenance_windows'].append(event)
-                else:
-                    patterns['downtime_events'].append(event)
-        
-        # Analyze recurring patterns
-        # Daily patterns
-        hourly_downtime = df.groupby('hour')['is_downtime'].mean()
-        high_risk_hours = hourly_downtime[hourly_downtime > 0.1].index.tolist()
-        
-        # Weekly patterns
-        daily_downtime = df.groupby('day_of_week')['is_downtime'].mean()
-        high_risk_days = daily_downtime[daily_downtime > 0.1].index.tolist()
+        health = df['health_score'].to_numpy(dtype=np.float64)
+        timestamps = df['timestamp'].to_numpy()
+        df['is_downtime'] = health < DOWNTIME_HEALTH_THRESHOLD
+        
+        # Run-length encode the downtime mask instead of grouping consecutive rows
+        episodes, is_maintenance = detect_downtime_episodes(health, timestamps)
+        min_health = episodes.reduce(health[:, None], np.minimum)
+        affected = decode_risk_masks(df['risk_mask'].to_numpy()[episodes.start], df.attrs.get('risk_metrics', []))
+        
+        for i in range(len(episodes)):
+            start_time = pd.Timestamp(timestamps[episodes.start[i]])
+            end_time = pd.Timestamp(timestamps[episodes.end[i]])
+            event = {
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat(),
+                'duration_minutes': (end_time - start_time).total_seconds() / 60,
+                'min_health_score': float(min_health[i]),
+                'affected_metrics': affected[i],
+                'is_maintenance': bool(is_maintenance[i])
+            }
+            
+            if is_maintenance[i]:
+                patterns['maintenance_windows'].append(event)
+            else:
+                patterns['downtime_events'].append(event)
         
+        # Analyze recurring patterns (daily and weekly)
+        profile = recurring_profile(health, timestamps)
         patterns['recurring_patterns'] = {
-            'high_risk_hours': high_risk_hours,
-            'high_risk_days': high_risk_days,
-            'weekend_risk': df[df['is_weekend']]['is_downtime'].mean(),
-            'business_hours_risk': df[df['is_business_hours']]['is_downtime'].mean()
+            'high_risk_hours': np.flatnonzero(profile.high_risk_hours[0]).tolist(),
+            'high_risk_days': np.flatnonzero(profile.high_risk_days[0]).tolist(),
+            'weekend_risk': float(profile.weekend_rate[0]),
+            'business_hours_risk': float(profile.business_rate[0])
         }
         
         # Risk trends
-        df_recent = df.tail(288)  # Last 24 hours
+        recent = health[-288:]  # Last 24 hours
         patterns['risk_trends'] = {
-            'current_health_score': df['health_score'].iloc[-1],
-            'health_trend_24h': df_recent['health_score'].diff().mean(),
-            'critical_incidents_24h': len(df_recent[df_recent['health_score'] < 30]),
-            'avg_health_score_7d': df['health_score'].mean()
+            'current_health_score': float(health[-1]),
+            'health_trend_24h': float(np.diff(recent).mean()) if len(recent) > 1 else float('nan'),
+            'critical_incidents_24h': int((recent < DOWNTIME_HEALTH_THRESHOLD).sum()),
+            'avg_health_score_7d': float(health.mean())
         }
         
         return patterns
@@ -298,56 +363,37 @@ class FIPDowntimePredictor:
             'confidence_level': 'MEDIUM'
         }
         
-        # Generate hourly predictions for next 24 hours
-        for hour_offset in range(24):
-            prediction_time = now + timedelta(hours=hour_offset)
-            hour = prediction_time.hour
-            day_of_week = prediction_time.weekday()
-            is_weekend = day_of_week in [5, 6]
-            is_business_hours = 9 <= hour <= 17
-            
-            # Base risk from historical patterns
-            base_risk = 0.1  # 10% base risk
-            
-            # Add risk factors
-            if hour in patterns['recurring_patterns']['high_risk_hours']:
-                base_risk += 0.3
-            
-            if day_of_week in patterns['recurring_patterns']['high_risk_days']:
-                base_risk += 0.2
-            
-            if is_weekend:
-                base_risk += patterns['recurring_patterns']['weekend_risk'] * 0.5
-            
-            # Current trend impact
-            health_trend = patterns['risk_trends']['health_trend_24h']
-            if health_trend < -1:  # Declining health
-                base_risk += 0.2
-            elif health_trend > 1:  # Improving health
-                base_risk -= 0.1
-            
-            # Current health score impact
-            current_health = patterns['risk_trends']['current_health_score']
-            if current_health < 50:
-                base_risk += 0.3
-            elif current_health < 70:
-                base_risk += 0.1
-            
-            risk_score = min(base_risk, 1.0)
-            
-            if risk_score > 0.4:  # High risk threshold
-                predictions['high_risk_periods'].append({
-                    'time': prediction_time.isoformat(),
-                    'hour': hour,
-                    'risk_score': risk_score,
-                    'risk_level': 'HIGH' if risk_score > 0.6 else 'MEDIUM',
-                    'factors': [
-                        f"Historical hour pattern" if hour in patterns['recurring_patterns']['high_risk_hours'] else None,
-                        f"Weekend pattern" if is_weekend and patterns['recurring_patterns']['weekend_risk'] > 0.1 else None,
-                        f"Declining health trend" if health_trend < -1 else None,
-                        f"Current low health score ({current_health:.1f})" if current_health < 70 else None
-                    ]
-                })
+        # Rebuild the one-FIP recurring profile from the detected patterns and project all 24 hours at once
+        recurring = patterns['recurring_patterns']
+        hour_rate = np.zeros((1, 24))
+        hour_rate[0, recurring['high_risk_hours']] = 1.0
+        day_rate = np.zeros((1, 7))
+        day_rate[0, recurring['high_risk_days']] = 1.0
+        profile = RecurringProfile(
+            hour_rate=hour_rate,
+            day_rate=day_rate,
+            weekend_rate=np.array([recurring['weekend_risk']]),
+            business_rate=np.array([recurring['business_hours_risk']])
+        )
+        current_health = patterns['risk_trends']['current_health_score']
+        health_trend = patterns['risk_trends']['health_trend_24h']
+        projection = project_risk(profile, np.array([current_health]), np.array([health_trend]), 24, now)
+        
+        for hour_offset in np.flatnonzero(projection.high_risk[0]):
+            prediction_time = projection.times[hour_offset]
+            risk_score = float(projection.risk[0, hour_offset])
+            predictions['high_risk_periods'].append({
+                'time': prediction_time.isoformat(),
+                'hour': prediction_time.hour,
+                'risk_score': risk_score,
+                'risk_level': 'HIGH' if risk_score > 0.6 else 'MEDIUM',
+                'factors': [
+                    f"Historical hour pattern" if projection.hour_pattern[0, hour_offset] else None,
+                    f"Weekend pattern" if projection.weekend_pattern[0, hour_offset] else None,
+                    f"Declining health trend" if projection.declining[0] else None,
+                    f"Current low health score ({current_health:.1f})" if current_health < 70 else None
+                ]
+            })
         
         # Calculate overall risk score
         if predictions['high_risk_periods']:
@@ -368,6 +414,40 @@ class FIPDowntimePredictor:
         
         return predictions
     
+    def detect_fleet_episodes(self, fleet: FleetHealth) -> pd.DataFrame:
+        """
+        Downtime episodes for every FIP in one pass
+        
+        Returns:
+            One row per episode: fip_name, start/end time, duration, min health,
+            maintenance flag and affected metrics
+        """
+        episodes, is_maintenance = detect_downtime_episodes(fleet.health_score, fleet.timestamps)
+        start_times = fleet.timestamps[episodes.start]
+        end_times = fleet.timestamps[episodes.end]
+        return pd.DataFrame({
+            'fip_name': np.array(fleet.fip_names, dtype=object)[episodes.fip_index],
+            'start_time': start_times,
+            'end_time': end_times,
+            'duration_minutes': (end_times - start_times) / np.timedelta64(1, 'm'),
+            'min_health_score': episodes.reduce(fleet.health_score, np.minimum),
+            'is_maintenance': is_maintenance,
+            'affected_metrics': decode_risk_masks(
+                fleet.risk_mask[episodes.start, episodes.fip_index], fleet.metric_names
+            )
+        })
+    
+    def project_fleet_risk(self, fleet: FleetHealth, horizon_hours: int = 24,
+                           now: Optional[datetime] = None) -> RiskProjection:
+        """
+        Hourly risk matrix [FIP x hour] for the next horizon_hours (24 or 168) for the whole fleet
+        """
+        health = fleet.health_score
+        recent = health[-288:]  # Last 24 hours
+        health_trend = np.diff(recent, axis=0).mean(axis=0) if len(recent) > 1 else np.full(health.shape[1], np.nan)
+        profile = recurring_profile(health, fleet.timestamps)
+        return project_risk(profile, health[-1], health_trend, horizon_hours, now)
+    
     def generate_bedrock_analysis(self, fip_name: str, patterns: Dict, predictions: Dict) -> str:
         """
         Generate comprehensive analysis using AWS Bedrock
@@ -442,13 +522,15 @@ class FIPDowntimePredictor:
             logger.error(f"Bedrock analysis failed: {e}")
             return f"Analysis unavailable due to error: {e}"
     
-    def run_comprehensive_analysis(self, fip_name: str, bank_name: str) -> Dict:
+    def run_comprehensive_analysis(self, fip_name: str, bank_name: str,
+                                   df: Optional[pd.DataFrame] = None) -> Dict:
         """
         Run complete downtime prediction analysis for a FIP service
         
         Args:
             fip_name: FIP service name
             bank_name: Bank name
+            df: Metrics already fetched for this FIP (e.g. by extract_fleet_metrics)
         
         Returns:
             Complete analysis results
@@ -457,7 +539,8 @@ class FIPDowntimePredictor:
         
         try:
             # Step 1: Extract metrics
-            df = self.extract_fip_metrics(fip_name, bank_name, hours_back=168)  # 7 days
+            if df is None:
+                df = self.extract_fip_metrics(fip_name, bank_name, hours_back=168)  # 7 days
             if df.empty:
                 raise ValueError("No metrics data available")
             
@@ -512,36 +595,44 @@ class FIPDowntimePredictor:
             logger.error(f"❌ Analysis failed for {fip_name}: {e}")
             raise
     
-    def monitor_all_fips(self, fip_list: List[Tuple[str, str]]) -> Dict:
+    def monitor_all_fips(self, fip_list: List[Tuple[str, str]], fleet_mode: bool = False,
+                         max_workers: Optional[int] = None, fip_timeout: Optional[float] = None) -> Dict:
         """
         Monitor multiple FIP services
         
         Args:
             fip_list: List of (fip_name, bank_name) tuples
+            fleet_mode: Fetch all FIPs with one query per metric and analyze them on a
+                        worker pool; False runs the original one-FIP-at-a-time scan
+            max_workers: Worker pool size (default: Config.FLEET_SCAN_WORKERS)
+            fip_timeout: Seconds a single FIP analysis may run (default: Config.FLEET_SCAN_FIP_TIMEOUT)
         
         Returns:
             Combined monitoring results
         """
-        all_results = {}
+        if fleet_mode:
+            all_results = self._scan_fleet(fip_list, max_workers or Config.FLEET_SCAN_WORKERS,
+                                           fip_timeout or Config.FLEET_SCAN_FIP_TIMEOUT)
+        else:
+            all_results = {}
+            for fip_name, bank_name in fip_list:
+                try:
+                    all_results[fip_name] = self.run_comprehensive_analysis(fip_name, bank_name)
+                except Exception as e:
+                    logger.error(f"Failed to analyze {fip_name}: {e}")
+                    all_results[fip_name] = {'error': str(e)}
+        
+        # Check for critical alerts
         critical_alerts = []
-        
         for fip_name, bank_name in fip_list:
-            try:
-                result = self.run_comprehensive_analysis(fip_name, bank_name)
-                all_results[fip_name] = result
-                
-                # Check for critical alerts
-                if result['summary']['risk_level'] == 'HIGH':
-                    critical_alerts.append({
-                        'fip_name': fip_name,
-                        'bank_name': bank_name,
-                        'health_score': result['summary']['current_health_score'],
-                        'next_risk_period': result['summary']['next_high_risk_period']
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Failed to analyze {fip_name}: {e}")
-                all_results[fip_name] = {'error': str(e)}
+            result = all_results.get(fip_name, {})
+            if result.get('summary', {}).get('risk_level') == 'HIGH':
+                critical_alerts.append({
+                    'fip_name': fip_name,
+                    'bank_name': bank_name,
+                    'health_score': result['summary']['current_health_score'],
+                    'next_risk_period': result['summary']['next_high_risk_period']
+                })
         
         return {
             'timestamp': datetime.now().isoformat(),
@@ -549,9 +640,120 @@ class FIPDowntimePredictor:
             'critical_alerts': critical_alerts,
             'results': all_results
         }
+    
+    def _scan_fleet(self, fip_list: List[Tuple[str, str]], max_workers: int, fip_timeout: float) -> Dict:
+        """Analyze prefetched FIP frames on a worker pool; a failing or slow FIP only affects its own entry"""
+        fleet = self.extract_fleet_metrics(fip_list, hours_back=168)  # 7 days
+        results = {}
+        
+        # The analysis is CPU-bound pandas code, so the default pool uses spawned processes
+        # (each builds its own predictor); 'thread' trades parallelism for no startup cost
+        use_processes = Config.FLEET_SCAN_EXECUTOR == 'process'
+        context = multiprocessing.get_context('spawn')
+        started_queue = context.Queue() if use_processes else queue.Queue()
+        
+        # Workers report (attempt, fip_name, start time, pid) when they pick a FIP up, so the
+        # timeout runs from the start of the work rather than from entering the call queue.
+        # A timed-out worker process is killed and the pool recycled for the FIPs still to do;
+        # threads cannot be interrupted, so there a timed-out FIP is only reported.
+        remaining = list(fip_list)
+        attempt = 0
+        while remaining:
+            attempt += 1
+            if use_processes:
+                executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=context,
+                    initializer=_init_fleet_worker,
+                    initargs=(self.vm_url, started_queue)
+                )
+                analyze = _analyze_in_worker
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet-scan')
+                
+                def analyze(fip_name, bank_name, df, attempt):
+                    started_queue.put((attempt, fip_name, time.time(), None))
+                    return self.run_comprehensive_analysis(fip_name, bank_name, df=df)
+            
+            pending = {
+                executor.submit(analyze, fip_name, bank_name, df=fleet.get(fip_name, pd.DataFrame()), attempt=attempt):
+                    (fip_name, bank_name)
+                for fip_name, bank_name in remaining
+            }
+            remaining = []
+            started: Dict[str, Tuple[float, Optional[int]]] = {}
+            stuck_pids = set()
+            try:
+                while pending:
+                    done, _ = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        fip_name, _ = pending.pop(future)
+                        try:
+                            results[fip_name] = future.result()
+                        except Exception as e:
+                            logger.error(f"Failed to analyze {fip_name}: {e}")
+                            results[fip_name] = {'error': str(e)}
+                    
+                    while True:
+                        try:
+                            message = started_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if message[0] == attempt:
+                            started[message[1]] = message[2:]
+                    
+                    now = time.time()
+                    for future, (fip_name, _) in list(pending.items()):
+                        if fip_name in started and now - started[fip_name][0] > fip_timeout:
+                            logger.error(f"Analysis of {fip_name} timed out after {fip_timeout:.0f}s")
+                            results[fip_name] = {'error': f"timed out after {fip_timeout:.0f}s"}
+                            del pending[future]
+                            if started[fip_name][1] is not None:
+                                stuck_pids.add(started[fip_name][1])
+                    
+                    if stuck_pids:
+                        # Killing a worker breaks the pool; FIPs it had not finished go to a fresh one
+                        for pid in stuck_pids:
+                            _terminate_worker(pid)
+                        remaining = list(pending.values())
+                        break
+            finally:
+                # Recycled pools are waited on so their workers are reaped; thread pools aren't,
+                # as a timed-out thread would block the scan
+                executor.shutdown(wait=bool(stuck_pids), cancel_futures=True)
+            
+            if remaining:
+                logger.warning(f"Recycled the fleet scan pool, {len(remaining)} FIPs left to analyze")
+        
+        logger.info(f"Fleet scan finished: {len(results)} FIPs, "
+                    f"{sum('error' in r for r in results.values())} failed")
+        return results
+
+
+# Fleet scan process-pool workers
+_worker_predictor: Optional[FIPDowntimePredictor] = None
+_worker_started = None
+
+
+def _init_fleet_worker(vm_url: str, started_queue) -> None:
+    global _worker_predictor, _worker_started
+    _worker_predictor = FIPDowntimePredictor(vm_url=vm_url)
+    _worker_started = started_queue
+
+
+def _analyze_in_worker(fip_name: str, bank_name: str, df: pd.DataFrame, attempt: int) -> Dict:
+    _worker_started.put((attempt, fip_name, time.time(), os.getpid()))
+    return _worker_predictor.run_comprehensive_analysis(fip_name, bank_name, df=df)
+
+
+def _terminate_worker(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
 
 # Example usage
-def predictor_main():
+def predictor_main(fleet_mode: bool = False):
     # Initialize predictor
     predictor = FIPDowntimePredictor(vm_url='http://victoriametrics:8428')
     
@@ -577,5 +779,11 @@ def predictor_main():
         ('sbi-fip', 'State Bank of India')
     ]
     
-    monitoring_results = predictor.monitor_all_fips(fip_services)
-    logger.info(f"\n📊 Monitoring Summary: {len(monitoring_results['critical_alerts'])} critical alerts")
\ No newline at end of file
+    monitoring_results = predictor.monitor_all_fips(fip_services, fleet_mode=fleet_mode)
+    logger.info(f"\n📊 Monitoring Summary: {len(monitoring_results['critical_alerts'])} critical alerts")
+
+
+if __name__ == "__main__":
+    # Batch entry point (python -m services.predictor): the spawned fleet workers
+    # re-import this module, not the Flask app
+    predictor_main(fleet_mode=True)
\ No newline at end of file
@@ -1,137 +1,162 @@
-import random
+import threading
 import time
 from datetime import datetime
-from prometheus_client import Gauge, Counter, Histogram, CollectorRegistry, push_to_gateway
+from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, push_to_gateway
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+import numpy as np
 import requests
-from typing import Dict, List
-import os
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import Config
+from services.fip_registry import STATUS_NAMES
+from services.remote_write import RemoteWriteClient, RemoteWriteStats
+from utils import instrumentation
 from utils.logger import logger
 
+
+# Status -> numeric value for Prometheus (1=healthy, 0.5=degraded, 0=critical)
+STATUS_VALUES = {
+    'healthy': 1.0,
+    'warning': 0.8,
+    'degraded': 0.5,
+    'critical': 0.0
+}
+
+# (metric name, help, metrics key) for the per-FIP gauges
+FIP_GAUGES = [
+    ('fip_consent_success_rate', 'FIP consent approval success rate percentage', 'consent_success_rate'),
+    ('fip_data_fetch_success_rate', 'FIP data fetch success rate percentage', 'data_fetch_success_rate'),
+    ('fip_avg_response_time_seconds', 'FIP average response time in seconds', 'avg_response_time'),
+    ('fip_error_rate', 'FIP error rate percentage', 'error_rate')
+]
+
+REQUEST_TYPES = [('consent', 50, 200), ('data_fetch', 30, 150)]  # simulated requests per step: (type, low, high)
+
+
+class FIPMetricsCollector:
+    """
+    Custom collector that renders the FIP metrics straight from the live
+    MetricsService state at scrape time, so nothing is copied into client-side
+    Gauges (or pushed anywhere) between scrapes.
+
+    The simulated request counters advance once per simulation step, the first
+    time a step is collected, so they stay monotonic however often Prometheus scrapes.
+    """
+
+    def __init__(self, metrics_service, seed: Optional[int] = None):
+        self.metrics_service = metrics_service
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._request_totals = {}   # (fip_name, request_type) -> count
+        self._counted_step = None
+
+    def collect(self):
+        current_metrics = self.metrics_service.get_metrics_view()
+        fip_names = list(current_metrics)
+        bank_names, columns, status = self._columns(current_metrics, fip_names)
+        request_totals = self._advance_request_totals(current_metrics, fip_names)
+
+        for name, documentation, key in FIP_GAUGES:
+            gauge = GaugeMetricFamily(name, documentation, labels=['fip_name', 'bank_name'])
+            for fip_name, bank_name, value in zip(fip_names, bank_names, columns[key].tolist()):
+                gauge.add_metric([fip_name, bank_name], value)
+            yield gauge
+
+        gauge = GaugeMetricFamily('fip_status', 'FIP operational status (1=healthy, 0.5=degraded, 0=critical)',
+                                  labels=['fip_name', 'bank_name'])
+        for fip_name, bank_name, value in zip(fip_names, bank_names, status):
+            gauge.add_metric([fip_name, bank_name], value)
+        yield gauge
+
+        counter = CounterMetricFamily('fip_total_requests', 'Total requests processed by FIP',
+                                      labels=['fip_name', 'bank_name', 'request_type'])
+        for fip_name, bank_name in zip(fip_names, bank_names):
+            for request_type, _, _ in REQUEST_TYPES:
+                counter.add_metric([fip_name, bank_name, request_type], request_totals[(fip_name, request_type)])
+        yield counter
+
+    def describe(self):
+        # Keeps registration from calling collect() (and advancing the counters)
+        return []
+
+    def _columns(self, current_metrics, fip_names: List[str]) -> Tuple[List[str], Dict[str, np.ndarray], List[float]]:
+        if hasattr(current_metrics, 'numeric_columns'):
+            # Array-backed metrics view (MetricsService): no per-FIP dicts needed
+            status = [STATUS_VALUES[STATUS_NAMES[code]] for code in current_metrics.status_codes().tolist()]
+            return current_metrics.registry.bank_names, current_metrics.numeric_columns(), status
+
+        bank_names = [current_metrics[fip].get('bank_name', fip) for fip in fip_names]
+        columns = {
+            key: np.array([float(current_metrics[fip].get(key, 0) or 0) for fip in fip_names])
+            for _, _, key in FIP_GAUGES
+        }
+        status = [STATUS_VALUES.get(current_metrics[fip].get('current_status'), 0.5) for fip in fip_names]
+        return bank_names, columns, status
+
+    def _advance_request_totals(self, current_metrics, fip_names: List[str]) -> Dict[Tuple[str, str], float]:
+        with self._lock:
+            if current_metrics is not self._counted_step:
+                self._counted_step = current_metrics
+                for request_type, low, high in REQUEST_TYPES:
+                    counts = self.rng.integers(low, high, len(fip_names), endpoint=True).tolist()
+                    for fip_name, count in zip(fip_names, counts):
+                        key = (fip_name, request_type)
+                        self._request_totals[key] = self._request_totals.get(key, 0) + count
+            return dict(self._request_totals)
+
+
 class PrometheusService:
     """
     Service for integrating with Prometheus metrics
-    Pushes mock FIP metrics to Prometheus for realistic demo
+    Serves the live FIP metrics on /metrics for Prometheus/VictoriaMetrics to scrape,
+    with the Pushgateway as an optional fallback (PROMETHEUS_PUSHGATEWAY_ENABLED)
     """
     
-    def __init__(self):
+    def __init__(self, metrics_service=None):
         # Prometheus pushgateway configuration
-        self.pushgateway_url = os.getenv('PROMETHEUS_PUSHGATEWAY_URL', 'pushgateway:9091')  # Use Docker service name
+        self.pushgateway_url = Config.PROMETHEUS_PUSHGATEWAY_URL
+        self.pushgateway_enabled = Config.PROMETHEUS_PUSHGATEWAY_ENABLED
         self.job_name = 'aa_gateway_fips'
         
-        # Create custom registry for FIP metrics
-        self.registry = CollectorRegistry()
-        
-        # Define Prometheus metrics
-        self.fip_consent_success_rate = Gauge(
-            'fip_consent_success_rate',
-            'FIP consent approval success rate percentage',
-            ['fip_name', 'bank_name'],
-            registry=self.registry
-        )
-        
-        self.fip_data_fetch_success_rate = Gauge(
-            'fip_data_fetch_success_rate',
-            'FIP data fetch success rate percentage',
-            ['fip_name', 'bank_name'],
-            registry=self.registry
-        )
-        
-        self.fip_response_time = Gauge(
-            'fip_avg_response_time_seconds',
-            'FIP average response time in seconds',
-            ['fip_name', 'bank_name'],
-            registry=self.registry
-        )
-        
-        self.fip_error_rate = Gauge(
-            'fip_error_rate',
-            'FIP error rate percentage',
-            ['fip_name', 'bank_name'],
-            registry=self.registry
-        )
+        if metrics_service is None:
+            from services.metrics_service import MetricsService
+            metrics_service = MetricsService()
+        self.metrics_service = metrics_service
         
-        self.fip_total_requests = Counter(
-            'fip_total_requests',
-            'Total requests processed by FIP',
-            ['fip_name', 'bank_name', 'request_type'],
-            registry=self.registry
-        )
+        # Custom registry, rendered from the live metrics on every scrape
+        self.registry = CollectorRegistry()
+        self.collector = FIPMetricsCollector(metrics_service)
+        self.registry.register(self.collector)
         
-        self.fip_status = Gauge(
-            'fip_status',
-            'FIP operational status (1=healthy, 0.5=degraded, 0=critical)',
-            ['fip_name', 'bank_name'],
-            registry=self.registry
-        )
+        # Remote write sender for high-volume emission (started on first use)
+        self.remote_write = RemoteWriteClient() if Config.REMOTE_WRITE_URL else None
         
-        logger.info("✅ Prometheus metrics initialized")
+        mode = f"pushgateway fallback at {self.pushgateway_url}" if self.pushgateway_enabled else "scrape only"
+        if self.remote_write is not None:
+            mode += f", remote write to {self.remote_write.url}"
+        logger.info(f"✅ Prometheus metrics initialized ({mode})")
+    
+    def render_metrics(self) -> Tuple[bytes, str]:
+        """
+        Exposition-format body and content type for the /metrics endpoint:
+        the FIP metrics followed by the app's own instrumentation
+        """
+        return generate_latest(self.registry) + generate_latest(instrumentation.registry), CONTENT_TYPE_LATEST
     
     def push_mock_metrics(self) -> int:
         """
-        Push mock FIP metrics to Prometheus
+        Push the current FIP metrics to the configured push targets (remote write,
+        Prometheus pushgateway), when enabled
         Returns number of metrics generated
         """
+        metrics_count = len(self.metrics_service.get_metrics_view()) * 5  # 5 metrics per FIP
+        if self.remote_write is not None:
+            self.remote_write_metrics()
+        if not self.pushgateway_enabled:
+            # Served on /metrics at scrape time; nothing to push
+            return metrics_count
+        
         try:
-            from services.metrics_service import MetricsService
-            metrics_service = MetricsService()
-            
-            # Get current FIP metrics
-            fip_metrics = metrics_service.get_all_fips_status()
-            
-            metrics_count = 0
-            
-            for fip_name, metrics in fip_metrics.items():
-                bank_name = metrics.get('bank_name', fip_name)
-                
-                # Update Prometheus metrics
-                self.fip_consent_success_rate.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name
-                ).set(metrics['consent_success_rate'])
-                
-                self.fip_data_fetch_success_rate.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name
-                ).set(metrics['data_fetch_success_rate'])
-                
-                self.fip_response_time.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name
-                ).set(metrics['avg_response_time'])
-                
-                self.fip_error_rate.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name
-                ).set(metrics['error_rate'])
-                
-                # Convert status to numeric
-                status_value = self._status_to_numeric(metrics['current_status'])
-                self.fip_status.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name
-                ).set(status_value)
-                
-                # Simulate request counters
-                consent_requests = random.randint(50, 200)
-                data_requests = random.randint(30, 150)
-                
-                self.fip_total_requests.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name, 
-                    request_type='consent'
-                )._value._value += consent_requests
-                
-                self.fip_total_requests.labels(
-                    fip_name=fip_name, 
-                    bank_name=bank_name, 
-                    request_type='data_fetch'
-                )._value._value += data_requests
-                
-                metrics_count += 5  # 5 metrics per FIP
-            
-            # Push to Prometheus pushgateway
             self._push_to_gateway()
-            
             logger.info(f"📊 Pushed {metrics_count} metrics to Prometheus")
             return metrics_count
             
@@ -139,17 +164,42 @@ class PrometheusService:
             logger.error(f"❌ Error pushing metrics to Prometheus: {e}")
             return 0
     
+    def remote_write_metrics(self, timestamp_ms: Optional[int] = None) -> int:
+        """
+        Queue the current FIP metrics (the same series /metrics serves) on the remote
+        write sender. Returns number of samples queued
+        """
+        if self.remote_write is None:
+            raise RuntimeError("Remote write is not configured (REMOTE_WRITE_URL)")
+        
+        timestamp_ms = timestamp_ms or int(time.time() * 1000)
+        samples = 0
+        for family in self.registry.collect():
+            for sample in family.samples:
+                self.remote_write.write({'__name__': sample.name, **sample.labels}, [sample.value], [timestamp_ms])
+                samples += 1
+        return samples
+    
+    def remote_write_history(self, entries: Iterable[Dict], timeout: Optional[float] = None) -> RemoteWriteStats:
+        """
+        Send history entries (e.g. iter_history_entries of a backfill file) over remote
+        write and wait for them to be delivered; returns the sender's counters
+        """
+        if self.remote_write is None:
+            raise RuntimeError("Remote write is not configured (REMOTE_WRITE_URL)")
+        
+        self.remote_write.write_entries(entries)
+        self.remote_write.flush(timeout)
+        stats = self.remote_write.report()
+        logger.info(f"📊 Remote write: {stats.samples_sent} samples sent, "
+                    f"{stats.samples_per_second:.0f} samples/s")
+        return stats
+    
     def _status_to_numeric(self, status: str) -> float:
         """
         Convert status string to numeric value for Prometheus
         """
-        status_map = {
-            'healthy': 1.0,
-            'warning': 0.8,
-            'degraded': 0.5,
-            'critical': 0.0
-        }
-        return status_map.get(status, 0.5)
+        return STATUS_VALUES.get(status, 0.5)
     
     def _push_to_gateway(self):
         """
@@ -257,7 +307,7 @@ scrape_configs:
     metrics_path: '/metrics'
     scrape_interval: 30s
 
-  # Pushgateway for batch metrics
+  # Pushgateway, only when PROMETHEUS_PUSHGATEWAY_ENABLED=true
   - job_name: 'pushgateway'
     static_configs:
       - targets: ['localhost:9091']
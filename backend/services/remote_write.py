@@ -0,0 +1,633 @@
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import requests
+from config import Config
+from services.vm_importer import HISTORY_METRICS, entry_timestamp_ms
+from utils.logger import logger
+
+try:
+    import snappy
+    SNAPPY_AVAILABLE = True
+except ImportError:  # optional dependency (python-snappy): falls back to uncompressed snappy framing
+    SNAPPY_AVAILABLE = False
+
+
+PROGRESS_LOG_INTERVAL = 10  # seconds
+SERIES_CACHE_LIMIT = 100000  # encoded label sets kept for reuse
+
+REMOTE_WRITE_HEADERS = {
+    'Content-Type': 'application/x-protobuf',
+    'Content-Encoding': 'snappy',
+    'X-Prometheus-Remote-Write-Version': '0.1.0'
+}
+
+
+# ================================
+# PROTOBUF (prometheus.WriteRequest)
+# ================================
+#
+# WriteRequest { repeated TimeSeries timeseries = 1; }
+# TimeSeries   { repeated Label labels = 1; repeated Sample samples = 2; }
+# Label        { string name = 1; string value = 2; }
+# Sample       { double value = 1; int64 timestamp = 2; }
+#
+# Encoded by hand: the messages are tiny and fixed, and it keeps protobuf out of the dependencies.
+
+def _varint(n: int) -> bytes:
+    n &= 0xFFFFFFFFFFFFFFFF  # int64 two's complement, as protobuf encodes negatives
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited field"""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def encode_labels(labels: Dict[str, str]) -> bytes:
+    """TimeSeries.labels, sorted by name as remote write requires"""
+    return b''.join(
+        _field(1, _field(1, name.encode('utf-8')) + _field(2, str(value).encode('utf-8')))
+        for name, value in sorted(labels.items())
+    )
+
+
+def encode_samples(values: np.ndarray, timestamps: np.ndarray) -> bytes:
+    """
+    TimeSeries.samples. When every timestamp has the same varint width (always the
+    case for a series of epoch-ms timestamps within a few years) the records are laid
+    out with numpy in one go; otherwise each sample is encoded on its own.
+    """
+    values = np.asarray(values, dtype='<f8')
+    timestamps = np.asarray(timestamps, dtype=np.int64).astype(np.uint64)
+    n = len(values)
+    if n == 0:
+        return b''
+
+    widths = 1 + sum((timestamps >= np.uint64(1 << (7 * k))).astype(np.int64) for k in range(1, 10))
+    width = int(widths[0])
+    if not (widths == width).all():
+        return b''.join(
+            _field(2, b'\x09' + struct.pack('<d', value) + b'\x10' + _varint(timestamp))
+            for value, timestamp in zip(values.tolist(), timestamps.tolist())
+        )
+
+    # 0x12 len | 0x09 <double> | 0x10 <varint timestamp>
+    records = np.empty((n, 12 + width), dtype=np.uint8)
+    records[:, 0] = 0x12
+    records[:, 1] = 10 + width
+    records[:, 2] = 0x09
+    records[:, 3:11] = values.view(np.uint8).reshape(n, 8)
+    records[:, 11] = 0x10
+    for k in range(width):
+        byte = (timestamps >> np.uint64(7 * k)) & np.uint64(0x7F)
+        records[:, 12 + k] = byte | np.uint64(0x80 if k < width - 1 else 0)
+    return records.tobytes()
+
+
+def encode_timeseries(label_bytes: bytes, values: np.ndarray, timestamps: np.ndarray) -> bytes:
+    """One WriteRequest.timeseries entry; concatenating entries gives a WriteRequest"""
+    return _field(1, label_bytes + encode_samples(values, timestamps))
+
+
+def _iter_fields(data: bytes) -> Iterator[Tuple[int, object]]:
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        elif wire_type == 5:
+            value, pos = data[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield number, value
+
+
+def decode_write_request(data: bytes) -> List[Tuple[Dict[str, str], List[Tuple[float, int]]]]:
+    """(labels, [(value, timestamp_ms)]) per series of a WriteRequest"""
+    series = []
+    for number, timeseries in _iter_fields(data):
+        if number != 1:
+            continue
+        labels, samples = {}, []
+        for field, payload in _iter_fields(timeseries):
+            if field == 1:
+                label = dict(_iter_fields(payload))
+                labels[label.get(1, b'').decode('utf-8')] = label.get(2, b'').decode('utf-8')
+            elif field == 2:
+                sample = dict(_iter_fields(payload))
+                timestamp = sample.get(2, 0)
+                if timestamp >= 1 << 63:
+                    timestamp -= 1 << 64
+                samples.append((struct.unpack('<d', sample.get(1, bytes(8)))[0], timestamp))
+        series.append((labels, samples))
+    return series
+
+
+# ================================
+# SNAPPY (block format)
+# ================================
+
+def snappy_compress(data: bytes) -> bytes:
+    """
+    Snappy block format. Without python-snappy the data is framed as literals only:
+    a valid stream any receiver decodes, just not a smaller one.
+    """
+    if SNAPPY_AVAILABLE:
+        return snappy.compress(data)
+
+    out = bytearray(_varint(len(data)))
+    for start in range(0, len(data), 1 << 16):
+        literal = data[start:start + (1 << 16)]
+        n = len(literal) - 1
+        if n < 60:
+            out.append(n << 2)
+        elif n < 256:
+            out += bytes((60 << 2, n))
+        else:
+            out.append(61 << 2)
+            out += n.to_bytes(2, 'little')
+        out += literal
+    return bytes(out)
+
+
+def snappy_decompress(data: bytes) -> bytes:
+    if SNAPPY_AVAILABLE:
+        return snappy.uncompress(data)
+
+    length, pos = _read_varint(data, 0)
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        kind = tag & 3
+        if kind == 0:  # literal
+            n = tag >> 2
+            if n >= 60:
+                size = n - 59
+                n = int.from_bytes(data[pos:pos + size], 'little')
+                pos += size
+            out += data[pos:pos + n + 1]
+            pos += n + 1
+            continue
+
+        if kind == 1:
+            n, offset = ((tag >> 2) & 7) + 4, (tag >> 5) << 8 | data[pos]
+            pos += 1
+        elif kind == 2:
+            n, offset = (tag >> 2) + 1, int.from_bytes(data[pos:pos + 2], 'little')
+            pos += 2
+        else:
+            n, offset = (tag >> 2) + 1, int.from_bytes(data[pos:pos + 4], 'little')
+            pos += 4
+        start = len(out) - offset
+        if offset >= n:
+            out += out[start:start + n]
+        else:  # overlapping copy repeats the last `offset` bytes
+            for i in range(n):
+                out.append(out[start + i])
+
+    if len(out) != length:
+        raise ValueError(f"Corrupt snappy block: expected {length} bytes, got {len(out)}")
+    return bytes(out)
+
+
+# ================================
+# CLIENT
+# ================================
+
+@dataclass
+class RemoteWriteStats:
+    samples_sent: int = 0
+    samples_failed: int = 0
+    samples_dropped: int = 0
+    requests_sent: int = 0
+    requests_failed: int = 0
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def samples_per_second(self) -> float:
+        return self.samples_sent / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), 'samples_per_second': round(self.samples_per_second, 1)}
+
+
+@dataclass
+class _Fragment:
+    series_key: Tuple
+    label_bytes: bytes
+    values: np.ndarray
+    timestamps: np.ndarray
+
+
+class _Shard:
+    """
+    One sender thread with its own bounded queue. A series always hashes to the same
+    shard, so its samples are sent in the order they were written.
+    """
+
+    def __init__(self, client: 'RemoteWriteClient', index: int):
+        self.client = client
+        self.index = index
+        self.queue = deque()
+        self.queued_samples = 0     # queued or being sent; bounded by capacity
+        self.sending = 0            # taken off the queue, not yet acknowledged
+        self.flushing = 0           # flush() callers waiting, send partial batches right away
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name=f'remote-write-{index}', daemon=True)
+
+    def put(self, fragment: _Fragment, timeout: Optional[float]) -> bool:
+        """Enqueue, blocking while the shard is full (backpressure); False when timed out"""
+        n = len(fragment.values)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.queued_samples and self.queued_samples + n > self.client.capacity and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            if self.closed:
+                return False
+            self.queue.append(fragment)
+            self.queued_samples += n
+            self.cond.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.flushing += 1
+            self.cond.notify_all()
+            try:
+                while self.queued_samples:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+                return True
+            finally:
+                self.flushing -= 1
+
+    def close(self) -> None:
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _next_batch(self) -> Optional[List[_Fragment]]:
+        """Wait for a full batch, or a partial one once the send deadline passes"""
+        max_samples = self.client.max_samples_per_send
+        with self.cond:
+            deadline = None
+            while True:
+                if self.queue:
+                    deadline = deadline or time.monotonic() + self.client.batch_send_deadline
+                    remaining = deadline - time.monotonic()
+                    if (self._pending_samples() >= max_samples or remaining <= 0
+                            or self.flushing or self.closed):
+                        break
+                    self.cond.wait(remaining)
+                elif self.closed:
+                    return None
+                else:
+                    self.cond.wait()
+
+            batch, samples = [], 0
+            while self.queue and (not batch or samples + len(self.queue[0].values) <= max_samples):
+                fragment = self.queue.popleft()
+                batch.append(fragment)
+                samples += len(fragment.values)
+            self.sending += samples
+            return batch
+
+    def _pending_samples(self) -> int:
+        return self.queued_samples - self.sending
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            samples = sum(len(fragment.values) for fragment in batch)
+            try:
+                self.client._send_batch(batch, samples)
+            finally:
+                with self.cond:
+                    self.sending -= samples
+                    self.queued_samples -= samples
+                    self.cond.notify_all()
+
+
+class RemoteWriteClient:
+    """
+    Prometheus remote-write sender (works with Prometheus, VictoriaMetrics' /api/v1/write
+    and any other remote-write receiver).
+
+    Samples are written per series, hashed onto `shards` sender threads and queued
+    there; each shard groups up to `max_samples_per_send` samples by series, orders
+    them by time and sends them as one snappy-compressed protobuf WriteRequest, or
+    sends what it has once `batch_send_deadline` passes. A shard's queue holds at most
+    `capacity` samples, and writers block (backpressure) until there is room.
+    """
+
+    def __init__(self, url: Optional[str] = None, shards: Optional[int] = None,
+                 max_samples_per_send: Optional[int] = None, capacity: Optional[int] = None,
+                 batch_send_deadline: Optional[float] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, extra_labels: Optional[Dict[str, str]] = None):
+        self.logger = logger
+        self.url = url or Config.REMOTE_WRITE_URL
+        if not self.url:
+            raise ValueError("No remote write URL configured (REMOTE_WRITE_URL)")
+        self.max_samples_per_send = max_samples_per_send or Config.REMOTE_WRITE_MAX_SAMPLES_PER_SEND
+        self.capacity = max(capacity or Config.REMOTE_WRITE_CAPACITY, self.max_samples_per_send)
+        self.batch_send_deadline = batch_send_deadline or Config.REMOTE_WRITE_BATCH_SEND_DEADLINE
+        self.timeout = timeout or Config.REMOTE_WRITE_TIMEOUT
+        self.max_retries = Config.REMOTE_WRITE_MAX_RETRIES if max_retries is None else max_retries
+        self.extra_labels = dict(extra_labels or {})
+
+        self.shards = [_Shard(self, i) for i in range(shards or Config.REMOTE_WRITE_SHARDS)]
+        self.stats = RemoteWriteStats()
+        self._stats_lock = threading.Lock()
+        self._series = {}     # series key -> (shard index, encoded labels)
+        self._local = threading.local()
+        self._started = None
+        self._stopped = None
+        self._last_log = 0.0
+
+    # ---- lifecycle ----
+
+    def start(self) -> 'RemoteWriteClient':
+        if self._started is None:
+            self._started = self._last_log = time.perf_counter()
+            for shard in self.shards:
+                shard.thread.start()
+            self.logger.info(f"🚀 Remote write to {self.url} ({len(self.shards)} shards, "
+                             f"{self.max_samples_per_send} samples/request, "
+                             f"snappy {'native' if SNAPPY_AVAILABLE else 'uncompressed fallback'})")
+        return self
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send everything queued so far; False if it did not drain within timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for shard in self.shards:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not shard.flush(remaining):
+                return False
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> RemoteWriteStats:
+        self.flush(timeout)
+        for shard in self.shards:
+            shard.close()
+        for shard in self.shards:
+            if shard.thread.is_alive():
+                shard.thread.join(timeout)
+        self._stopped = time.perf_counter()
+        stats = self.report()
+        self.logger.info(f"✅ Remote write sent {stats.samples_sent} samples in {stats.requests_sent} requests "
+                         f"({stats.samples_failed} failed, {stats.samples_dropped} dropped) in "
+                         f"{stats.elapsed_seconds:.1f}s: {stats.samples_per_second:.0f} samples/s")
+        return stats
+
+    def __enter__(self) -> 'RemoteWriteClient':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def report(self) -> RemoteWriteStats:
+        """Snapshot of the counters, with elapsed time since start()"""
+        with self._stats_lock:
+            stats = RemoteWriteStats(**asdict(self.stats))
+        if self._started is not None:
+            stats.elapsed_seconds = (self._stopped or time.perf_counter()) - self._started
+        return stats
+
+    # ---- writing ----
+
+    def write(self, labels: Dict[str, str], values: Sequence[float], timestamps_ms: Sequence[int],
+              timeout: Optional[float] = None) -> bool:
+        """
+        Queue samples of one series (labels include __name__). Blocks while the
+        series' shard is full; with a timeout the samples are dropped (and counted)
+        when no room frees up in time.
+        """
+        if self._started is None:
+            self.start()
+        values = np.asarray(values, dtype=np.float64)
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+
+        series_key = tuple(sorted(labels.items()))
+        series = self._series.get(series_key)
+        if series is None:
+            if len(self._series) >= SERIES_CACHE_LIMIT:
+                self._series.clear()
+            series = self._series[series_key] = (
+                zlib.crc32(repr(series_key).encode('utf-8')) % len(self.shards),
+                encode_labels({**self.extra_labels, **labels})
+            )
+        shard_index, label_bytes = series
+
+        ok = True
+        for start in range(0, len(values), self.max_samples_per_send):
+            end = start + self.max_samples_per_send
+            fragment = _Fragment(series_key, label_bytes, values[start:end], timestamps_ms[start:end])
+            if not self.shards[shard_index].put(fragment, timeout):
+                with self._stats_lock:
+                    self.stats.samples_dropped += len(fragment.values)
+                ok = False
+        return ok
+
+    def write_entries(self, entries: Iterable[Dict], timeout: Optional[float] = None) -> None:
+        """
+        History entries (the export_to_file layout), regrouped by series in blocks of
+        about one request per shard so each series is queued as one fragment
+        """
+        block_samples = self.max_samples_per_send * len(self.shards)
+        series, samples = {}, 0
+        for entry in entries:
+            timestamp_ms = entry_timestamp_ms(entry)
+            metrics = entry['metrics']
+            for metric_name, key, extra_labels in HISTORY_METRICS:
+                if key not in metrics:
+                    continue
+                series_key = (metric_name, entry['fip_name'], entry['bank_name'])
+                points = series.get(series_key)
+                if points is None:
+                    points = series[series_key] = ({
+                        '__name__': metric_name,
+                        'fip_name': entry['fip_name'],
+                        'bank_name': entry['bank_name'],
+                        **extra_labels
+                    }, [], [])
+                points[1].append(metrics[key])
+                points[2].append(timestamp_ms)
+                samples += 1
+            if samples >= block_samples:
+                self._write_series(series.values(), timeout)
+                series, samples = {}, 0
+        self._write_series(series.values(), timeout)
+
+    def _write_series(self, series, timeout: Optional[float]) -> None:
+        for labels, values, timestamps in series:
+            self.write(labels, values, timestamps, timeout)
+
+    # ---- sending ----
+
+    def _send_batch(self, batch: List[_Fragment], samples: int) -> None:
+        grouped = {}
+        for fragment in batch:
+            grouped.setdefault(fragment.series_key, []).append(fragment)
+
+        parts = []
+        for fragments in grouped.values():
+            values = np.concatenate([f.values for f in fragments])
+            timestamps = np.concatenate([f.timestamps for f in fragments])
+            if len(fragments) > 1:
+                order = np.argsort(timestamps, kind='stable')
+                values, timestamps = values[order], timestamps[order]
+            parts.append(encode_timeseries(fragments[0].label_bytes, values, timestamps))
+        raw = b''.join(parts)
+        body = snappy_compress(raw)
+
+        try:
+            self._post(body)
+        except Exception as e:
+            self.logger.error(f"❌ Remote write of {samples} samples failed: {e}")
+            with self._stats_lock:
+                self.stats.requests_failed += 1
+                self.stats.samples_failed += samples
+            return
+
+        with self._stats_lock:
+            self.stats.requests_sent += 1
+            self.stats.samples_sent += samples
+            self.stats.raw_bytes += len(raw)
+            self.stats.compressed_bytes += len(body)
+            now = time.perf_counter()
+            log_progress = now - self._last_log >= PROGRESS_LOG_INTERVAL
+            if log_progress:
+                self._last_log = now
+        if log_progress:
+            stats = self.report()
+            self.logger.info(f"📤 Remote write: {stats.samples_sent} samples, "
+                             f"{stats.samples_per_second:.0f} samples/s")
+
+    def _post(self, body: bytes) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._session().post(self.url, data=body, headers=REMOTE_WRITE_HEADERS, timeout=self.timeout)
+                if 200 <= response.status_code < 300:
+                    return
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    raise RuntimeError(error)  # the payload itself is rejected, retrying will not help
+            except requests.RequestException as e:
+                error = str(e)
+
+            if attempt < self.max_retries:
+                time.sleep(0.5 * 2 ** attempt)
+        raise RuntimeError(f"gave up after {self.max_retries + 1} attempts ({error})")
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+
+# ================================
+# STUB RECEIVER
+# ================================
+
+class StubRemoteWriteReceiver:
+    """
+    Minimal local remote-write endpoint for trying the client without a TSDB: decodes
+    every request and counts requests, series and samples (keeping the samples too
+    when keep_samples is set). Serves POST /api/v1/write on a background thread.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, keep_samples: bool = False):
+        self.keep_samples = keep_samples
+        self.requests = 0
+        self.samples = 0
+        self.series = set()
+        self.received = {}   # series key -> [(value, timestamp_ms)], only with keep_samples
+        self._lock = threading.Lock()
+
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                try:
+                    series = decode_write_request(snappy_decompress(body))
+                except Exception as e:
+                    self.send_response(400)
+                    self.end_headers()
+                    self.wfile.write(str(e).encode('utf-8'))
+                    return
+                receiver._record(series)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='remote-write-stub', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/write"
+
+    def start(self) -> 'StubRemoteWriteReceiver':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _record(self, series) -> None:
+        with self._lock:
+            self.requests += 1
+            for labels, samples in series:
+                key = tuple(sorted(labels.items()))
+                self.series.add(key)
+                self.samples += len(samples)
+                if self.keep_samples:
+                    self.received.setdefault(key, []).extend(samples)
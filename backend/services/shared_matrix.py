@@ -0,0 +1,363 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config import Config
+from services.feature_state import step_to_timedelta
+from services.historical_analyzer import epoch_to_local, local_to_epoch
+from services.history_store import parse_history_profiles
+from utils.logger import logger
+
+
+# Header slots (int64)
+SEQ, HEAD, OLDEST, FIP_COUNT, UPDATED_AT = range(5)
+HEADER_SIZE = 8
+NO_BUCKET = -1
+EPOCH = datetime(1970, 1, 1)  # query ranges are naive UTC
+MATRIX_CLOCK = 'utc'  # buckets are epoch seconds // step; layouts without it are recreated
+
+
+class SharedMetricsMatrix:
+    """
+    Memory-mapped FIP x metric x time-bucket float32 array shared between processes.
+
+    One ingest process opens it writable and keeps it current; request handlers and
+    analytics workers open it read-only and slice it without copying, so adding
+    workers does not add per-process copies of the history.
+
+    The time axis is a ring of n_buckets slots stored twice (slot and slot + n_buckets),
+    so any window of up to n_buckets ending at the head is one contiguous slice.
+    Writers bump a sequence counter around every update (odd while writing); readers
+    that need a consistent copy retry when it changed underneath them.
+
+    Files in <dir>: header.i64, values.f32, layout.json (metrics, step, FIPs).
+    Buckets count epoch seconds; frames going in and out use the local wall-clock
+    layout of extract_historical_data().
+    """
+
+    def __init__(self, directory: str, metrics: List[str], step: str, n_buckets: int,
+                 fip_capacity: int, writable: bool = False):
+        self.logger = logger
+        self.directory = directory
+        self.metrics = list(metrics)
+        self.metric_index = {name: i for i, name in enumerate(self.metrics)}
+        self.step = step
+        self.step_seconds = int(step_to_timedelta(step).total_seconds())
+        self.n_buckets = n_buckets
+        self.fip_capacity = fip_capacity
+        self.writable = writable
+
+        self.fips: List[str] = []
+        self.banks: List[str] = []
+        self.fip_index: Dict[str, int] = {}
+
+        mode = 'r+' if writable else 'r'
+        self.header = np.memmap(self._path('header.i64'), dtype=np.int64, mode=mode, shape=(HEADER_SIZE,))
+        self.values = np.memmap(
+            self._path('values.f32'), dtype=np.float32, mode=mode,
+            shape=(fip_capacity, len(self.metrics), 2 * n_buckets)
+        )
+        self._load_fips()
+
+    # ================================
+    # OPEN / CREATE
+    # ================================
+
+    @classmethod
+    def create(cls, directory: str, metrics: List[str], step: str, days_back: int,
+               fip_capacity: Optional[int] = None) -> 'SharedMetricsMatrix':
+        """Open the matrix for writing, (re)creating the files when the layout changed"""
+        fip_capacity = fip_capacity or Config.SHARED_MATRIX_FIP_CAPACITY
+        n_buckets = int(timedelta(days=days_back) / step_to_timedelta(step)) + 1
+        layout = {'metrics': list(metrics), 'step': step, 'n_buckets': n_buckets, 'fip_capacity': fip_capacity,
+                  'clock': MATRIX_CLOCK}
+
+        os.makedirs(directory, exist_ok=True)
+        existing = cls._read_layout(directory)
+        if existing is None or {k: existing.get(k) for k in layout} != layout:
+            np.memmap(os.path.join(directory, 'header.i64'), dtype=np.int64, mode='w+', shape=(HEADER_SIZE,))[:] = 0
+            values = np.memmap(
+                os.path.join(directory, 'values.f32'), dtype=np.float32, mode='w+',
+                shape=(fip_capacity, len(metrics), 2 * n_buckets)
+            )
+            values[:] = np.nan
+            values.flush()
+            header = np.memmap(os.path.join(directory, 'header.i64'), dtype=np.int64, mode='r+', shape=(HEADER_SIZE,))
+            header[HEAD] = header[OLDEST] = NO_BUCKET
+            header.flush()
+            cls._write_layout(directory, {**layout, 'fips': []})
+            logger.info(f"🧮 Created shared metrics matrix {directory} ({fip_capacity}x{len(metrics)}x{n_buckets})")
+
+        return cls(directory, metrics, step, n_buckets, fip_capacity, writable=True)
+
+    @classmethod
+    def open(cls, directory: str) -> Optional['SharedMetricsMatrix']:
+        """Open an existing matrix read-only, or None if the ingest process has not created it yet"""
+        layout = cls._read_layout(directory)
+        if layout is None or not os.path.exists(os.path.join(directory, 'values.f32')):
+            return None
+        return cls(directory, layout['metrics'], layout['step'], layout['n_buckets'], layout['fip_capacity'])
+
+    # ================================
+    # READS
+    # ================================
+
+    def window(self, n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zero-copy view of the latest n_buckets: (values[fip, metric, bucket], bucket epochs).
+        The view is live; use snapshot() when a consistent copy is needed.
+        """
+        head = int(self.header[HEAD])
+        if head == NO_BUCKET:
+            return self.values[:0, :, :0], np.empty(0, dtype=np.int64)
+
+        self._refresh_fips()
+        n_buckets = min(n_buckets, self.n_buckets, head - int(self.header[OLDEST]) + 1)
+        end = head % self.n_buckets + self.n_buckets + 1
+        epochs = np.arange(head - n_buckets + 1, head + 1, dtype=np.int64) * self.step_seconds
+        return self.values[:len(self.fips), :, end - n_buckets:end], epochs
+
+    def snapshot(self, n_buckets: int, retries: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Consistent copy of window(n_buckets), retried while the writer is mid-update"""
+        for _ in range(retries):
+            seq = int(self.header[SEQ])
+            if seq % 2 == 0:
+                values, epochs = self.window(n_buckets)
+                values = np.array(values)
+                if int(self.header[SEQ]) == seq:
+                    return values, epochs
+            time.sleep(0.001)
+        values, epochs = self.window(n_buckets)
+        return np.array(values), epochs
+
+    def covers(self, days_back: int, step: str) -> bool:
+        """True when the matrix holds this window at this step and the ingest process is alive"""
+        if step != self.step or int(self.header[HEAD]) == NO_BUCKET:
+            return False
+        wanted = int(timedelta(days=days_back) / step_to_timedelta(step))
+        held = int(self.header[HEAD]) - int(self.header[OLDEST]) + 1
+        fresh = time.time() - int(self.header[UPDATED_AT]) <= 3 * Config.SHARED_MATRIX_INGEST_INTERVAL
+        return wanted < self.n_buckets and held >= wanted and fresh
+
+    def to_frames(self, days_back: int, metrics: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+        """Long-format DataFrames shaped like extract_historical_data() (without the raw labels column)"""
+        n_buckets = int(timedelta(days=days_back) / step_to_timedelta(self.step)) + 1
+        values, epochs = self.snapshot(n_buckets)
+        timestamps = pd.DatetimeIndex(epoch_to_local(epochs).astype('datetime64[ns]'))
+        fips = np.array(self.fips[:values.shape[0]], dtype=object)
+        banks = np.array(self.banks[:values.shape[0]], dtype=object)
+
+        frames = {}
+        for metric_name in metrics or self.metrics:
+            block = values[:, self.metric_index[metric_name], :]
+            fip_idx, bucket_idx = np.nonzero(~np.isnan(block))
+            if len(fip_idx) == 0:
+                frames[metric_name] = pd.DataFrame()
+                continue
+            df = pd.DataFrame({
+                'timestamp': timestamps[bucket_idx],
+                'fip_name': fips[fip_idx],
+                'bank_name': banks[fip_idx],
+                'value': block[fip_idx, bucket_idx].astype(np.float64)
+            })
+            df.set_index('timestamp', inplace=True)
+            df.sort_index(inplace=True, kind='stable')
+            frames[metric_name] = df
+        return frames
+
+    # ================================
+    # WRITES (ingest process only)
+    # ================================
+
+    def write_frame(self, metric_name: str, df: pd.DataFrame) -> int:
+        """Write a long-format metric frame (timestamp index, fip_name, bank_name, value)"""
+        if df.empty:
+            return 0
+
+        buckets = local_to_epoch(df.index.values) // self.step_seconds
+        fip_rows = np.array([self._fip_row(f, b) for f, b in zip(df['fip_name'], df['bank_name'])])
+        keep = fip_rows >= 0
+        buckets, fip_rows = buckets[keep], fip_rows[keep]
+        values = df['value'].to_numpy(dtype=np.float32)[keep]
+        metric = self.metric_index[metric_name]
+
+        self.header[SEQ] += 1
+        try:
+            self._advance(int(buckets.max()))
+            in_window = buckets > int(self.header[HEAD]) - self.n_buckets
+            slots = buckets[in_window] % self.n_buckets
+            rows = fip_rows[in_window]
+            self.values[rows, metric, slots] = values[in_window]
+            self.values[rows, metric, slots + self.n_buckets] = values[in_window]
+
+            oldest = int(buckets[in_window].min()) if in_window.any() else NO_BUCKET
+            if oldest != NO_BUCKET and (self.header[OLDEST] == NO_BUCKET or oldest < self.header[OLDEST]):
+                self.header[OLDEST] = oldest
+            self.header[UPDATED_AT] = int(time.time())
+        finally:
+            self.header[SEQ] += 1
+        return int(in_window.sum())
+
+    def mark_covered_from(self, start_time: datetime) -> None:
+        """Record that the TSDB was queried back to start_time, even where it had no samples"""
+        bucket = max(int((start_time - EPOCH).total_seconds() // self.step_seconds) + 1,
+                     int(self.header[HEAD]) - self.n_buckets + 1)
+        if self.header[HEAD] != NO_BUCKET and (self.header[OLDEST] == NO_BUCKET or bucket < self.header[OLDEST]):
+            self.header[OLDEST] = bucket
+
+    def flush(self) -> None:
+        self.values.flush()
+        self.header.flush()
+
+    def _advance(self, bucket: int) -> None:
+        """Move the head forward, clearing the slots being reused"""
+        head = int(self.header[HEAD])
+        if head != NO_BUCKET and bucket <= head:
+            return
+
+        first = bucket - self.n_buckets + 1 if head == NO_BUCKET else max(head + 1, bucket - self.n_buckets + 1)
+        slots = np.arange(first, bucket + 1) % self.n_buckets
+        self.values[:, :, slots] = np.nan
+        self.values[:, :, slots + self.n_buckets] = np.nan
+        self.header[HEAD] = bucket
+        if self.header[OLDEST] != NO_BUCKET:
+            self.header[OLDEST] = max(int(self.header[OLDEST]), bucket - self.n_buckets + 1)
+
+    def _fip_row(self, fip_name: str, bank_name: str) -> int:
+        row = self.fip_index.get(fip_name)
+        if row is not None:
+            return row
+        if len(self.fips) >= self.fip_capacity:
+            self.logger.warning(f"Shared metrics matrix full, dropping FIP {fip_name}")
+            return -1
+
+        # Append-only: existing rows never move, readers pick up new FIPs via FIP_COUNT
+        self.fips.append(fip_name)
+        self.banks.append(bank_name)
+        self.fip_index[fip_name] = len(self.fips) - 1
+        layout = self._read_layout(self.directory)
+        layout['fips'] = [[f, b] for f, b in zip(self.fips, self.banks)]
+        self._write_layout(self.directory, layout)
+        self.header[FIP_COUNT] = len(self.fips)
+        return len(self.fips) - 1
+
+    # ================================
+    # LAYOUT
+    # ================================
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _refresh_fips(self) -> None:
+        if int(self.header[FIP_COUNT]) != len(self.fips):
+            self._load_fips()
+
+    def _load_fips(self) -> None:
+        layout = self._read_layout(self.directory) or {}
+        pairs = layout.get('fips', [])
+        self.fips = [f for f, _ in pairs]
+        self.banks = [b for _, b in pairs]
+        self.fip_index = {f: i for i, f in enumerate(self.fips)}
+
+    @staticmethod
+    def _read_layout(directory: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(directory, 'layout.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_layout(directory: str, layout: Dict) -> None:
+        path = os.path.join(directory, 'layout.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(layout, f)
+        os.replace(path + '.tmp', path)
+
+
+class SharedMatrixReader:
+    """Per-process read-only access to the shared matrices, one per configured step"""
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or Config.SHARED_MATRIX_DIR
+        self._matrices: Dict[str, SharedMetricsMatrix] = {}
+
+    def load(self, days_back: int, step: str,
+             metrics: Optional[Iterable[str]] = None) -> Optional[Dict[str, pd.DataFrame]]:
+        """Historical frames from the shared matrix, or None when it does not cover the request"""
+        matrix = self._matrices.get(step)
+        if matrix is None:
+            matrix = SharedMetricsMatrix.open(os.path.join(self.root_dir, step))
+            if matrix is None:
+                return None
+            self._matrices[step] = matrix
+
+        if not matrix.covers(days_back, step):
+            return None
+        return matrix.to_frames(days_back, metrics)
+
+
+class SharedMatrixIngestor:
+    """
+    Keeps the shared matrices current from the TSDB. Run exactly one per host
+    (python run.py ingest); every other process only reads.
+    """
+
+    def __init__(self, historical_analyzer, root_dir: Optional[str] = None,
+                 profiles: Optional[List[Tuple[str, int]]] = None):
+        self.logger = logger
+        self.historical_analyzer = historical_analyzer
+        self.root_dir = root_dir or Config.SHARED_MATRIX_DIR
+        self.profiles = profiles or parse_history_profiles(Config.SHARED_MATRIX_PROFILES)
+        metrics = list(historical_analyzer.metric_queries.keys())
+        self.matrices = {
+            step: SharedMetricsMatrix.create(os.path.join(self.root_dir, step), metrics, step, days_back)
+            for step, days_back in self.profiles
+        }
+
+    def sync(self) -> Dict[str, int]:
+        """Fetch samples newer than each matrix head (full window on first run)"""
+        written = {}
+        end_time = datetime.utcnow()
+        for step, days_back in self.profiles:
+            matrix = self.matrices[step]
+            head = int(matrix.header[HEAD])
+            start_time = end_time - timedelta(days=days_back)
+            if head != NO_BUCKET:
+                # Re-read the last bucket so a partially filled one gets its final value
+                start_time = max(start_time, datetime.utcfromtimestamp((head - 1) * matrix.step_seconds))
+
+            written[step] = 0
+            for metric_name, metric_query in self.historical_analyzer.metric_queries.items():
+                df = self.historical_analyzer._query_range(
+                    query=metric_query.query,
+                    start_time=start_time,
+                    end_time=end_time,
+                    step=step
+                )
+                written[step] += matrix.write_frame(metric_name, df)
+            if head == NO_BUCKET:
+                matrix.mark_covered_from(start_time)
+            matrix.flush()
+        return written
+
+    def run_forever(self) -> None:
+        self.logger.info(f"🧮 Shared metrics matrix ingest started for {[s for s, _ in self.profiles]}")
+        while True:
+            try:
+                written = self.sync()
+                self.logger.debug(f"Shared metrics matrix sync: {written}")
+                time.sleep(Config.SHARED_MATRIX_INGEST_INTERVAL)
+            except Exception as e:
+                self.logger.error(f"Error in shared metrics matrix ingest: {e}")
+                time.sleep(60)  # Retry after 1 minute
+
+
+def ingest_main() -> None:
+    """Entry point for the single ingest process"""
+    from services.historical_analyzer import PrometheusHistoricalAnalyzer
+    analyzer = PrometheusHistoricalAnalyzer(os.getenv('VICTORIAMETRICS_URL', 'http://victoriametrics:8428'))
+    SharedMatrixIngestor(analyzer).run_forever()
@@ -0,0 +1,266 @@
+import gzip
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from utils.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:  # optional dependency: only Parquet output needs it
+    PYARROW_AVAILABLE = False
+
+
+DEFAULT_FIPS = {
+    'sbi-fip': 'State Bank of India',
+    'hdfc-fip': 'HDFC Bank',
+    'icici-fip': 'ICICI Bank',
+    'axis-fip': 'Axis Bank',
+    'kotak-fip': 'Kotak Mahindra Bank',
+    'boi-fip': 'Bank of India',
+    'pnb-fip': 'Punjab National Bank',
+    'canara-fip': 'Canara Bank',
+    'ubi-fip': 'Union Bank of India',
+    'iob-fip': 'Indian Overseas Bank',
+    'central-fip': 'Central Bank of India'
+}
+
+# Local-time hour ranges [start, end) in which a FIP is forced down
+DOWNTIME_WINDOWS = {
+    'axis-fip': [(19, 23)],                 # 7pm-11pm
+    'hdfc-fip': [(23, 24), (0, 1)],         # 11pm-1am
+    'icici-fip': [(2, 3)],                  # 2-3am
+    'sbi-fip': [(13, 14), (20, 21)],        # 1-2pm and 8-9pm
+    'kotak-fip': [(12, 16)],                # 12-4pm
+    'pnb-fip': [(20, 21), (22, 24)],        # 8-9pm and 10-12pm
+    'canara-fip': [(13, 14)],               # 1-2pm
+    'ubi-fip': [(3, 4)],                    # 3-4am
+    'iob-fip': [(22, 24)],                  # 10-12pm
+    'central-fip': [(14, 16)]               # 2-4pm
+}
+
+METRIC_NAMES = ['consent_success_rate', 'data_fetch_success_rate', 'avg_response_time',
+                'error_rate', 'total_requests', 'status']
+DATA_PRESENCE = 0.7        # share of (time, FIP) points that carry data
+BLOCK_CELLS = 1 << 20      # time x FIP cells generated (and written) per block
+
+ENTRY_TEMPLATE = (
+    '{"timestamp": %d, "datetime": "%s", %s, "metrics": {"consent_success_rate": %r, '
+    '"data_fetch_success_rate": %r, "avg_response_time": %r, "error_rate": %r, '
+    '"total_requests": %d, "status": %r}}'
+)
+
+
+def bank_modifier(bank_name: str) -> float:
+    """Per-bank success-rate offset (0.00-0.09), stable across runs unlike hash()"""
+    return zlib.crc32(bank_name.encode('utf-8')) % 10 / 100
+
+
+def synthetic_fips(n_fips: int) -> Dict[str, str]:
+    """The default FIPs, extended with numbered copies that reuse their downtime windows"""
+    templates = list(DEFAULT_FIPS.items())
+    fips = dict(templates[:n_fips])
+    for i in range(len(fips), n_fips):
+        fip_name, bank_name = templates[i % len(templates)]
+        fips[f"{fip_name}-{i:04d}"] = f"{bank_name} {i:04d}"
+    return fips
+
+
+def downtime_windows(fip_name: str) -> List[Tuple[int, int]]:
+    if fip_name in DOWNTIME_WINDOWS:
+        return DOWNTIME_WINDOWS[fip_name]
+    return DOWNTIME_WINDOWS.get(fip_name.rsplit('-', 1)[0], [])
+
+
+@dataclass
+class HistoryBlock:
+    """A slice of the (time x FIP x metric) cube"""
+    timestamps: np.ndarray    # int64 epoch seconds, [time]
+    local_times: np.ndarray   # datetime64[s] naive local time, [time]
+    values: np.ndarray        # float64, [time, fip, metric] in METRIC_NAMES order
+    present: np.ndarray       # bool, [time, fip]; missing points are left out of exports
+
+
+class SyntheticHistoryGenerator:
+    """
+    Vectorized synthetic FIP history from a seedable RNG.
+
+    Same semantics as GenerateHistoricalData.generate_realistic_metrics: peak hours
+    (9-11 and 14-16 on weekdays) lower success rates and slow responses, weekends
+    raise success rates and lower volume, each FIP has fixed downtime windows with
+    near-total failure, and about 70% of points carry data. The cube is produced a
+    block of time steps at a time so exports stream with flat memory.
+    """
+
+    def __init__(self, fips: Optional[Dict[str, str]] = None, seed: Optional[int] = None):
+        self.logger = logger
+        self.fips = dict(fips or DEFAULT_FIPS)
+        self.fip_names = list(self.fips)
+        self.seed = seed
+        self.bank_modifiers = np.array([bank_modifier(bank) for bank in self.fips.values()])
+
+        self.downtime_hours = np.zeros((len(self.fip_names), 24), dtype=bool)
+        for i, fip_name in enumerate(self.fip_names):
+            for start, end in downtime_windows(fip_name):
+                self.downtime_hours[i, start:end] = True
+
+    def iter_blocks(self, start_time: datetime, n_steps: int, interval_minutes: int) -> Iterator[HistoryBlock]:
+        rng = np.random.default_rng(self.seed)
+        start_time = start_time.replace(microsecond=0)
+        start_local = np.datetime64(start_time, 's')
+        start_epoch = int(start_time.timestamp())
+        block_steps = max(1, BLOCK_CELLS // max(1, len(self.fip_names)))
+
+        for offset in range(0, n_steps, block_steps):
+            steps = np.arange(offset, min(offset + block_steps, n_steps), dtype=np.int64)
+            yield self._generate_block(
+                rng,
+                timestamps=start_epoch + steps * interval_minutes * 60,
+                local_times=start_local + steps * np.timedelta64(interval_minutes, 'm')
+            )
+
+    def generate(self, start_time: datetime, n_steps: int, interval_minutes: int) -> HistoryBlock:
+        """The whole cube at once"""
+        blocks = list(self.iter_blocks(start_time, n_steps, interval_minutes))
+        return HistoryBlock(
+            timestamps=np.concatenate([b.timestamps for b in blocks]),
+            local_times=np.concatenate([b.local_times for b in blocks]),
+            values=np.concatenate([b.values for b in blocks]),
+            present=np.concatenate([b.present for b in blocks])
+        )
+
+    def _generate_block(self, rng: np.random.Generator, timestamps: np.ndarray,
+                        local_times: np.ndarray) -> HistoryBlock:
+        shape = (len(timestamps), len(self.fip_names))
+        hours = local_times.astype('datetime64[h]').astype(np.int64) % 24
+        days = (local_times.astype('datetime64[D]').astype(np.int64) + 3) % 7  # Monday=0
+        weekend = days >= 5
+        peak = (((hours >= 9) & (hours <= 11)) | ((hours >= 14) & (hours <= 16))) & ~weekend
+        down = self.downtime_hours[:, hours].T
+
+        base_consent = (np.where(peak, 0.87, 0.95) + 0.03 * weekend)[:, None]
+        base_data_fetch = (np.where(peak, 0.84, 0.92) + 0.03 * weekend)[:, None]
+
+        consent = np.clip(base_consent + rng.uniform(-0.1, 0.05, shape) + self.bank_modifiers, 0.7, 1.0)
+        data_fetch = np.clip(base_data_fetch + rng.uniform(-0.08, 0.05, shape) + self.bank_modifiers, 0.7, 1.0)
+        response = np.maximum(0.1, 2.5 + rng.uniform(-1.0, 3.0, shape) + 2.0 * peak[:, None])
+        status = rng.choice([1.0, 0.5, 0.0], size=shape, p=[0.85, 0.12, 0.03])
+
+        # Forced downtime: near complete failure and very slow responses
+        consent = np.where(down, rng.uniform(0.05, 0.15, shape), consent)
+        data_fetch = np.where(down, rng.uniform(0.05, 0.15, shape), data_fetch)
+        response = np.where(down, rng.uniform(8.0, 15.0, shape), response)
+        status = np.where(down, 0.0, status)
+
+        total_requests = rng.integers(
+            np.where(weekend, 50, 100)[:, None], np.where(weekend, 200, 500)[:, None],
+            size=shape, endpoint=True
+        )
+
+        values = np.stack([
+            np.round(consent, 3),
+            np.round(data_fetch, 3),
+            np.round(response, 2),
+            np.round(1 - consent, 3),
+            total_requests,
+            status
+        ], axis=-1)
+        present = rng.random(shape) <= DATA_PRESENCE
+        return HistoryBlock(timestamps, local_times, values, present)
+
+    # ================================
+    # EXPORT
+    # ================================
+
+    def export(self, output_file: str, days_back: int = 30, interval_minutes: int = 15,
+               end_time: Optional[datetime] = None) -> int:
+        """
+        Stream the last days_back days to output_file; the format follows the extension:
+        .parquet, .jsonl (one entry per line) or anything else for a JSON array.
+        A trailing .gz compresses the JSON formats. Returns the number of entries written.
+        """
+        end_time = end_time or datetime.now()
+        start_time = end_time - timedelta(days=days_back)
+        n_steps = int((end_time - start_time) / timedelta(minutes=interval_minutes)) + 1
+        blocks = self.iter_blocks(start_time, n_steps, interval_minutes)
+
+        if output_file.endswith('.parquet'):
+            rows = self._write_parquet(blocks, output_file)
+        else:
+            as_array = not output_file.endswith(('.jsonl', '.jsonl.gz'))
+            rows = self._write_json(blocks, output_file, as_array)
+
+        self.logger.info(f"Exported {rows} data points for {len(self.fip_names)} FIPs "
+                         f"from {start_time.isoformat()} to {end_time.isoformat()}")
+        return rows
+
+    def _write_json(self, blocks: Iterator[HistoryBlock], output_file: str, as_array: bool) -> int:
+        opener = gzip.open if output_file.endswith('.gz') else open
+        labels = np.array([
+            f'"fip_name": {json.dumps(fip_name)}, "bank_name": {json.dumps(bank_name)}'
+            for fip_name, bank_name in self.fips.items()
+        ], dtype=object)
+        rows = 0
+
+        with opener(output_file, 'wt', encoding='utf-8') as f:
+            if as_array:
+                f.write('[\n')
+            separator = ',\n' if as_array else '\n'
+            for block in blocks:
+                t_idx, f_idx = np.nonzero(block.present)
+                if len(t_idx) == 0:
+                    continue
+                values = block.values[t_idx, f_idx]
+                columns = [values[:, m].tolist() for m in range(len(METRIC_NAMES))]
+                columns[4] = values[:, 4].astype(np.int64).tolist()
+                lines = [
+                    ENTRY_TEMPLATE % row for row in zip(
+                        block.timestamps[t_idx].tolist(),
+                        np.datetime_as_string(block.local_times, unit='s')[t_idx].tolist(),
+                        labels[f_idx].tolist(),
+                        *columns
+                    )
+                ]
+                if rows:
+                    f.write(separator)
+                f.write(separator.join(lines))
+                rows += len(lines)
+            f.write('\n]\n' if as_array else '\n')
+        return rows
+
+    def _write_parquet(self, blocks: Iterator[HistoryBlock], output_file: str) -> int:
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for Parquet output")
+
+        fip_names = pa.array(self.fip_names)
+        bank_names = pa.array(list(self.fips.values()))
+        schema = pa.schema(
+            [('timestamp', pa.timestamp('s')),
+             ('fip_name', pa.dictionary(pa.int32(), pa.string())),
+             ('bank_name', pa.dictionary(pa.int32(), pa.string()))] +
+            [(name, pa.int64() if name == 'total_requests' else pa.float64()) for name in METRIC_NAMES]
+        )
+        rows = 0
+
+        with pq.ParquetWriter(output_file, schema, compression='zstd') as writer:
+            for block in blocks:
+                t_idx, f_idx = np.nonzero(block.present)
+                if len(t_idx) == 0:
+                    continue
+                values = block.values[t_idx, f_idx]
+                codes = pa.array(f_idx.astype(np.int32))
+                columns = [
+                    pa.array(block.timestamps[t_idx], type=pa.timestamp('s')),
+                    pa.DictionaryArray.from_arrays(codes, fip_names),
+                    pa.DictionaryArray.from_arrays(codes, bank_names)
+                ] + [
+                    pa.array(values[:, m].astype(np.int64) if name == 'total_requests' else values[:, m])
+                    for m, name in enumerate(METRIC_NAMES)
+                ]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+                rows += len(t_idx)
+        return rows
@@ -0,0 +1,436 @@
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, Iterator, List, Optional
+import requests
+from config import Config
+from utils.logger import logger
+
+
+# (metric name, key in entry['metrics'], extra labels) for every sample of a history entry
+HISTORY_METRICS = [
+    ('fip_consent_success_rate', 'consent_success_rate', {}),
+    ('fip_data_fetch_success_rate', 'data_fetch_success_rate', {}),
+    ('fip_avg_response_time_seconds', 'avg_response_time', {}),
+    ('fip_error_rate', 'error_rate', {}),
+    ('fip_total_requests', 'total_requests', {'request_type': 'total'}),
+    ('fip_status', 'status', {}),
+]
+
+READ_BLOCK_SIZE = 1 << 20
+PROGRESS_LOG_INTERVAL = 10  # seconds
+
+
+def entry_timestamp_ms(entry: Dict) -> int:
+    """VictoriaMetrics expects milliseconds; history files may carry seconds"""
+    timestamp = entry.get('timestamp')
+    if not timestamp:
+        return int(time.time() * 1000)
+    return int(timestamp * 1000) if timestamp < 10**12 else int(timestamp)
+
+
+def iter_history_entries(path: str) -> Iterator[Dict]:
+    """
+    Entries of a history file, parsed incrementally so memory stays flat: either a
+    JSON array (as written by export_to_file) or JSON lines, optionally gzipped, or the
+    Parquet layout written by SyntheticHistoryGenerator
+    """
+    if path.endswith('.parquet'):
+        yield from _iter_parquet_entries(path)
+        return
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if not first:
+            return
+
+        if first == '[':
+            yield from _iter_json_array(f)
+        else:
+            for line in itertools.chain([first + f.readline()], f):
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _iter_json_array(f) -> Iterator[Dict]:
+    """Decode the elements of a JSON array whose opening bracket was already consumed"""
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buffer):
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                raise ValueError("History file ended before the closing ']'")
+            buffer, pos = block, 0
+            continue
+        if buffer[pos] == ']':
+            return
+
+        try:
+            entry, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The element straddles the block boundary: read on and retry
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                raise
+            buffer, pos = buffer[pos:] + block, 0
+            continue
+
+        yield entry
+        pos = end
+
+
+def _iter_parquet_entries(path: str) -> Iterator[Dict]:
+    import pyarrow.parquet as pq
+
+    metric_keys = [key for _, key, _ in HISTORY_METRICS]
+    for batch in pq.ParquetFile(path).iter_batches():
+        columns = {name: batch.column(name).to_pylist() for name in batch.schema.names if name != 'timestamp'}
+        timestamps = batch.column('timestamp').cast('int64').to_pylist()
+        keys = [key for key in metric_keys if key in columns]
+        for i, timestamp in enumerate(timestamps):
+            yield {
+                'timestamp': timestamp,
+                'fip_name': columns['fip_name'][i],
+                'bank_name': columns['bank_name'][i],
+                'metrics': {key: columns[key][i] for key in keys}
+            }
+
+
+def encode_jsonl(entries: List[Dict]) -> bytes:
+    """
+    /api/v1/import lines, one per series carrying all of the chunk's samples for it,
+    so VictoriaMetrics parses each label set once per chunk instead of once per sample
+    """
+    series = {}
+    for entry in entries:
+        timestamp_ms = entry_timestamp_ms(entry)
+        metrics = entry['metrics']
+        for metric_name, key, extra_labels in HISTORY_METRICS:
+            if key not in metrics:
+                continue
+            series_key = (metric_name, entry['fip_name'], entry['bank_name'])
+            line = series.get(series_key)
+            if line is None:
+                line = series[series_key] = {
+                    'metric': {
+                        '__name__': metric_name,
+                        'fip_name': entry['fip_name'],
+                        'bank_name': entry['bank_name'],
+                        **extra_labels,
+                        'job': 'manual'
+                    },
+                    'values': [],
+                    'timestamps': []
+                }
+            line['values'].append(metrics[key])
+            line['timestamps'].append(timestamp_ms)
+    return '\n'.join(json.dumps(line, separators=(',', ':')) for line in series.values()).encode('utf-8')
+
+
+def encode_prometheus(entries: List[Dict]) -> bytes:
+    """/api/v1/import/prometheus exposition lines with explicit timestamps"""
+    lines = []
+    for entry in entries:
+        timestamp_ms = entry_timestamp_ms(entry)
+        metrics = entry['metrics']
+        base_labels = f'fip_name="{entry["fip_name"]}",bank_name="{entry["bank_name"]}"'
+        for metric_name, key, extra_labels in HISTORY_METRICS:
+            if key not in metrics:
+                continue
+            labels = base_labels + ''.join(f',{name}="{value}"' for name, value in extra_labels.items())
+            lines.append(f'{metric_name}{{{labels}}} {metrics[key]} {timestamp_ms}')
+    return '\n'.join(lines).encode('utf-8')
+
+
+# format -> (endpoint path, content type, encoder)
+IMPORT_FORMATS = {
+    'jsonl': ('/api/v1/import', 'application/x-jsonlines', encode_jsonl),
+    'prometheus': ('/api/v1/import/prometheus', 'text/plain', encode_prometheus),
+}
+
+
+def entry_sample_count(entry: Dict) -> int:
+    metrics = entry['metrics']
+    return sum(1 for _, key, _ in HISTORY_METRICS if key in metrics)
+
+
+@dataclass
+class ImportChunk:
+    index: int
+    entries: List[Dict]
+    samples: int
+
+
+def iter_import_chunks(entries: Iterable[Dict], chunk_samples: int) -> Iterator[ImportChunk]:
+    """Group entries into chunks of about chunk_samples samples; boundaries are deterministic for resume"""
+    index, batch, samples = 0, [], 0
+    for entry in entries:
+        batch.append(entry)
+        samples += entry_sample_count(entry)
+        if samples >= chunk_samples:
+            yield ImportChunk(index, batch, samples)
+            index, batch, samples = index + 1, [], 0
+    if batch:
+        yield ImportChunk(index, batch, samples)
+
+
+class ImportCheckpoint:
+    """
+    Acknowledged chunks of one import, persisted after every acknowledgement.
+    Chunks finish out of order, so the state is the highest index below which every
+    chunk is acknowledged plus the acknowledged indices above it.
+    """
+
+    def __init__(self, path: str, fingerprint: Dict):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.watermark = -1
+        self.acked = set()
+
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('fingerprint') == fingerprint:
+            self.watermark = state['watermark']
+            self.acked = set(state['acked'])
+
+    @property
+    def resuming(self) -> bool:
+        return self.watermark >= 0 or bool(self.acked)
+
+    def is_acked(self, index: int) -> bool:
+        return index <= self.watermark or index in self.acked
+
+    def ack(self, index: int) -> None:
+        self.acked.add(index)
+        while self.watermark + 1 in self.acked:
+            self.watermark += 1
+            self.acked.discard(self.watermark)
+        self._save()
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _save(self) -> None:
+        state = {'fingerprint': self.fingerprint, 'watermark': self.watermark, 'acked': sorted(self.acked)}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+
+@dataclass
+class ImportResult:
+    chunks_sent: int = 0
+    chunks_skipped: int = 0
+    chunks_failed: int = 0
+    samples: int = 0
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.chunks_failed == 0
+
+    @property
+    def samples_per_second(self) -> float:
+        return self.samples / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), 'samples_per_second': round(self.samples_per_second, 1)}
+
+
+class StreamingVMImporter:
+    """
+    Backfills history files into VictoriaMetrics without holding them in memory.
+
+    Entries are parsed incrementally, grouped into chunks of BACKFILL_CHUNK_SAMPLES
+    samples, gzip-compressed and POSTed by a small thread pool with a bounded number
+    of chunks in flight. Every acknowledged chunk is recorded in a checkpoint next to
+    the input file, so an interrupted import resumes where it stopped.
+    """
+
+    def __init__(self, vm_url: str, import_format: str = 'jsonl',
+                 chunk_samples: Optional[int] = None, concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 gzip_level: Optional[int] = None, state_dir: Optional[str] = None):
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format '{import_format}', expected one of {list(IMPORT_FORMATS)}")
+
+        self.logger = logger
+        self.vm_url = vm_url.rstrip('/')
+        self.import_format = import_format
+        self.chunk_samples = chunk_samples or Config.BACKFILL_CHUNK_SAMPLES
+        self.concurrency = concurrency or Config.BACKFILL_CONCURRENCY
+        self.timeout = timeout or Config.BACKFILL_TIMEOUT
+        self.max_retries = Config.BACKFILL_MAX_RETRIES if max_retries is None else max_retries
+        self.gzip_level = gzip_level or Config.BACKFILL_GZIP_LEVEL
+        self.state_dir = state_dir or Config.BACKFILL_STATE_DIR
+        self._local = threading.local()
+
+    def import_file(self, path: str, resume: bool = True) -> ImportResult:
+        checkpoint = None
+        if resume:
+            stat = os.stat(path)
+            checkpoint = ImportCheckpoint(self._checkpoint_path(path), {
+                'source': os.path.abspath(path),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'format': self.import_format,
+                'chunk_samples': self.chunk_samples
+            })
+            if checkpoint.resuming:
+                self.logger.info(f"↩️ Resuming import of {path} after chunk {checkpoint.watermark}")
+
+        self.logger.info(f"🚀 Streaming {path} to {self.vm_url} ({self.import_format}, "
+                         f"{self.chunk_samples} samples/chunk, {self.concurrency} concurrent)")
+        result = self.import_entries(iter_history_entries(path), checkpoint)
+
+        if checkpoint is not None and result.success:
+            checkpoint.clear()
+        return result
+
+    def _checkpoint_path(self, path: str) -> str:
+        """One state file per input file and format, named after both"""
+        source = os.path.abspath(path)
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+        os.makedirs(self.state_dir, exist_ok=True)
+        return os.path.join(self.state_dir, f"{os.path.basename(source)}-{digest}.import-{self.import_format}.state")
+
+    def import_entries(self, entries: Iterable[Dict],
+                       checkpoint: Optional[ImportCheckpoint] = None) -> ImportResult:
+        result = ImportResult()
+        started = last_log = time.perf_counter()
+        in_flight = {}
+
+        def collect(done) -> None:
+            for future in done:
+                chunk = in_flight.pop(future)
+                try:
+                    raw_bytes, compressed_bytes = future.result()
+                except Exception as e:
+                    result.chunks_failed += 1
+                    self.logger.error(f"❌ Chunk {chunk.index} failed: {e}")
+                    continue
+                result.chunks_sent += 1
+                result.samples += chunk.samples
+                result.raw_bytes += raw_bytes
+                result.compressed_bytes += compressed_bytes
+                if checkpoint is not None:
+                    checkpoint.ack(chunk.index)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='vm-import') as executor:
+            for chunk in iter_import_chunks(entries, self.chunk_samples):
+                if checkpoint is not None and checkpoint.is_acked(chunk.index):
+                    result.chunks_skipped += 1
+                    continue
+
+                # Bound memory: at most two chunks per worker are encoded or in flight
+                while len(in_flight) >= 2 * self.concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight[executor.submit(self._send_chunk, chunk)] = chunk
+
+                now = time.perf_counter()
+                if now - last_log >= PROGRESS_LOG_INTERVAL:
+                    last_log = now
+                    self.logger.info(f"📤 {result.chunks_sent} chunks, {result.samples} samples "
+                                     f"({result.samples / (now - started):.0f} samples/s)")
+
+            collect(wait(in_flight).done)
+
+        result.elapsed_seconds = time.perf_counter() - started
+        ratio = result.raw_bytes / result.compressed_bytes if result.compressed_bytes else 0.0
+        log = self.logger.info if result.success else self.logger.error
+        log(f"{'✅' if result.success else '❌'} Imported {result.samples} samples in {result.chunks_sent} chunks "
+            f"({result.chunks_skipped} resumed, {result.chunks_failed} failed) in {result.elapsed_seconds:.1f}s: "
+            f"{result.samples_per_second:.0f} samples/s, gzip {ratio:.1f}x")
+        return result
+
+    def _send_chunk(self, chunk: ImportChunk):
+        path, content_type, encoder = IMPORT_FORMATS[self.import_format]
+        raw = encoder(chunk.entries)
+        body = gzip.compress(raw, compresslevel=self.gzip_level)
+        headers = {'Content-Type': content_type, 'Content-Encoding': 'gzip'}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._session().post(f"{self.vm_url}{path}", data=body, headers=headers, timeout=self.timeout)
+                if response.status_code == 204:
+                    return len(raw), len(body)
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    raise RuntimeError(error)  # the payload itself is rejected, retrying will not help
+            except requests.RequestException as e:
+                error = str(e)
+
+            if attempt < self.max_retries:
+                time.sleep(0.5 * 2 ** attempt)
+        raise RuntimeError(f"gave up after {self.max_retries + 1} attempts ({error})")
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+
+def copy_native(source_url: str, vm_url: str, match: str = '{__name__=~"fip_.*"}',
+                start: Optional[str] = None, end: Optional[str] = None,
+                timeout: Optional[float] = None) -> ImportResult:
+    """
+    Copy series between VictoriaMetrics instances in VictoriaMetrics' native format.
+
+    The native format is VictoriaMetrics-internal (compressed column blocks), so it is
+    never produced here: /api/v1/export/native on the source is streamed straight into
+    /api/v1/import/native on the destination without being decoded or buffered.
+    """
+    params = {'match[]': match}
+    if start:
+        params['start'] = start
+    if end:
+        params['end'] = end
+    timeout = timeout or Config.BACKFILL_TIMEOUT
+    result = ImportResult()
+    started = time.perf_counter()
+
+    def counted(blocks: Iterator[bytes]) -> Iterator[bytes]:
+        for block in blocks:
+            result.compressed_bytes += len(block)
+            yield block
+
+    try:
+        with requests.get(f"{source_url.rstrip('/')}/api/v1/export/native", params=params,
+                          stream=True, timeout=timeout) as export:
+            export.raise_for_status()
+            response = requests.post(f"{vm_url.rstrip('/')}/api/v1/import/native",
+                                     data=counted(export.iter_content(READ_BLOCK_SIZE)), timeout=timeout)
+            response.raise_for_status()
+        result.chunks_sent = 1
+    except requests.RequestException as e:
+        result.chunks_failed = 1
+        logger.error(f"❌ Native copy from {source_url} failed: {e}")
+
+    result.elapsed_seconds = time.perf_counter() - started
+    result.raw_bytes = result.compressed_bytes
+    if result.success:
+        logger.info(f"✅ Copied {result.compressed_bytes / 1e6:.1f} MB of native blocks in {result.elapsed_seconds:.1f}s")
+    return result
@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(params=['Asia/Kolkata', 'America/New_York'])
+def local_tz(request, monkeypatch):
+    """Run the test with the process clock in a non-UTC zone (east and west of UTC)"""
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Bare Flask app on a throwaway SQLite file with the schema in place (context pushed)"""
+    from flask import Flask
+    from models import db, ensure_schema
+    from models.storage import configure_storage
+    import models.alert, models.predictions, models.webhook  # noqa: F401 (register the tables)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_storage(app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        ensure_schema()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,99 @@
+"""Alerts keep one identity per condition and webhooks only hear about transitions"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import alert_service as alert_service_module
+from services.alert_lifecycle import AlertLifecycleEngine
+from services.alert_service import AlertContext, AlertMetrics, AlertService
+from utils.enums import AlertStatus
+
+T0 = datetime(2026, 1, 1, 12, 0)
+
+
+def make_alert(service, fip_name='sbi-fip', alert_type='consent_success_rate', severity='critical', rate=40.0):
+    return service._create_alert(
+        fip_name, severity, alert_type, f"{fip_name} consent success at {rate}%",
+        AlertMetrics(current_rate=rate, historical_avg=90.0, deviation=50.0, threshold=70.0),
+        AlertContext(affected_users=1000, business_impact='high', historical_pattern='none', peak_hour=10),
+        ['Check the FIP'], confidence=0.9
+    )
+
+
+@pytest.fixture
+def service(app):
+    return AlertService()
+
+
+def test_fingerprint_is_stable_per_condition():
+    fingerprint = AlertLifecycleEngine.fingerprint('sbi-fip', 'consent_success_rate', 'critical')
+    assert fingerprint == AlertLifecycleEngine.fingerprint('sbi-fip', 'consent_success_rate', 'critical')
+    assert fingerprint != AlertLifecycleEngine.fingerprint('sbi-fip', 'consent_success_rate', 'warning')
+    assert fingerprint != AlertLifecycleEngine.fingerprint('hdfc-fip', 'consent_success_rate', 'critical')
+
+
+def test_repeated_evaluations_keep_the_alert_identity(service):
+    engine = AlertLifecycleEngine()
+    first = engine.evaluate([make_alert(service, rate=40.0)], T0)
+    second = engine.evaluate([make_alert(service, rate=35.0)], T0 + timedelta(minutes=5))
+
+    assert len(first.new) == 1 and not second.new
+    assert second.firing[0].alert_id == first.firing[0].alert_id
+    assert second.firing[0].fingerprint == first.firing[0].fingerprint
+    assert second.firing[0].timestamp == T0.isoformat()
+    assert second.firing[0].metrics.current_rate == 35.0
+
+
+def test_alert_goes_from_firing_to_resolved(service):
+    engine = AlertLifecycleEngine()
+    firing = engine.evaluate([make_alert(service)], T0).firing[0]
+    assert firing.status == AlertStatus.FIRING.value
+
+    evaluation = engine.evaluate([], T0 + timedelta(minutes=5))
+    assert not evaluation.firing
+    assert [alert.alert_id for alert in evaluation.resolved] == [firing.alert_id]
+    assert evaluation.resolved[0].status == AlertStatus.RESOLVED.value
+    assert not engine.get_active_alerts()
+
+    # The same condition coming back is a new episode
+    again = engine.evaluate([make_alert(service)], T0 + timedelta(minutes=10))
+    assert len(again.new) == 1 and again.new[0].alert_id != firing.alert_id
+
+
+def test_webhooks_fire_only_on_transitions(service, monkeypatch):
+    from models import db
+    from models.webhook import WebhookSubscription
+
+    db.session.add(WebhookSubscription(name='ops', url='http://hooks.test/alerts', alert_types=['critical']))
+    db.session.commit()
+
+    sent = []
+
+    class Response:
+        status_code = 200
+        text = ''
+
+    def fake_request(method, url, json=None, headers=None, timeout=None):
+        sent.append(json)
+        return Response()
+
+    monkeypatch.setattr(alert_service_module.requests, 'request', fake_request)
+
+    def evaluate(candidates):
+        service._apply_lifecycle(candidates)
+        for thread in threading.enumerate():
+            if thread.name == 'alert-webhooks':
+                thread.join(5)
+
+    evaluate([make_alert(service), make_alert(service, severity='warning')])
+    assert [(payload['severity'], payload['status']) for payload in sent] == [('critical', 'firing')]
+
+    evaluate([make_alert(service), make_alert(service, severity='warning')])
+    evaluate([make_alert(service, rate=30.0), make_alert(service, severity='warning')])
+    assert len(sent) == 1
+
+    evaluate([])
+    assert [payload['status'] for payload in sent] == ['firing', 'resolved']
+    assert sent[0]['alert_id'] == sent[1]['alert_id']
+    assert sent[0]['fingerprint'] == sent[1]['fingerprint']
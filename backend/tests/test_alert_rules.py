@@ -0,0 +1,128 @@
+"""YAML alert rules compile to vectorized expressions over a MetricMatrix"""
+import numpy as np
+import pytest
+
+from services.alert_rules import AlertRuleEngine, MetricMatrix, RuleCompileError, compile_expression
+
+RULES = """
+parameters:
+  thresholds:
+    consent_success_rate:
+      critical: 70
+  trend_thresholds:
+    rapid_decline: -10.0
+
+rules:
+  - name: consent_rate_violation
+    when: "available(window.consent_success_rate) and current.consent_success_rate < thresholds.consent_success_rate.critical"
+    severity:
+      - when: "trend(window.consent_success_rate) < trend_thresholds.rapid_decline"
+        value: critical
+      - value: warning
+    values:
+      current_rate: "current.consent_success_rate"
+      historical_avg: "mean(window.consent_success_rate, 95.0)"
+    labels:
+      trend_desc:
+        - when: "trend(window.consent_success_rate) < 0"
+          value: declining
+        - value: stable
+    message: "{fip_name} at {current_rate:.1f}%"
+
+  - name: low_$metric
+    alert_type: low_average
+    metrics: [consent_success_rate, data_fetch_success_rate]
+    when: "has_data(window.$metric) and mean(window.$metric) < 50"
+    values:
+      average: "mean(window.$metric)"
+"""
+
+
+def load(tmp_path, text):
+    path = tmp_path / 'rules.yml'
+    path.write_text(text)
+    return AlertRuleEngine(str(path))
+
+
+def matrix():
+    nan = np.nan
+    return MetricMatrix(
+        fip_names=['sbi-fip', 'hdfc-fip', 'axis-fip'],
+        window={
+            # falling fast, flat and healthy, flat and low with a gap
+            'consent_success_rate': np.array([[90.0, 70.0, 50.0, 30.0],
+                                              [65.0, 65.0, 65.0, 65.0],
+                                              [40.0, nan, 40.0, 40.0]]),
+            'data_fetch_success_rate': np.array([[80.0, 80.0, 80.0, 80.0],
+                                                 [30.0, 30.0, 30.0, 30.0],
+                                                 [nan, nan, nan, nan]]),
+        },
+        current={'consent_success_rate': np.array([30.0, 65.0, 95.0])}
+    )
+
+
+def test_rules_compile_and_evaluate(tmp_path):
+    engine = load(tmp_path, RULES)
+    assert [rule.name for rule in engine.rules] == [
+        'consent_rate_violation', 'low_consent_success_rate', 'low_data_fetch_success_rate'
+    ]
+
+    matches = {(m.rule_name, m.fip_name): m for m in engine.evaluate(matrix())}
+    assert set(matches) == {
+        ('consent_rate_violation', 'sbi-fip'), ('consent_rate_violation', 'hdfc-fip'),
+        ('low_consent_success_rate', 'axis-fip'), ('low_data_fetch_success_rate', 'hdfc-fip'),
+    }
+
+    falling = matches[('consent_rate_violation', 'sbi-fip')]
+    assert falling.severity == 'critical'
+    assert falling.labels == {'trend_desc': 'declining'}
+    assert falling.values == {'current_rate': 30.0, 'historical_avg': 60.0}
+
+    flat = matches[('consent_rate_violation', 'hdfc-fip')]
+    assert flat.severity == 'warning'
+    assert flat.labels == {'trend_desc': 'stable'}
+
+    assert matches[('low_consent_success_rate', 'axis-fip')].values == {'average': 40.0}
+    assert matches[('low_data_fetch_success_rate', 'hdfc-fip')].alert_type == 'low_average'
+
+
+def test_expressions_are_vectorized():
+    expression = compile_expression('maximum(current.a, 2) * -1 < -2 or not current.b', ['current'])
+    result = expression({'current': {'a': np.array([1.0, 3.0, 5.0]), 'b': np.array([True, True, False])}})
+    assert result.tolist() == [False, True, True]
+
+
+@pytest.mark.parametrize('expression', [
+    'current.a <',                     # syntax error
+    'unknown.a < 1',                   # unknown namespace
+    'open(current.a)',                 # function outside the whitelist
+    'current.a ** 2',                  # unsupported operator
+    'current.a[0] < 1',                # subscripts are not allowed
+    '__import__("os").system("true")',
+])
+def test_malformed_expressions_are_rejected(expression):
+    with pytest.raises(RuleCompileError):
+        compile_expression(expression, ['current'])
+
+
+@pytest.mark.parametrize('rule', [
+    '- when: "current.a < 1"',                        # no name
+    '- name: no_condition',                           # no when
+    '- name: bad\n    when: "current.a <> 1"',
+    '- name: bad_value\n    when: "current.a < 1"\n    values:\n      x: "secret.a"',
+])
+def test_malformed_rules_are_rejected(tmp_path, rule):
+    with pytest.raises(RuleCompileError):
+        load(tmp_path, f"rules:\n  {rule}\n")
+
+
+def test_unknown_metrics_never_fire(tmp_path):
+    engine = load(tmp_path, RULES + """
+  - name: missing_metric
+    when: "mean(window.not_a_metric) < 100"
+  - name: missing_current
+    when: "current.not_a_metric < 100"
+""")
+    rule_names = {match.rule_name for match in engine.evaluate(matrix())}
+    assert 'consent_rate_violation' in rule_names
+    assert not rule_names & {'missing_metric', 'missing_current'}
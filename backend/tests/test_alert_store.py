@@ -0,0 +1,152 @@
+"""Evaluation passes are upserted in writer batches and the alerts table stays bounded"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db
+from models.alert import Alert as AlertModel
+from models.storage import DatabaseWriter
+from services import alert_service as alert_service_module
+from services.alert_lifecycle import AlertLifecycleEngine
+from services.alert_service import AlertService
+from utils.enums import AlertStatus
+from test_alert_lifecycle import make_alert
+
+T0 = datetime(2026, 1, 1, 12, 0)
+FIRING = AlertStatus.FIRING.value
+RESOLVED = AlertStatus.RESOLVED.value
+
+
+@pytest.fixture
+def service(app):
+    return AlertService()
+
+
+@pytest.fixture
+def writer(app, monkeypatch):
+    """A started writer that records the size of every committed batch"""
+    writer = DatabaseWriter(batch_size=50, flush_interval=0.2)
+    writer.batches = []
+    run_batch = writer._run_batch
+
+    def recording_run_batch(batch):
+        run_batch(batch)
+        writer.batches.append(len(batch))
+
+    writer._run_batch = recording_run_batch
+    writer.start(app)
+    monkeypatch.setattr(alert_service_module, 'db_writer', writer)
+    return writer
+
+
+def add_row(alert_id, status, timestamp, fingerprint=None, resolved_at=None, last_seen_at=None):
+    db.session.add(AlertModel(
+        alert_id=alert_id, fingerprint=fingerprint, fip_name='sbi-fip', severity='critical',
+        alert_type='consent_success_rate', message='',
+        metrics={'current_rate': 40.0, 'historical_avg': 90.0, 'deviation': 50.0, 'threshold': 70.0},
+        context={'affected_users': 1000, 'business_impact': 'high', 'historical_pattern': 'none', 'peak_hour': 10},
+        recommended_actions=[],
+        timestamp=timestamp, confidence=0.9, status=status, resolved_at=resolved_at, last_seen_at=last_seen_at
+    ))
+
+
+def rows():
+    db.session.expire_all()
+    return {record.alert_id: record for record in AlertModel.query.all()}
+
+
+def store(service, candidates, evaluated_at):
+    evaluation = service.lifecycle.evaluate(candidates, evaluated_at)
+    service._store_evaluation(evaluation)
+    return evaluation
+
+
+def test_passes_are_upserted_in_one_batch(service, writer):
+    a, b, c = (make_alert(service, fip_name=name) for name in ('sbi-fip', 'hdfc-fip', 'axis-fip'))
+    first = store(service, [a, b], T0)
+    store(service, [make_alert(service, fip_name='sbi-fip', rate=20.0)], T0 + timedelta(minutes=5))
+    store(service, [a, c], T0 + timedelta(minutes=10))
+    writer.run(lambda: None)
+
+    assert writer.batches == [4]  # three passes and the flush, one commit
+    stored = rows()
+    assert len(stored) == 3
+
+    ids = {alert.fip_name: alert.alert_id for alert in first.firing}
+    sbi, hdfc = stored[ids['sbi-fip']], stored[ids['hdfc-fip']]
+    assert (sbi.status, sbi.last_seen_at, sbi.timestamp) == (FIRING, T0 + timedelta(minutes=10), T0)
+    assert sbi.metrics['current_rate'] == 40.0  # refreshed by the latest pass
+    assert (hdfc.status, hdfc.resolved_at) == (RESOLVED, T0 + timedelta(minutes=5))
+    assert {r.status for r in stored.values() if r.fip_name == 'axis-fip'} == {FIRING}
+
+
+def test_restart_resolves_only_untracked_firing_rows(service, writer):
+    alert = make_alert(service)
+    add_row('alert_restored', FIRING, T0 - timedelta(hours=2), fingerprint=alert.fingerprint,
+            last_seen_at=T0 - timedelta(minutes=5))
+    add_row('alert_older_episode', FIRING, T0 - timedelta(hours=5), fingerprint=alert.fingerprint)
+    add_row('alert_unfingerprinted', FIRING, T0 - timedelta(hours=5))
+    db.session.commit()
+
+    assert service.restore_active_alerts() == 1
+    evaluation = store(service, [alert], T0)
+    assert not evaluation.new and evaluation.firing[0].alert_id == 'alert_restored'
+    writer.run(lambda: None)
+
+    stored = rows()
+    assert stored['alert_restored'].status == FIRING
+    for alert_id in ('alert_older_episode', 'alert_unfingerprinted'):
+        assert stored[alert_id].status == RESOLVED
+        assert stored[alert_id].resolution_note == 'No longer reported after a restart'
+    assert service._orphans_resolved.is_set()
+
+
+def test_failed_orphan_sweep_is_retried(service, writer, monkeypatch):
+    add_row('alert_orphan', FIRING, T0 - timedelta(hours=5))
+    db.session.commit()
+
+    resolve_orphans = service._resolve_orphans
+    locked = [True]
+
+    def flaky(evaluation, evaluated_at):
+        # The sweep runs, then the batch fails and is rolled back
+        resolve_orphans(evaluation, evaluated_at)
+        if locked[0]:
+            raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(service, '_resolve_orphans', flaky)
+    store(service, [], T0)
+    writer.run(lambda: None)
+    assert not service._orphans_resolved.is_set()
+    assert rows()['alert_orphan'].status == FIRING
+
+    locked[0] = False
+
+    store(service, [], T0 + timedelta(minutes=5))
+    writer.run(lambda: None)
+    assert service._orphans_resolved.is_set()
+    assert rows()['alert_orphan'].status == RESOLVED
+
+    # Once swept, empty passes no longer reach the writer
+    batches = len(writer.batches)
+    store(service, [], T0 + timedelta(minutes=10))
+    writer.run(lambda: None)
+    assert len(writer.batches) == batches + 1  # just the flush
+
+
+def test_compaction_expires_and_bounds_resolved_alerts(service):
+    now = datetime.utcnow()
+    add_row('expired', RESOLVED, now - timedelta(days=60), resolved_at=now - timedelta(days=40))
+    add_row('long_running', FIRING, now - timedelta(days=60), last_seen_at=now - timedelta(minutes=5))
+    add_row('stale_firing', FIRING, now - timedelta(days=60), last_seen_at=now - timedelta(days=31))
+    for i in range(5):
+        add_row(f'resolved_{i}', RESOLVED, now - timedelta(days=2), resolved_at=now - timedelta(hours=10 - i))
+    add_row('firing_recent', FIRING, now - timedelta(hours=1), last_seen_at=now)
+    db.session.commit()
+
+    assert service.compact_alert_history(retention_days=30, max_rows=5) == {'expired': 2, 'compacted': 2}
+    assert set(rows()) == {'long_running', 'firing_recent', 'resolved_2', 'resolved_3', 'resolved_4'}
+
+    # Firing alerts are never compacted, even over the row budget
+    assert service.compact_alert_history(retention_days=30, max_rows=1) == {'expired': 0, 'compacted': 3}
+    assert set(rows()) == {'long_running', 'firing_recent'}
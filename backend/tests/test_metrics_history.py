@@ -0,0 +1,70 @@
+"""The fleet ring buffer wraps without copying and only reports trends once it has enough points"""
+import numpy as np
+import pytest
+
+from services.metrics_history import TREND_NAMES, MetricsRingBuffer
+
+STATUS_NAMES = ['healthy', 'warning', 'degraded', 'critical']
+STABLE, IMPROVING, DECLINING = (TREND_NAMES.index(name) for name in ('stable', 'improving', 'declining'))
+
+
+def append(buffer, step, n_fips=2):
+    """Step k stores k + row/10 (so rows and steps are both recognisable)"""
+    base = np.full(n_fips, float(step)) + np.arange(n_fips) / 10
+    buffer.append(1_700_000_000_000 + step * 1000, {
+        'consent_success_rate': base,
+        'data_fetch_success_rate': base + 100,
+        'avg_response_time': base / 100
+    }, np.full(n_fips, step % len(STATUS_NAMES)))
+
+
+def test_wraps_around_oldest_first():
+    buffer = MetricsRingBuffer(n_fips=2, capacity=3)
+    assert len(buffer) == 0 and buffer.slots().tolist() == []
+    assert np.isnan(buffer.latest('consent_success_rate')).all()
+
+    for step in range(1, 3):
+        append(buffer, step)
+    assert len(buffer) == 2
+    assert buffer.window('consent_success_rate').tolist() == [[1.0, 2.0], [1.1, 2.1]]
+
+    for step in range(3, 6):
+        append(buffer, step)
+    values = buffer.values['consent_success_rate']
+    assert len(buffer) == 3 and buffer.head == 2
+    assert values.shape == (2, 3)  # preallocated, never grown
+    assert buffer.slots().tolist() == [2, 0, 1]
+    assert buffer.window('consent_success_rate').tolist() == [[3.0, 4.0, 5.0], [3.1, 4.1, 5.1]]
+    assert buffer.window('consent_success_rate', last=2).tolist() == [[4.0, 5.0], [4.1, 5.1]]
+    assert buffer.window('consent_success_rate', last=10).shape == (2, 3)
+    assert buffer.latest('avg_response_time').tolist() == pytest.approx([0.05, 0.051])
+    assert buffer.values['consent_success_rate'] is values
+
+
+def test_points_follow_the_ring_order():
+    buffer = MetricsRingBuffer(n_fips=2, capacity=3)
+    for step in range(1, 6):
+        append(buffer, step)
+
+    points = buffer.points(1, STATUS_NAMES)
+    assert [point['consent_success_rate'] for point in points] == [3.1, 4.1, 5.1]
+    assert [point['data_fetch_success_rate'] for point in points] == [103.1, 104.1, 105.1]
+    assert [point['current_status'] for point in points] == ['critical', 'healthy', 'warning']
+    assert [point['timestamp'] for point in points] == sorted(point['timestamp'] for point in points)
+    assert points[-1]['timestamp'] == '2023-11-14T22:13:25.000'
+    assert buffer.points(0, STATUS_NAMES, last=1)[0]['consent_success_rate'] == 5.0
+
+
+def test_trend_waits_for_min_points():
+    buffer = MetricsRingBuffer(n_fips=3, capacity=10)
+    current = np.array([10.0, 20.0, 5.0])  # the newest stored point is 5.0, 5.1, 5.2
+    for _ in range(2):
+        append(buffer, 5, n_fips=3)
+    assert buffer.trend('consent_success_rate', current).tolist() == [STABLE] * 3  # 2 points < min_points
+    assert buffer.trend('consent_success_rate', current, min_points=2).tolist() == [IMPROVING, IMPROVING, STABLE]
+
+    append(buffer, 5, n_fips=3)
+    assert buffer.trend('consent_success_rate', current).tolist() == [IMPROVING, IMPROVING, STABLE]
+    assert buffer.trend('consent_success_rate', np.array([2.9, 3.1, 7.2])).tolist() == [DECLINING, STABLE, STABLE]
+    assert buffer.trend('consent_success_rate', np.array([7.0, 7.2, 1.0]), threshold=2.0).tolist() == \
+        [STABLE, IMPROVING, DECLINING]
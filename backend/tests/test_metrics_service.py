@@ -0,0 +1,68 @@
+"""The per-FIP metrics API stays a plain dict API over the array-backed simulation"""
+import json
+from collections.abc import Mapping
+
+import numpy as np
+import pytest
+from flask import Flask, jsonify
+
+from services.fip_registry import STATUS_NAMES, FIPRegistry
+from services.metrics_service import FIPMetricsView, MetricsService
+
+
+@pytest.fixture
+def service():
+    return MetricsService(FIPRegistry.synthetic(25, seed=1), seed=7)
+
+
+def test_view_behaves_like_a_mapping(service):
+    view = service.get_metrics_view()
+    assert isinstance(view, Mapping) and isinstance(view, FIPMetricsView)
+    assert len(view) == 25 and list(view) == service.registry.names
+    assert 'sbi-fip' in view and 'no-such-fip' not in view
+    with pytest.raises(KeyError):
+        view['no-such-fip']
+
+    sbi = view['sbi-fip']
+    assert sbi is view['sbi-fip']  # built once per step
+    assert sbi['fip_name'] == 'sbi-fip' and sbi['bank_name'] == 'State Bank of India'
+    assert sbi['current_status'] in STATUS_NAMES
+    assert sbi['error_rate'] + sbi['consent_success_rate'] == pytest.approx(100, abs=0.1)
+    assert dict(view.items()) == view.to_dict()
+
+
+def test_status_api_returns_json_serializable_dicts(service):
+    status = service.get_all_fips_status()
+    assert type(status) is dict and all(type(metrics) is dict for metrics in status.values())
+    assert json.loads(json.dumps(status)) == status
+    assert json.dumps(service.get_metrics_view().to_dict()) == json.dumps(status)
+
+    with Flask(__name__).app_context():
+        assert jsonify(status).get_json() == status
+
+    assert type(service.get_fips_metrics([])) is dict
+    assert list(service.get_fips_metrics(['hdfc-fip', 'no-such-fip'])) == ['hdfc-fip']
+
+
+def test_in_place_edits_last_for_the_step(service):
+    view = service.get_metrics_view()
+    service.get_all_fips_status()['sbi-fip'].update({'consent_success_rate': 12.5, 'current_status': 'critical'})
+
+    row = service.fip_index['sbi-fip']
+    assert view.numeric_columns()['consent_success_rate'][row] == 12.5
+    assert view.columns()['consent_success_rate'][row] != 12.5  # the step's own arrays are untouched
+    assert STATUS_NAMES[view.status_codes()[row]] == 'critical'
+    assert service.get_all_fips_status()['sbi-fip']['consent_success_rate'] == 12.5
+
+    service.update_fip_metrics()
+    assert service.get_metrics_view() is not view
+    assert service.get_all_fips_status()['sbi-fip']['consent_success_rate'] != 12.5
+
+
+def test_columns_match_the_dicts(service):
+    view = service.get_metrics_view()
+    columns = view.columns()
+    for key in ('consent_success_rate', 'data_fetch_success_rate', 'avg_response_time', 'error_rate'):
+        assert columns[key].tolist() == [view[name][key] for name in view]
+    assert view.status_codes().tolist() == [STATUS_NAMES.index(view[name]['current_status']) for name in view]
+    assert np.array_equal(columns['user_base'], service.registry.user_base)
@@ -0,0 +1,125 @@
+"""Prediction runs become visible only when promoted, and pruning never drops the active one"""
+import sys
+
+import pytest
+
+from models import db
+from models.predictions import LatestPrediction, Prediction, PredictionGeneration, PredictionTimeline
+from services.prediction_store import PredictionStore
+from utils.enums import GenerationStatus, PredictionType
+
+
+def prediction(time_window, probability, reasoning='load spike'):
+    return {
+        'downtime_prediction': {
+            'probability': probability, 'time_window': time_window,
+            'confidence': 'high', 'reasoning': reasoning
+        },
+        'risk_level': 'high' if probability > 0.5 else 'low',
+        'health_score': 100 - probability * 100
+    }
+
+
+FIRST_RUN = {'sbi-fip': prediction('next 2-4 hours', 0.8), 'hdfc-fip': prediction('next 1-2 hours', 0.4)}
+SECOND_RUN = {'sbi-fip': prediction('next 6-7 hours', 0.3, 'recovering'), 'axis-fip': prediction('within 24 hours', 0.2)}
+
+
+def latest():
+    db.session.expire_all()
+    return {row.fip_name: (row.generation_id, row.probability) for row in LatestPrediction.query.all()}
+
+
+def test_readers_only_see_the_promoted_generation(app):
+    store = PredictionStore(generations_retained=4)
+    first = store.write_generation(FIRST_RUN)
+    assert store.active_generation_id() is None and latest() == {}
+
+    store.promote(first)
+    second = store.write_generation(SECOND_RUN)
+
+    # The new run is fully written but not visible yet
+    assert store.active_generation_id() == first
+    assert latest() == {'sbi-fip': (first, 0.8), 'hdfc-fip': (first, 0.4)}
+    assert Prediction.query.filter_by(generation_id=second).count() == 2
+
+    store.promote(second)
+    assert store.active_generation_id() == second
+    assert latest() == {'sbi-fip': (second, 0.3), 'axis-fip': (second, 0.2)}
+    statuses = {g.id: g.status for g in PredictionGeneration.query.all()}
+    assert statuses == {first: GenerationStatus.SUPERSEDED.value, second: GenerationStatus.ACTIVE.value}
+
+
+def test_promotion_is_per_prediction_type(app):
+    store = PredictionStore()
+    downtime = store.write_generation(FIRST_RUN)
+    store.promote(downtime)
+    degradation = store.write_generation(SECOND_RUN, PredictionType.DEGRADATION)
+    store.promote(degradation)
+
+    assert store.active_generation_id() == downtime
+    assert store.active_generation_id(PredictionType.DEGRADATION) == degradation
+    assert LatestPrediction.query.filter_by(prediction_type=PredictionType.DOWNTIME).count() == 2
+
+
+def test_prune_keeps_the_active_generation(app):
+    store = PredictionStore(generations_retained=2)
+    active = store.write_generation(FIRST_RUN)
+    store.promote(active)
+    newer = [store.write_generation(SECOND_RUN) for _ in range(3)]  # built, never promoted
+
+    # Rows from before generations existed: only this type's go
+    db.session.add(Prediction(fip_name='old-fip', prediction_type=PredictionType.DOWNTIME,
+                              probability=0.1, time_window='next 1-2 hours', confidence='low'))
+    db.session.add(Prediction(fip_name='old-fip', prediction_type=PredictionType.MAINTENANCE,
+                              probability=0.1, time_window='next 1-2 hours', confidence='low'))
+    db.session.add(PredictionTimeline(fip_name='old-fip', hour=1, probability=0.1, confidence='low',
+                                      time_window='next 1-2 hours'))
+    db.session.commit()
+
+    assert store.prune(PredictionType.MAINTENANCE) == 0
+    assert Prediction.query.filter_by(generation_id=None).count() == 2
+    assert PredictionTimeline.query.filter_by(generation_id=None).count() == 1
+
+    assert store.prune() == 1
+    assert {g.id for g in PredictionGeneration.query.all()} == {active, newer[1], newer[2]}
+    assert {row.generation_id for row in Prediction.query.all()} == {active, newer[1], newer[2], None}
+    assert Prediction.query.filter_by(generation_id=None).one().prediction_type == PredictionType.MAINTENANCE
+    assert PredictionTimeline.query.filter_by(generation_id=newer[0]).count() == 0
+    assert PredictionTimeline.query.filter_by(generation_id=None).count() == 0
+    assert store.active_generation_id() == active
+    assert set(latest()) == {'sbi-fip', 'hdfc-fip'}
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """The Flask app from app.py, on its own SQLite file"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'api.db'}")
+    if 'app' in sys.modules:
+        pytest.skip('app.py was already imported with another database')
+    import app as app_module
+    with app_module.app.app_context():
+        db.create_all()
+        yield app_module
+        db.session.remove()
+
+
+def test_hourly_endpoint_expands_the_active_timeline(api):
+    store = api.prediction_store
+    store.promote(store.write_generation(FIRST_RUN))
+    store.write_generation(SECOND_RUN)  # not promoted: must not leak into the response
+
+    client = api.app.test_client()
+    body = client.post('/api/fips/predictions/hourly', json={'hours': 3}).get_json()
+    assert body['success']
+    assert [entry['hour'] for entry in body['data']] == [1, 2, 3]
+    assert [sorted(entry['predictions']) for entry in body['data']] == [
+        ['hdfc-fip'], ['hdfc-fip', 'sbi-fip'], ['sbi-fip']
+    ]
+    sbi = body['data'][1]['predictions']['sbi-fip']
+    assert sbi == {'probability': 0.8, 'confidence': 'high', 'reasoning': 'load spike',
+                   'isMaintenence': True, 'timeWindow': 'next 2-4 hours'}
+    assert body['data'][0]['predictions']['hdfc-fip']['isMaintenence'] is False
+
+    # The full horizon includes hour 4, and no hours from the unpromoted run
+    body = client.post('/api/fips/predictions/hourly', json={}).get_json()
+    assert [entry['hour'] for entry in body['data']] == [1, 2, 3, 4]
@@ -0,0 +1,121 @@
+"""The hand-rolled protobuf and snappy encoders round-trip what the receivers decode"""
+import math
+import struct
+
+import numpy as np
+import pytest
+
+from services import remote_write
+from services.remote_write import (
+    RemoteWriteClient, StubRemoteWriteReceiver, _Fragment, _field, _varint, decode_write_request,
+    encode_labels, encode_samples, encode_timeseries, snappy_compress, snappy_decompress
+)
+
+EPOCH_MS = 1_700_000_000_000
+
+
+def reference_samples(values, timestamps):
+    """Sample by sample, straight from the message definition"""
+    return b''.join(
+        _field(2, b'\x09' + struct.pack('<d', value) + b'\x10' + _varint(int(timestamp)))
+        for value, timestamp in zip(values, timestamps)
+    )
+
+
+def round_trip(labels, values, timestamps):
+    body = encode_timeseries(encode_labels(labels), np.array(values, dtype=float), np.array(timestamps))
+    return decode_write_request(snappy_decompress(snappy_compress(body)))
+
+
+def test_known_encoding():
+    # Sample { value: 1.0, timestamp: 1 } and { value: -2.5, timestamp: -1 }
+    assert encode_samples(np.array([1.0]), np.array([1])) == bytes.fromhex('120b09000000000000f03f1001')
+    assert encode_samples(np.array([-2.5]), np.array([-1])) == (
+        bytes.fromhex('121409') + struct.pack('<d', -2.5) + bytes.fromhex('10ffffffffffffffffff01')
+    )
+    assert encode_labels({'b': '2', 'a': '1'}) == bytes.fromhex('0a060a0161120131') + bytes.fromhex('0a060a0162120132')
+
+
+@pytest.mark.parametrize('timestamps', [
+    [EPOCH_MS + i * 15000 for i in range(50)],                       # one width: numpy fast path
+    [0, 1, 127, 128, 16383, 16384, 1 << 35, EPOCH_MS, (1 << 63) - 1],  # every width
+    [-1, -1000, -(1 << 40), 0, EPOCH_MS],                             # negatives take ten bytes
+    [-(1 << 63), -5, -4, -3],                                          # all negative: fast path
+])
+def test_samples_round_trip(timestamps):
+    values = [float(i) * 1.5 - 3 for i in range(len(timestamps))]
+    assert encode_samples(np.array(values), np.array(timestamps)) == reference_samples(values, timestamps)
+
+    [(labels, samples)] = round_trip({'__name__': 'fip_status', 'fip_name': 'sbi-fip'}, values, timestamps)
+    assert labels == {'__name__': 'fip_status', 'fip_name': 'sbi-fip'}
+    assert samples == list(zip(values, timestamps))
+
+
+def test_special_values_round_trip():
+    values = [math.nan, math.inf, -math.inf, -0.0, 5e-324, 1.7976931348623157e308]
+    [(_, samples)] = round_trip({'__name__': 'x'}, values, list(range(len(values))))
+    decoded = [value for value, _ in samples]
+    assert math.isnan(decoded[0])
+    assert decoded[1:] == values[1:] and math.copysign(1, decoded[3]) == -1
+
+
+def test_labels_are_sorted_and_utf8():
+    labels = {'zone': 'ap-south-1', '__name__': 'fip_error_rate', 'bank_name': 'Bänk "of" India'}
+    [(decoded, _)] = round_trip(labels, [1.0], [EPOCH_MS])
+    assert list(decoded) == sorted(labels) and decoded == labels
+
+
+@pytest.mark.parametrize('size', [0, 1, 60, 61, 256, 257, 65536, 65537, 200000])
+def test_snappy_literal_framing_round_trips(size, monkeypatch):
+    monkeypatch.setattr(remote_write, 'SNAPPY_AVAILABLE', False)
+    data = np.random.default_rng(size).integers(0, 256, size, dtype=np.uint8).tobytes()
+    assert snappy_decompress(snappy_compress(data)) == data
+
+
+def test_snappy_decoder_handles_copies(monkeypatch):
+    monkeypatch.setattr(remote_write, 'SNAPPY_AVAILABLE', False)
+    # length 12 | literal "abc" | copy-1 of 9 bytes at offset 3 (overlapping)
+    assert snappy_decompress(bytes([12, 2 << 2]) + b'abc' + bytes([(5 << 2) | 1, 3])) == b'abcabcabcabc'
+    # length 8 | literal "abcd" | copy-2 of 4 bytes at offset 4
+    assert snappy_decompress(bytes([8, 3 << 2]) + b'abcd' + bytes([(3 << 2) | 2, 4, 0])) == b'abcdabcd'
+    with pytest.raises(ValueError):
+        snappy_decompress(bytes([9, 2 << 2]) + b'abc')
+
+
+@pytest.fixture
+def receiver():
+    stub = StubRemoteWriteReceiver(keep_samples=True).start()
+    yield stub
+    stub.stop()
+
+
+def test_fragments_of_a_series_are_sent_in_time_order(receiver):
+    client = RemoteWriteClient(receiver.url, shards=1, max_retries=0)
+    labels = encode_labels({'__name__': 'fip_status'})
+    key = (('__name__', 'fip_status'),)
+    late = _Fragment(key, labels, np.array([3.0, 4.0]), np.array([EPOCH_MS + 3, EPOCH_MS + 4]))
+    early = _Fragment(key, labels, np.array([1.0, 2.0]), np.array([EPOCH_MS + 1, EPOCH_MS + 2]))
+    client._send_batch([late, early], 4)
+
+    assert receiver.received[key] == [(float(i), EPOCH_MS + i) for i in range(1, 5)]
+
+
+def test_client_keeps_per_series_order_across_shards_and_requests(receiver):
+    client = RemoteWriteClient(receiver.url, shards=3, max_samples_per_send=7, batch_send_deadline=0.05,
+                               max_retries=0, extra_labels={'job': 'test'})
+    written = {}
+    for block in range(4):
+        for fip in range(5):
+            # fip-0 sits before 1970, so its timestamps are negative
+            timestamps = EPOCH_MS + np.arange(block * 10, block * 10 + 10) * 60000 - (1 << 42) * (fip == 0)
+            values = fip * 100 + np.arange(block * 10, block * 10 + 10, dtype=float)
+            labels = {'__name__': 'fip_consent_success_rate', 'fip_name': f'fip-{fip}'}
+            client.write(labels, values, timestamps)
+            written.setdefault(tuple(sorted({**labels, 'job': 'test'}.items())), []).extend(
+                zip(values.tolist(), timestamps.tolist())
+            )
+    stats = client.close(timeout=10)
+
+    assert stats.samples_sent == 200 and stats.samples_failed == 0
+    assert receiver.requests >= 200 // 7
+    assert receiver.received == written
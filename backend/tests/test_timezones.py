@@ -0,0 +1,156 @@
+"""Sample times keep their meaning on hosts whose local clock is not UTC"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.historical_analyzer import MetricQuery, epoch_to_local, local_to_epoch
+
+EPOCH = datetime(1970, 1, 1)
+STEP_SECONDS = 3600
+
+
+class FakeAnalyzer:
+    """Serves hourly samples up to now, shaped like PrometheusHistoricalAnalyzer._query_range"""
+
+    def __init__(self, hours: int = 48):
+        now = int((datetime.utcnow() - EPOCH).total_seconds())
+        self.epochs = np.arange(now - hours * STEP_SECONDS, now + 1, STEP_SECONDS) // STEP_SECONDS * STEP_SECONDS
+        self.metric_queries = {'status': MetricQuery(name='status', query='fip_status', description='')}
+        self.ranges = []
+
+    def _query_range(self, query, start_time, end_time, step, compact=False):
+        # start/end are naive UTC; rows come back in local wall-clock time
+        self.ranges.append((start_time, end_time))
+        start, end = ((t - EPOCH).total_seconds() for t in (start_time, end_time))
+        epochs = self.epochs[(self.epochs >= start) & (self.epochs <= end)]
+        if not len(epochs):
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'fip_name': 'sbi-fip',
+            'bank_name': 'State Bank of India',
+            'value': np.arange(len(epochs), dtype=np.float64)
+        }, index=pd.DatetimeIndex([datetime.fromtimestamp(int(e)) for e in epochs], name='timestamp'))
+
+
+def test_clock_conversions_match_datetime(local_tz):
+    epochs = np.arange(1_700_000_000 - 200 * 86400, 1_700_000_000 + 200 * 86400, 7919)
+    local = epoch_to_local(epochs)
+    expected = np.array([datetime.fromtimestamp(int(e)) for e in epochs], dtype='datetime64[s]')
+    assert (local == expected).all()
+    assert (local_to_epoch(local) == [int(d.timestamp()) for d in local.astype(object)]).all()
+
+
+def test_history_store_compacts_and_reads_in_utc(local_tz, tmp_path):
+    pytest.importorskip('pyarrow')
+    from services.history_store import ColumnarHistoryStore
+
+    analyzer = FakeAnalyzer()
+    store = ColumnarHistoryStore(analyzer, root_dir=str(tmp_path), profiles=[('1h', 1)])
+    store.enabled = True
+
+    assert store.compact()['1h'] > 0
+    manifest = store._read_manifest('1h')['status']
+    assert manifest['last_sample'] == datetime.utcfromtimestamp(int(analyzer.epochs[-1])).isoformat()
+
+    # The follow-up compaction re-reads the last step, not a window in the future
+    store.compact()
+    start_time, end_time = analyzer.ranges[-1]
+    assert end_time - start_time <= timedelta(seconds=2 * STEP_SECONDS)
+
+    # Reads cover the newest samples and come back in local wall-clock time
+    df = store.load(days_back=1, step='1h')['status']
+    assert df.index.max() == datetime.fromtimestamp(int(analyzer.epochs[-1]))
+    assert len(df) in (24, 25)
+
+
+def test_shared_matrix_sync_keeps_advancing(local_tz, tmp_path):
+    from services.shared_matrix import HEAD, SharedMatrixIngestor
+
+    analyzer = FakeAnalyzer()
+    ingestor = SharedMatrixIngestor(analyzer, root_dir=str(tmp_path), profiles=[('1h', 1)])
+    assert ingestor.sync()['1h'] > 0
+
+    matrix = ingestor.matrices['1h']
+    assert int(matrix.header[HEAD]) * STEP_SECONDS == int(analyzer.epochs[-1])
+
+    # The next sync re-reads the head bucket instead of starting in the future
+    ingestor.sync()
+    start_time, end_time = analyzer.ranges[-1]
+    assert timedelta(0) < end_time - start_time <= timedelta(seconds=2 * STEP_SECONDS)
+
+    df = matrix.to_frames(1)['status']
+    assert df.index.max() == datetime.fromtimestamp(int(analyzer.epochs[-1]))
+
+
+def _query_range_payload(n_fips: int = 3, days: int = 3):
+    from services.synthetic_history import METRIC_NAMES, SyntheticHistoryGenerator, synthetic_fips
+
+    generator = SyntheticHistoryGenerator(synthetic_fips(n_fips), seed=7)
+    # float32-exact values, so the compact layout's float32 column loses nothing
+    block = generator.generate(datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=days),
+                               days * 24 + 1, 60)
+    payloads = {}
+    for m, metric in enumerate(METRIC_NAMES):
+        result = []
+        for f, (fip_name, bank_name) in enumerate(generator.fips.items()):
+            present = np.flatnonzero(block.present[:, f])
+            result.append({
+                'metric': {'fip_name': fip_name, 'bank_name': bank_name},
+                'values': [[int(block.timestamps[t]), repr(float(np.float32(block.values[t, f, m])))] for t in present]
+            })
+        payloads[metric] = {'status': 'success', 'data': {'resultType': 'matrix', 'result': result}}
+    return payloads
+
+
+def _assert_close(a, b, path=''):
+    if isinstance(a, dict):
+        assert set(a) == set(b), path
+        for key in a:
+            _assert_close(a[key], b[key], f"{path}.{key}")
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            _assert_close(x, y, f"{path}[{i}]")
+    elif isinstance(a, float) and isinstance(b, float):
+        assert a == pytest.approx(b, rel=1e-3, abs=1e-3, nan_ok=True), path
+    else:
+        assert a == b, path
+
+
+def test_compact_and_default_layouts_give_the_same_features(local_tz, monkeypatch):
+    from services import historical_analyzer
+    from services.historical_analyzer import PrometheusHistoricalAnalyzer
+
+    payloads = _query_range_payload()
+    query_metrics = {'fip_avg_response_time_seconds': 'avg_response_time',
+                     'increase(fip_total_requests_total[1h])': 'total_requests'}
+
+    class Response:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self.payload
+
+    def fake_get(url, params, timeout):
+        query = params['query']
+        return Response(payloads[query_metrics.get(query, query.replace('fip_', '', 1))])
+
+    monkeypatch.setattr(historical_analyzer.requests, 'get', fake_get)
+    analyzer = PrometheusHistoricalAnalyzer('http://vm.invalid')
+
+    default = analyzer.extract_historical_data(days_back=3, step='1h')
+    compact = analyzer.extract_historical_data(days_back=3, step='1h', compact=True)
+    assert (historical_analyzer.expand_history_frame(compact['status']).index.sort_values()
+            == default['status'].index.sort_values()).all()
+
+    features = [analyzer.calculate_features(data) for data in (default, compact)]
+    for fip_features in features:
+        for values in fip_features.values():
+            values.pop('analysis_timestamp', None)
+    _assert_close(*features)
@@ -0,0 +1,115 @@
+"""Chunked backfill imports resume from their checkpoint after a failed chunk"""
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.vm_importer import StreamingVMImporter
+
+START = 1_700_000_000
+ENTRIES = 10
+CHUNK_SAMPLES = 12  # six samples per entry: two entries per chunk, five chunks
+
+
+class StubImportServer:
+    """Accepts /api/v1/import posts, failing any chunk that carries a rejected timestamp"""
+
+    def __init__(self):
+        self.requests = []  # sorted entry timestamps (ms) of every accepted chunk
+        self.rejected = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = gzip.decompress(self.rfile.read(int(self.headers['Content-Length'])))
+                lines = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+                timestamps = sorted({t for line in lines for t in line['timestamps']})
+                if stub.rejected & set(timestamps):
+                    self.send_response(400)
+                    self.end_headers()
+                    self.wfile.write(b'rejected')
+                    return
+                stub.requests.append(timestamps)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubImportServer()
+    yield server
+    server.stop()
+
+
+def entry_ms(i):
+    return (START + i * 60) * 1000
+
+
+def write_history(path):
+    with open(path, 'w') as f:
+        for i in range(ENTRIES):
+            f.write(json.dumps({
+                'timestamp': START + i * 60,
+                'fip_name': 'sbi-fip',
+                'bank_name': 'State Bank of India',
+                'metrics': {
+                    'consent_success_rate': 90.0, 'data_fetch_success_rate': 85.0, 'avg_response_time': 1.5,
+                    'error_rate': 10.0, 'total_requests': 100, 'status': 1
+                }
+            }) + '\n')
+
+
+def test_failed_chunk_is_the_only_one_resent(stub, tmp_path):
+    source_dir, state_dir = tmp_path / 'input', tmp_path / 'state'
+    source_dir.mkdir()
+    path = source_dir / 'history.jsonl'
+    write_history(path)
+
+    importer = StreamingVMImporter(stub.url, chunk_samples=CHUNK_SAMPLES, concurrency=2,
+                                   max_retries=0, state_dir=str(state_dir))
+    stub.rejected = {entry_ms(4)}  # chunk 2
+
+    result = importer.import_file(str(path))
+    assert (result.chunks_sent, result.chunks_failed, result.chunks_skipped) == (4, 1, 0)
+    assert sorted(stub.requests) == [[entry_ms(i), entry_ms(i + 1)] for i in (0, 2, 6, 8)]
+
+    # The checkpoint lives in the state directory, not next to the input
+    state_files = list(state_dir.iterdir())
+    assert len(state_files) == 1 and state_files[0].name.startswith('history.jsonl-')
+    assert sorted(p.name for p in source_dir.iterdir()) == ['history.jsonl']
+    assert json.loads(state_files[0].read_text())['watermark'] == 1
+
+    stub.rejected, stub.requests = set(), []
+    result = importer.import_file(str(path))
+    assert result.success
+    assert (result.chunks_sent, result.chunks_skipped) == (1, 4)
+    assert stub.requests == [[entry_ms(4), entry_ms(5)]]
+    assert list(state_dir.iterdir()) == []
+
+
+def test_changed_input_starts_over(stub, tmp_path):
+    path = tmp_path / 'history.jsonl'
+    write_history(path)
+    importer = StreamingVMImporter(stub.url, chunk_samples=CHUNK_SAMPLES, concurrency=1,
+                                   max_retries=0, state_dir=str(tmp_path / 'state'))
+    stub.rejected = {entry_ms(8)}
+    assert not importer.import_file(str(path)).success
+
+    with open(path, 'a') as f:
+        f.write('\n')  # same entries, different file: the old checkpoint no longer applies
+    stub.rejected, stub.requests = set(), []
+    result = importer.import_file(str(path))
+    assert (result.chunks_sent, result.chunks_skipped) == (5, 0)
@@ -1 +1 @@
-from .enums import PredictionType, FIPStatus
\ No newline at end of file
+from .enums import PredictionType, FIPStatus, AlertStatus, GenerationStatus
@@ -0,0 +1,36 @@
+import threading
+from typing import Any, Dict, Tuple
+from utils.logger import logger
+
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_aws_client(service_name: str, region_name: str = 'us-east-1'):
+    """
+    Memoized boto3 client, created on first use.
+
+    boto3 is imported here rather than at module level so services that never
+    reach AWS do not pay for it at import time. Clients are thread-safe once
+    built but creating them from the shared default session is not, hence the lock.
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+            client = boto3.client(service_name, region_name=region_name)
+            _clients[key] = client
+            logger.info(f"☁️ Created {service_name} client ({region_name})")
+    return client
+
+
+def reset_aws_clients() -> None:
+    """Drop memoized clients (e.g. after fork, or to pick up new credentials)"""
+    with _clients_lock:
+        _clients.clear()
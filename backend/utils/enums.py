@@ -8,4 +8,13 @@ class PredictionType(Enum):
 class FIPStatus(Enum):
     HEALTHY = "healthy"
     DEGRADED = "degraded"
-    CRITICAL = "critical" 
\ No newline at end of file
+    CRITICAL = "critical" 
+
+class AlertStatus(Enum):
+    FIRING = "firing"
+    RESOLVED = "resolved"
+
+class GenerationStatus(Enum):
+    BUILDING = "building"
+    ACTIVE = "active"
+    SUPERSEDED = "superseded"
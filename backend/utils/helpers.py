@@ -1,6 +1,7 @@
 import json
+import re
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from utils.logger import logger
 from config import Config
 # def format_currency(amount: float, currency: str = '₹') -> str:
@@ -81,6 +82,45 @@ def parse_time_window(time_window: str) -> timedelta:
     except:
         return timedelta(hours=1)
 
+_HOUR_RANGE_PATTERN = re.compile(r'next\s+(\d+)\s*-\s*(\d+)\s*hours?', re.IGNORECASE)
+
+def parse_time_window_hours(time_window: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse an hour range such as "next 6-8 hours" into (6, 8).
+    Returns None for windows without an explicit hour range.
+    """
+    match = _HOUR_RANGE_PATTERN.search(time_window or '')
+    if not match:
+        return None
+    start_hour, end_hour = int(match.group(1)), int(match.group(2))
+    return (start_hour, end_hour) if start_hour <= end_hour else None
+
+def build_prediction_timeline(fip_name: str, prediction: Dict) -> List[Dict[str, Any]]:
+    """
+    Expand a downtime prediction into one entry per predicted hour.
+    The maintenance flag is derived from the probability so the timeline is deterministic.
+    """
+    downtime_pred = prediction.get('downtime_prediction', {})
+    time_window = downtime_pred.get('time_window', '')
+    hour_range = parse_time_window_hours(time_window)
+    if hour_range is None:
+        logger.debug(f"No hour range in time window for {fip_name}: {time_window}")
+        return []
+
+    probability = downtime_pred.get('probability', 0)
+    return [
+        {
+            'fip_name': fip_name,
+            'hour': hour,
+            'probability': probability,
+            'confidence': downtime_pred.get('confidence', 'medium'),
+            'reasoning': downtime_pred.get('reasoning', ''),
+            'time_window': time_window,
+            'is_maintenance': probability > Config.MAINTENANCE_PROBABILITY_THRESHOLD
+        }
+        for hour in range(hour_range[0], hour_range[1] + 1)
+    ]
+
 def get_risk_color(probability: float) -> str:
     """
     Get color code for risk probability
@@ -0,0 +1,212 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+from prometheus_client import CollectorRegistry, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+# The app's own metrics (request latency, stage timers, cache hit ratios), served
+# on /metrics next to the FIP metrics and never pushed anywhere
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+REQUEST_DURATION = Histogram(
+    'app_http_request_duration_seconds',
+    'HTTP request latency by route',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+    registry=registry
+)
+
+STAGE_DURATION = Histogram(
+    'app_stage_duration_seconds',
+    'Duration of analytics stages, by the pipeline (route or job) that ran them',
+    ['pipeline', 'stage'],
+    buckets=LATENCY_BUCKETS,
+    registry=registry
+)
+
+BEDROCK_CALL_DURATION = Histogram(
+    'app_bedrock_call_duration_seconds',
+    'Duration of Bedrock service calls (mock or real)',
+    ['operation', 'mode', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+    registry=registry
+)
+
+
+# ================================
+# STAGE TIMERS
+# ================================
+
+class PipelineTimer:
+    """
+    Collects the stages run while it is active (in this thread or task), so a
+    multi-step job can log where its time went. Stages are labelled with its name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: List[Tuple[str, float]] = []
+        self.started = None
+        self.elapsed = 0.0
+        self._token = None
+
+    def start(self) -> 'PipelineTimer':
+        self.started = time.perf_counter()
+        self._token = _current_pipeline.set(self)
+        return self
+
+    def stop(self) -> float:
+        self.elapsed = time.perf_counter() - self.started
+        if self._token is not None:
+            _current_pipeline.reset(self._token)
+            self._token = None
+        return self.elapsed
+
+    def __enter__(self) -> 'PipelineTimer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def report(self) -> Dict:
+        return {
+            'total_ms': round(self.elapsed * 1000, 1),
+            'stages_ms': {stage: round(seconds * 1000, 1) for stage, seconds in self.stages}
+        }
+
+    def summary(self) -> str:
+        stages = ', '.join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in self.stages)
+        return f"{self.elapsed:.2f}s ({stages})" if stages else f"{self.elapsed:.2f}s"
+
+
+_current_pipeline: ContextVar[Optional[PipelineTimer]] = ContextVar('pipeline_timer', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of the current pipeline"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        pipeline = _current_pipeline.get()
+        STAGE_DURATION.labels(pipeline=pipeline.name if pipeline else 'none', stage=name).observe(elapsed)
+        if pipeline is not None:
+            pipeline.stages.append((name, elapsed))
+
+
+def timed_stage(name: Optional[str] = None):
+    """Decorator: every call of the function is a stage (named after it by default)"""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_bedrock_call(func):
+    """Decorator for Bedrock service methods; the mode comes from the service's use_mock"""
+    operation = func.__name__
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        outcome = 'error'
+        started = time.perf_counter()
+        try:
+            result = func(self, *args, **kwargs)
+            outcome = 'success'
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            # Read afterwards: a failed client creation switches the call to mock
+            mode = 'mock' if getattr(self, 'use_mock', True) else 'real'
+            BEDROCK_CALL_DURATION.labels(operation=operation, mode=mode, outcome=outcome).observe(elapsed)
+            pipeline = _current_pipeline.get()
+            if pipeline is not None:
+                pipeline.stages.append((f"bedrock.{operation}", elapsed))
+    return wrapper
+
+
+# ================================
+# CACHE HIT RATIOS
+# ================================
+
+class CacheStats:
+    """Hit/miss counts of one cache; plain ints so recording stays cheap on hot paths"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    @property
+    def ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_caches: Dict[str, CacheStats] = {}
+
+
+def cache_stats(name: str) -> CacheStats:
+    stats = _caches.get(name)
+    if stats is None:
+        stats = _caches.setdefault(name, CacheStats(name))
+    return stats
+
+
+class _CacheCollector:
+    def collect(self):
+        requests = CounterMetricFamily('app_cache_requests', 'Cache lookups by result', labels=['cache', 'result'])
+        ratio = GaugeMetricFamily('app_cache_hit_ratio', 'Share of cache lookups that hit', labels=['cache'])
+        for name, stats in sorted(_caches.items()):
+            requests.add_metric([name, 'hit'], stats.hits)
+            requests.add_metric([name, 'miss'], stats.misses)
+            ratio.add_metric([name], stats.ratio)
+        yield requests
+        yield ratio
+
+    def describe(self):
+        return []
+
+
+registry.register(_CacheCollector())
+
+
+# ================================
+# FLASK
+# ================================
+
+def instrument_app(app) -> None:
+    """Request latency per route; stages run by a request are labelled with its route"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g._request_pipeline = PipelineTimer(route).start()
+
+    @app.after_request
+    def _observe_request(response):
+        pipeline = g.pop('_request_pipeline', None)
+        if pipeline is not None:
+            elapsed = pipeline.stop()
+            REQUEST_DURATION.labels(method=request.method, route=pipeline.name,
+                                    status=str(response.status_code)).observe(elapsed)
+        return response
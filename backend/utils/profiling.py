@@ -0,0 +1,254 @@
+import faulthandler
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ================================
+# STACKS
+# ================================
+#
+# Collapsed stacks are one line per distinct stack, "root;caller;leaf <count>",
+# the input format of flamegraph.pl, inferno, speedscope and most flamegraph viewers.
+
+def _short_path(filename: str) -> str:
+    """Paths relative to the app (or just the module file for libraries)"""
+    if filename.startswith(APP_ROOT + os.sep):
+        return os.path.relpath(filename, APP_ROOT)
+    return os.path.basename(filename)
+
+
+def _frame_label(frame, lines: bool) -> str:
+    code = frame.f_code
+    lineno = frame.f_lineno if lines else code.co_firstlineno
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{lineno})"
+
+
+def frame_stack(frame, lines: bool = False) -> List[str]:
+    """Frame labels of a stack, outermost first"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame, lines))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _thread_names() -> Dict[int, str]:
+    return {thread.ident: thread.name.replace(';', ',') for thread in threading.enumerate()}
+
+
+def collapse(counts: Counter) -> str:
+    return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in counts.most_common()) + '\n'
+
+
+def thread_dump(lines: bool = True) -> List[Dict]:
+    """Current stack of every thread, e.g. to see what the background tasks are doing"""
+    names = _thread_names()
+    daemon = {thread.ident: thread.daemon for thread in threading.enumerate()}
+    return [
+        {
+            'thread_id': ident,
+            'name': names.get(ident, f'thread-{ident}'),
+            'daemon': daemon.get(ident),
+            'stack': frame_stack(frame, lines)
+        }
+        for ident, frame in sys._current_frames().items()
+    ]
+
+
+def thread_dump_collapsed(lines: bool = True) -> str:
+    """The thread dump as collapsed stacks (one sample per thread, rooted at the thread name)"""
+    return collapse(Counter(tuple([thread['name']] + thread['stack']) for thread in thread_dump(lines)))
+
+
+def install_stack_dump_signal(signum: int = getattr(signal, 'SIGUSR1', 0)) -> bool:
+    """`kill -USR1 <pid>` dumps every thread's stack to stderr, even with the app wedged"""
+    if not signum or threading.current_thread() is not threading.main_thread():
+        return False
+    faulthandler.register(signum, all_threads=True)
+    return True
+
+
+# ================================
+# CPU SAMPLING
+# ================================
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for the running process: a daemon thread takes
+    every thread's stack each `interval` seconds. Stacks are rooted at the thread
+    name so the background tasks stay apart in a flamegraph. Overhead is one stack
+    walk per thread per sample and nothing is traced between samples.
+    """
+
+    def __init__(self, interval: float = 0.01, lines: bool = False,
+                 thread_filter: Optional[str] = None, exclude_idents: Optional[List[int]] = None):
+        self.interval = interval
+        self.lines = lines
+        self.thread_filter = thread_filter
+        self.exclude_idents = set(exclude_idents or [])
+        self.counts = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self) -> 'SamplingProfiler':
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+        return self
+
+    def run(self, seconds: float) -> 'SamplingProfiler':
+        self.start()
+        self._stop.wait(seconds)
+        return self.stop()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = _thread_names()
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = _thread_names()
+            for ident, frame in frames.items():
+                if ident == own or ident in self.exclude_idents:
+                    continue
+                name = names.get(ident, f'thread-{ident}')
+                if self.thread_filter and self.thread_filter not in name:
+                    continue
+                self.counts[tuple([name] + frame_stack(frame, self.lines))] += 1
+            self.samples += 1
+
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_sample = time.perf_counter()  # fell behind, don't burst to catch up
+
+    def collapsed(self) -> str:
+        return collapse(self.counts)
+
+    def top(self, limit: int = 30) -> Dict:
+        """Functions by samples on top of the stack (self) and anywhere in it (total)"""
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.counts.items():
+            frames = stack[1:]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return {
+            'samples': self.samples,
+            'interval_seconds': self.interval,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'self': [{'frame': frame, 'samples': count} for frame, count in self_counts.most_common(limit)],
+            'total': [{'frame': frame, 'samples': count} for frame, count in total_counts.most_common(limit)]
+        }
+
+
+# ================================
+# MEMORY (tracemalloc)
+# ================================
+
+class AllocationTracker:
+    """
+    tracemalloc control for the live process. Tracing slows allocations down, so
+    it only runs between start() and stop(); snapshot() can diff against the
+    previous snapshot to show what grew.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 25) -> Dict:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._previous = None
+                logger.info(f"🧠 tracemalloc started ({frames} frames per allocation)")
+            return self.status()
+
+    def stop(self) -> Dict:
+        with self._lock:
+            status = self.status()
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("🧠 tracemalloc stopped")
+            self._previous = None
+            return status
+
+    def status(self) -> Dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'frames': tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak
+        }
+
+    def snapshot(self) -> Tuple[tracemalloc.Snapshot, Optional[tracemalloc.Snapshot]]:
+        """A snapshot without tracemalloc's own allocations, and the one taken before it (if any)"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running, start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ))
+        with self._lock:
+            previous, self._previous = self._previous, snapshot
+        return snapshot, previous
+
+    def top(self, snapshot: tracemalloc.Snapshot, previous: Optional[tracemalloc.Snapshot] = None,
+            key_type: str = 'lineno', limit: int = 30) -> List[Dict]:
+        if previous is not None:
+            stats = snapshot.compare_to(previous, key_type)
+            return [
+                {'location': _trace_location(stat.traceback), 'size_bytes': stat.size,
+                 'size_diff_bytes': stat.size_diff, 'count': stat.count, 'count_diff': stat.count_diff}
+                for stat in stats[:limit]
+            ]
+        return [
+            {'location': _trace_location(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics(key_type)[:limit]
+        ]
+
+    def collapsed(self, snapshot: tracemalloc.Snapshot) -> str:
+        """Live bytes by allocation stack, as collapsed stacks weighted by size"""
+        counts = Counter()
+        for stat in snapshot.statistics('traceback'):
+            stack = tuple(f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+            counts[stack] += stat.size
+        return collapse(counts)
+
+
+def _trace_location(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[-1]  # most recent frame
+    return f"{_short_path(frame.filename)}:{frame.lineno}"
@@ -0,0 +1,37 @@
+import sys
+import time
+from typing import Dict, List, Tuple
+from utils.logger import logger
+
+
+# Heavy modules that should only be imported once a code path needs them
+DEFERRED_MODULES = ('boto3', 'botocore', 'services.predictor', 'services.backfill_historical_data')
+
+
+class StartupTimer:
+    """Wall-clock time of each boot phase, reported once the app is ready"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> Dict:
+        return {
+            'total_ms': round((self._last - self.started) * 1000, 1),
+            'phases_ms': {phase: round(seconds * 1000, 1) for phase, seconds in self.phases},
+            'modules_loaded': len(sys.modules),
+            'deferred_modules_loaded': [name for name in DEFERRED_MODULES if name in sys.modules]
+        }
+
+    def log(self) -> None:
+        report = self.report()
+        phases = ', '.join(f"{phase} {ms:.0f} ms" for phase, ms in report['phases_ms'].items())
+        logger.info(f"🚀 Startup took {report['total_ms']:.0f} ms ({phases}; {report['modules_loaded']} modules loaded)")
+        if report['deferred_modules_loaded']:
+            logger.info(f"⏱️ Imported at startup although only needed lazily: {', '.join(report['deferred_modules_loaded'])}")